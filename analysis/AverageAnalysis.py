@@ -13,15 +13,23 @@
 # limitations under the License.
 
 from time import time
+
+import numpy as np
+
 from analysis.iuseranalysis import IUserAnalysis
 
 
 class AverageAnalysis(IUserAnalysis):
+    vectorized = True
+
     def __init__(self, option, name):
         super().__init__(option, name)
         self._deviations = option["deviation"]
         self._num_average = option["num_average"]
 
+    def history_depth(self):
+        return self._num_average
+
     def analysis(self, historical_data, alert_sender):
         historical_data_vectors = []
         for i in range(self._num_average):
@@ -50,3 +58,23 @@ class AverageAnalysis(IUserAnalysis):
                                                      "lower_bound": lower_bound,
                                                      "upper_bound": upper_bound,
                                                      "value": current_value})
+
+    def vector_analysis(self, batch, alert_sender):
+        for field in self._deviations.keys():
+            column = batch.field_index(field)
+            historical_values = batch.history[:, :self._num_average, column]
+            current_values = batch.current[:, column]
+            count = np.sum(~np.isnan(historical_values), axis=1)
+            average = np.where(count > 0, np.nansum(historical_values, axis=1) / np.maximum(count, 1), 0)
+            lower_bounds = average * (1 - float(self._deviations[field]) / 100)
+            upper_bounds = average * (1 + float(self._deviations[field]) / 100)
+
+            with np.errstate(invalid="ignore"):
+                outliers = (average != 0) & ((current_values < lower_bounds) | (current_values > upper_bounds))
+            for row in np.flatnonzero(outliers):
+                alert_sender.send_message(AnalysisModule=self.name, timestamp=time(),
+                                          param={"key": batch.keys[row],
+                                                 "field": field,
+                                                 "lower_bound": float(lower_bounds[row]),
+                                                 "upper_bound": float(upper_bounds[row]),
+                                                 "value": batch.value(row, field)})
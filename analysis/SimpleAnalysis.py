@@ -13,15 +13,23 @@
 # limitations under the License.
 
 from time import time
+
+import numpy as np
+
 from analysis.iuseranalysis import IUserAnalysis
 
 
 class SimpleAnalysis(IUserAnalysis):
+    vectorized = True
+
     def __init__(self, option, name):
         super().__init__(option, name)
         self._deviations = option["deviation"]
         self._batch_number = option["batch_number"]
 
+    def history_depth(self):
+        return self._batch_number
+
     def analysis(self, historical_data, alert_sender):
 
         for field in self._deviations.keys():
@@ -38,3 +46,21 @@ class SimpleAnalysis(IUserAnalysis):
                                                      "lower_bound": lower_bound,
                                                      "upper_bound": upper_bound,
                                                      "value": current_value_vec[field]})
+
+    def vector_analysis(self, batch, alert_sender):
+        for field in self._deviations.keys():
+            column = batch.field_index(field)
+            historical_values = batch.history[:, self._batch_number - 1, column]
+            current_values = batch.current[:, column]
+            lower_bounds = historical_values * (1 - float(self._deviations[field]) / 100)
+            upper_bounds = historical_values * (1 + float(self._deviations[field]) / 100)
+
+            with np.errstate(invalid="ignore"):
+                outliers = (current_values < lower_bounds) | (current_values > upper_bounds)
+            for row in np.flatnonzero(outliers):
+                alert_sender.send_message(AnalysisModule=self.name, timestamp=time(),
+                                          param={"key": batch.keys[row],
+                                                 "field": field,
+                                                 "lower_bound": float(lower_bounds[row]),
+                                                 "upper_bound": float(upper_bounds[row]),
+                                                 "value": batch.value(row, field)})
@@ -13,18 +13,22 @@
 # limitations under the License.
 
 import json
-import random
+import logging
+import threading
+from collections import OrderedDict
 from datetime import datetime
+from time import time
 
 from kafka import KafkaProducer
-from singelton.singleton import Singleton
 
+from errors.errors import UnsupportedAnalysisFormat
+from singelton.singleton import Singleton
+from singelton.worker_cache import worker_cached
 
 
-class SingleKafkaProducer(KafkaProducer, metaclass=Singleton):
-    def __init__(self, **kwargs):
-        super().__init__(**kwargs)
-        self.test_var = random.randint(0, 100)
+def get_producer(**options):
+    # alerts of all tasks of the worker are batched by one producer
+    return worker_cached(("kafka_producer",) + tuple(sorted(options.items())), lambda: KafkaProducer(**options))
 
 
 class IAllertMessage(object):
@@ -34,6 +38,12 @@ class IAllertMessage(object):
     def send_message(self, **kwargs):
         raise NotImplementedError("send_message method should be overrided!")
 
+    def flush(self):
+        """
+        Delivers messages sent since the last flush, it's called once after analysis of a partition
+        """
+        pass
+
 
 class AlertMessageFactory(object):
     def __init__(self, config):
@@ -41,16 +51,174 @@ class AlertMessageFactory(object):
 
     def instance_alert(self):
         if self._config["analysis"]["alert"]["method"] == "stdout":
-            return StdOutAlert(self._config)
+            alert = StdOutAlert(self._config)
         elif self._config["analysis"]["alert"]["method"] == "kafka":
-            return KafkaOutAlert(self._config)
+            alert = KafkaOutAlert(self._config)
+        else:
+            return None
+        if "suppression" in self._config["analysis"]["alert"]:
+            return SuppressedAlert(self._config, alert)
+        return alert
+
+
+class TokenBucket:
+    """
+    Allows rate events per second on average and burst events at once
+    """
+
+    def __init__(self, rate, burst):
+        self._rate = rate
+        self._burst = burst
+        self._tokens = burst
+        self._time = None
+
+    def consume(self, now):
+        if self._time is not None:
+            self._tokens = min(self._burst, self._tokens + (now - self._time) * self._rate)
+        self._time = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+
+class AlertSuppressionTable:
+    """
+    Incidents (module, key, field) with the time of the last sent alert and the number of alerts suppressed since it.
+    An alert of an incident is suppressed during cooldown seconds after the previous one and when the token bucket
+    of the sink is empty. The table keeps at most size incidents, the least recently alerted one is evicted.
+    Suppressed alerts are reported by the next sent alert of the incident, or by pop_summaries if the incident is
+    evicted or its cooldown is over.
+    """
+
+    def __init__(self, size, cooldown, rate=None, burst=None):
+        self._size = size
+        self._cooldown = cooldown
+        # the bucket should hold a whole token, otherwise a rate below 1 alert/s suppresses every alert
+        self._bucket = TokenBucket(rate, burst if burst else max(1, rate)) if rate else None
+        self._incidents = OrderedDict()
+        self._lock = threading.Lock()
+        # alerts suppressed by the token bucket since the last call of pop_rate_limited
+        self._rate_limited = 0
+        # incidents with suppressed alerts after their last sent alert and summaries (incident, suppressed alerts) of
+        # evicted incidents
+        self._suppressed = set()
+        self._evicted = []
+
+    def __len__(self):
+        return len(self._incidents)
+
+    def check(self, incident, now):
+        """
+        Registers an alert of the incident
+        :return: None if the alert is suppressed, otherwise the number of alerts of the incident suppressed before it
+        """
+        with self._lock:
+            entry = self._incidents.get(incident)
+            if entry is None:
+                if len(self._incidents) >= self._size:
+                    evicted, evicted_entry = self._incidents.popitem(last=False)
+                    self._suppressed.discard(evicted)
+                    if evicted_entry[0] is not None and evicted_entry[1]:
+                        self._evicted.append((evicted, evicted_entry[1]))
+                # [time of the last sent alert, number of suppressed alerts]
+                entry = [None, 0]
+                self._incidents[incident] = entry
+            else:
+                self._incidents.move_to_end(incident)
+
+            if entry[0] is not None and now - entry[0] < self._cooldown:
+                entry[1] += 1
+                self._suppressed.add(incident)
+                return None
+            if self._bucket is not None and not self._bucket.consume(now):
+                entry[1] += 1
+                self._rate_limited += 1
+                return None
+
+            suppressed = entry[1]
+            entry[0], entry[1] = now, 0
+            self._suppressed.discard(incident)
+            return suppressed
+
+    def pop_summaries(self, now):
+        """
+        Returns suppressed alerts which won't be reported by the next alert of their incident: alerts of evicted
+        incidents and of incidents after the cooldown
+        :return: list of (incident, number of suppressed alerts)
+        """
+        with self._lock:
+            summaries, self._evicted = self._evicted, []
+            for incident in list(self._suppressed):
+                entry = self._incidents[incident]
+                if now - entry[0] >= self._cooldown:
+                    summaries.append((incident, entry[1]))
+                    entry[1] = 0
+                    self._suppressed.discard(incident)
+        return summaries
+
+    def pop_rate_limited(self):
+        with self._lock:
+            rate_limited, self._rate_limited = self._rate_limited, 0
+        return rate_limited
+
+
+def get_suppression_table(sink_name, size, cooldown, rate=None, burst=None):
+    # the table of the sink is shared by tasks of all batches of the worker
+    return worker_cached(("suppression_table", sink_name, size, cooldown, rate, burst),
+                         lambda: AlertSuppressionTable(size, cooldown, rate, burst))
+
+
+class SuppressedAlert(IAllertMessage):
+    """
+    Passes alerts to the sink with deduplication and rate limiting by the suppression table of the worker process.
+    The next sent alert of an incident has the number of its suppressed alerts in param "suppressed". Suppressed alerts
+    of incidents which don't alert again are sent by flush as summaries: param has key, field, "suppressed" and
+    "summary": true.
+    """
+
+    def __init__(self, config, sink):
+        super().__init__(config)
+        options = config["analysis"]["alert"]["suppression"]
+        if options.get("burst") is not None and options["burst"] < 1:
+            raise UnsupportedAnalysisFormat("Burst of the alert rate limit should be at least 1 alert")
+        self._sink = sink
+        self._table_options = (type(sink).__name__, options.get("table_size", 100000), options.get("cooldown", 60),
+                               options.get("rate"), options.get("burst"))
+
+    def _get_table(self):
+        return get_suppression_table(*self._table_options)
+
+    def send_message(self, **kwargs):
+        parameters = kwargs.get("param", {})
+        incident = (kwargs.get("AnalysisModule"), str(parameters.get("key")), parameters.get("field"))
+        suppressed = self._get_table().check(incident, time())
+        if suppressed is None:
+            return
+        if suppressed:
+            kwargs["param"] = dict(parameters, suppressed=suppressed)
+        self._sink.send_message(**kwargs)
+
+    def flush(self):
+        now = time()
+        for (module, key, field), suppressed in self._get_table().pop_summaries(now):
+            self._sink.send_message(AnalysisModule=module, timestamp=now,
+                                    param={"key": key, "field": field, "suppressed": suppressed, "summary": True})
+        rate_limited = self._get_table().pop_rate_limited()
+        if rate_limited:
+            logging.warning("{} alerts are suppressed by the rate limit of {} alerts/s".format(
+                rate_limited, self._table_options[3]))
+        self._sink.flush()
 
 
 class StdOutAlert(IAllertMessage, metaclass=Singleton):
     def send_message(self, **kwargs):
         string = ''
         parameters = kwargs["param"]
-        if parameters["key"]:
+        if parameters.get("summary"):
+            string = string + " Parameter '{}' for key={}: {} similar alerts suppressed".format(
+                parameters["field"], parameters["key"], parameters["suppressed"])
+        elif parameters["key"]:
             string = string + " Parameter '{}' for key={} out of range [{},{}] and equal {}".format(
                 parameters["field"],
                 parameters["key"],
@@ -63,18 +231,49 @@ class StdOutAlert(IAllertMessage, metaclass=Singleton):
                 parameters["lower_bound"],
                 parameters["upper_bound"],
                 parameters["value"])
+        if parameters.get("suppressed") and not parameters.get("summary"):
+            string = string + " ({} similar alerts suppressed)".format(parameters["suppressed"])
         string = kwargs["AnalysisModule"] + ": Time: {}".format(
             datetime.fromtimestamp(int(kwargs["timestamp"]))) + "." + string
         print(string)
 
 
 class KafkaOutAlert(IAllertMessage, metaclass=Singleton):
+    """
+    Sends alerts to kafka without waiting for the broker: the producer collects alerts into batches of batch_size
+    bytes, waits linger_ms for more alerts before sending a batch and compresses batches. Delivery results are
+    handled by callbacks, flush waits for delivery of all alerts of the partition.
+    """
+
     def __init__(self, config):
         super().__init__(config)
-        self._topic = config["analysis"]["alert"]["option"]["topic"]
+        options = config["analysis"]["alert"]["option"]
+        self._topic = options["topic"]
+        self._producer_options = {"bootstrap_servers": "{}:{}".format(options["server"], options["port"]),
+                                  "linger_ms": options.get("linger_ms", 50),
+                                  "batch_size": options.get("batch_size", 16384),
+                                  "compression_type": options.get("compression")}
+        self._delivered = 0
+        self._failed = 0
+
+    def _get_producer(self):
+        return get_producer(**self._producer_options)
+
+    def _on_delivered(self, record_metadata):
+        self._delivered += 1
+
+    def _on_failed(self, exception):
+        self._failed += 1
+        logging.error("Alert is not delivered to kafka topic {}: {}".format(self._topic, exception))
 
     def send_message(self, **kwargs):
-        producer = SingleKafkaProducer(bootstrap_servers=self._config["analysis"]["alert"]["option"]["server"] + ":" +
-                                                         str(self._config["analysis"]["alert"]["option"]["port"]))
-        producer.send(self._topic, str.encode(json.dumps(kwargs)))
-        producer.flush()
+        future = self._get_producer().send(self._topic, str.encode(json.dumps(kwargs)))
+        future.add_callback(self._on_delivered)
+        future.add_errback(self._on_failed)
+
+    def flush(self):
+        self._get_producer().flush()
+        if self._failed:
+            logging.warning("{} of {} alerts are not delivered to kafka topic {}".format(
+                self._failed, self._delivered + self._failed, self._topic))
+        self._delivered, self._failed = 0, 0
@@ -0,0 +1,50 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+class AnalysisBatch:
+    """
+    Records of a partition for vectorized analysis modules. Values of a field are taken by its index in fields:
+    current[:, j] are current values of all keys and history[:, lag - 1, j] are values of all keys lag batches ago.
+    Missing history and non-numeric fields are NaN.
+    """
+
+    def __init__(self, keys, fields, current, history, records=None, positions=None):
+        """
+        :param keys: keys of the records, the order of keys is the order of rows
+        :param fields: names of fields, the order of fields is the order of columns
+        :param current: numpy array keys x fields of current values
+        :param history: numpy array keys x lags x fields of historical values
+        :param records: records (key, field_1,..field_n) of the rows
+        :param positions: dictionary field -> index of the field in a record
+        """
+        self.keys = keys
+        self.fields = fields
+        self.current = current
+        self.history = history
+        self._records = records
+        self._positions = positions
+
+    def __len__(self):
+        return len(self.keys)
+
+    def field_index(self, field):
+        return self.fields.index(field)
+
+    def value(self, row, field):
+        """
+        Returns the value of the field as it is in the record, alerts of vectorized modules send it unchanged
+        """
+        if self._records is None:
+            return self.current[row, self.field_index(field)].item()
+        return self._records[row][self._positions[field]]
@@ -47,10 +47,10 @@ class AnalysisFactory(object):
         self._key_fields_name = list(map(lambda x: x["input_field"],
                                          filter(lambda x: x["key"], data_structure_after_aggregation["rule"])))
 
-    def get_analysis_lambda(self):
+    def _build_analysis(self):
         """
-        Creates a lambda function that analyzes data after aggregation
-        :return: lambda function under tuple or rdd object 
+        Creates objects of user-defined analysis classes and objects which they use
+        :return: tuple (objects of user-defined classes, object that send alert, object of historical data)
         """
 
         alert_sender_singleton = self._alert_sender
@@ -77,21 +77,66 @@ class AnalysisFactory(object):
                                         user_analysis))
 
         historical_data = HistoricalData(historical_data_repository_singleton, self._input_fields, measurement,
-                                         self._accuracy, self._key_fields_name, self._batch_duration)
+                                         self._accuracy, self._key_fields_name, self._batch_duration,
+                                         self._config["analysis"]["historical"].get("keys_per_query", 500),
+                                         self._config["analysis"]["historical"].get("cache_size", 10000))
+        return user_object_analysis, alert_sender_singleton, historical_data
+
+    def get_partition_lambda(self):
+        """
+        Creates a function that analyzes records (key, field_1,..field_n) of a partition. History of the partition
+        keys is read by a few queries and alerts are flushed once after the partition
+        :return: function under iterator of a partition
+        """
+        user_object_analysis, alert_sender_singleton, historical_data = self._build_analysis()
+        history_depth = get_history_depth(user_object_analysis)
+        # vectorized modules need history of all keys of the partition, so they are run per record without its depth
+        vector_analysis = list(filter(lambda x: x.vectorized is True and history_depth, user_object_analysis))
+        record_analysis = list(filter(lambda x: x not in vector_analysis, user_object_analysis))
+
+        def analysis_partition(iterator):
+            records = iterator if isinstance(iterator, list) else list(iterator)
+            historical_data.begin_partition(history_depth, list(map(lambda x: x[0], records)))
+            try:
+                if vector_analysis and records:
+                    batch = historical_data.get_batch(records)
+                    for object_analysis in vector_analysis:
+                        object_analysis.vector_analysis(batch, alert_sender_singleton)
+                for record in records:
+                    analysis_record(record[1:], record_analysis, alert_sender_singleton, historical_data,
+                                    record[0])
+            finally:
+                alert_sender_singleton.flush()
+
+        return analysis_partition
+
+    def get_analysis_lambda(self):
+        """
+        Creates a lambda function that analyzes data after aggregation
+        :return: lambda function under tuple or rdd object 
+        """
+        analysis_partition = self.get_partition_lambda()
 
         def run_necessary_lambda(rdd_or_object):
             if isinstance(rdd_or_object, RDD):
-                rdd_or_object.foreachPartition(
-                    lambda iterator: map(
-                        lambda record: analysis_record(record[1:], user_object_analysis,
-                                                       alert_sender_singleton, historical_data, record[0]), iterator))
+                rdd_or_object.foreachPartition(analysis_partition)
             else:
-                analysis_record(rdd_or_object, user_object_analysis,
-                                alert_sender_singleton, historical_data)
+                analysis_partition([(None,) + tuple(rdd_or_object)])
 
         return lambda rdd_or_object: run_necessary_lambda(rdd_or_object)
 
 
+def get_history_depth(user_object_analysis):
+    """
+    Returns the largest index of historical data used by analysis modules or None if some module doesn't declare it
+    :param user_object_analysis: objects of user-defined classes
+    """
+    depths = list(map(lambda x: x.history_depth(), user_object_analysis))
+    if depths and all(map(lambda x: isinstance(x, int), depths)):
+        return max(depths)
+    return None
+
+
 def analysis_record(input_tuple_value, user_object_analysys, alert_sender_singleton, historical_data, key=None):
     """
     Checks data on anomalies using user-defined classes
@@ -106,3 +151,4 @@ def analysis_record(input_tuple_value, user_object_analysys, alert_sender_single
     historical_data.set_key(key)
     for object_analysis in user_object_analysys:
         object_analysis.analysis(historical_data, alert_sender_singleton)
+    historical_data.save_value()
@@ -15,17 +15,30 @@
 import logging
 from time import time
 import nanotime
+import numpy as np
+
+from analysis.analysis_batch import AnalysisBatch
+from analysis.history_cache import get_cache
 
 
 class HistoricalData:
     def __init__(self, historical_data_repository_singleton, data_structure, measurement, accuracy, key_fields_name,
-                 batch_duration):
+                 batch_duration, keys_per_query=500, cache_size=0):
         self._historical_data_repository_singleton = historical_data_repository_singleton
         self._data_structure = data_structure
         self._measurement = measurement
         self._accuracy = accuracy
         self._key_fields_name = key_fields_name
         self._batch_duration = batch_duration
+        # the largest number of keys in the condition of one query reading history of a partition
+        self._keys_per_query = keys_per_query
+        # the largest number of keys in the history cache of the worker process, 0 disables the cache
+        self._cache_size = cache_size
+        self._cache = None
+        self._history_depth = None
+        self._partition_keys = None
+        self._now = None
+        self._history = None
 
     def set_zero_value(self, value):
         fields = dict(map(lambda x: (x, value[self._data_structure[x]]), self._data_structure.keys()))
@@ -34,6 +47,123 @@ class HistoricalData:
     def set_key(self, key):
         self._key = key
 
+    def begin_partition(self, history_depth=None, keys=None):
+        """
+        Starts analysis of a partition: all records of the partition are compared with the same time windows and
+        history of the partition keys is read by a few queries on the first access
+        :param history_depth: the largest index of historical data used by analysis, None if it's unknown and
+        every record reads its own history
+        :param keys: keys of the partition records, history of all keys is read if it isn't set
+        """
+        self._history_depth = history_depth
+        self._partition_keys = keys
+        self._now = time()
+        self._history = None
+        self._cache = None
+        if self._cache_size and history_depth:
+            self._cache = get_cache(self._measurement, self._cache_size, history_depth)
+
+    def save_value(self):
+        """
+        Saves the current value of the key to the history cache, the next batches read it instead of influx
+        """
+        if self._cache is not None:
+            values = dict(map(lambda x: (x, self._zero_value[x]), self._data_structure.keys()))
+            values["time"] = nanotime.timestamp(self._now).nanoseconds()
+            self._cache.append(_history_key(self._key), values["time"], values)
+
+    def get_batch(self, records):
+        """
+        Creates the batch of records (key, field_1,..field_n) of the partition for vectorized analysis modules,
+        the history has history_depth lags
+        :return: object of AnalysisBatch
+        """
+        if self._history is None:
+            self._read_history()
+        fields = sorted(self._data_structure.keys(), key=lambda x: self._data_structure[x])
+        current = np.full((len(records), len(fields)), np.nan)
+        for column, field in enumerate(fields):
+            index = self._data_structure[field] + 1
+            try:
+                current[:, column] = np.array(list(map(lambda x: x[index], records)), dtype=float)
+            except (TypeError, ValueError):
+                pass
+
+        keys = list(map(lambda x: x[0], records))
+        history = np.full((len(records), self._history_depth, len(fields)), np.nan)
+        # positions of found points in the history flattened to (key, lag) x fields
+        positions, points = [], []
+        for row, key in enumerate(keys):
+            history_key = _history_key(key)
+            for lag in range(1, self._history_depth + 1):
+                point = self._history.get((history_key, lag))
+                if point:
+                    positions.append(row * self._history_depth + lag - 1)
+                    points.append(point)
+        flat_history = history.reshape(-1, len(fields))
+        for column, field in enumerate(fields):
+            values = [point.get(field) for point in points]
+            try:
+                flat_history[positions, column] = np.array(values, dtype=float)
+            except (TypeError, ValueError):
+                flat_history[positions, column] = list(map(_to_float, values))
+        positions = dict(map(lambda x: (x, self._data_structure[x] + 1), fields))
+        return AnalysisBatch(keys, fields, current, history, records, positions)
+
+    def _read_history(self):
+        """
+        Reads history of the partition keys for indexes 1..history_depth and indexes it by (key, index). History is
+        taken from the cache of the worker process, keys missing in the cache are read from influx: every query selects
+        time windows of all indexes for keys_per_query keys grouped by key tags
+        """
+        nano_timestamp, nano_duration, nano_accuracy = nanotime.timestamp(self._now).nanoseconds(), \
+                                                       nanotime.seconds(self._batch_duration).nanoseconds(), \
+                                                       nanotime.seconds(self._accuracy).nanoseconds()
+        intervals = list(map(lambda x: (nano_timestamp - x * nano_duration - nano_accuracy,
+                                        nano_timestamp - x * nano_duration + nano_accuracy),
+                             range(1, self._history_depth + 1)))
+
+        if not self._key_fields_name:
+            keys = [()]
+        elif self._partition_keys is not None:
+            keys = sorted(set(map(_history_key, filter(lambda x: x, self._partition_keys))))
+        else:
+            keys = None
+
+        history = {}
+        missing_keys = keys
+        if self._cache is not None and keys is not None:
+            missing_keys = []
+            for key in keys:
+                for index, interval in enumerate(intervals, 1):
+                    values = self._cache.get(key, interval[0], interval[1])
+                    if values is None:
+                        missing_keys.append(key)
+                        break
+                    history[(key, index)] = values
+
+        if missing_keys is None or (missing_keys and not self._key_fields_name):
+            key_chunks = [None]
+        else:
+            key_chunks = [missing_keys[i:i + self._keys_per_query]
+                          for i in range(0, len(missing_keys), self._keys_per_query)]
+
+        for key_chunk in key_chunks:
+            influx_keys = None
+            if key_chunk:
+                influx_keys = list(map(lambda x: dict(zip(self._key_fields_name, x)), key_chunk))
+            points = self._historical_data_repository_singleton.read_windows(self._measurement, intervals,
+                                                                             self._key_fields_name, influx_keys)
+            for point in points:
+                index = int(round((nano_timestamp - point["time"]) / nano_duration))
+                if not 1 <= index <= self._history_depth or \
+                        abs(nano_timestamp - index * nano_duration - point["time"]) >= nano_accuracy:
+                    continue
+                point_key = (tuple(map(lambda x: str(point.get(x)), self._key_fields_name)), index)
+                if point_key not in history or history[point_key]["time"] < point["time"]:
+                    history[point_key] = point
+        self._history = history
+
     def __getitem__(self, index):
         if index == 0:
             self._zero_value["key"] = self._key
@@ -42,7 +172,17 @@ class HistoricalData:
             if self._accuracy >= self._batch_duration:
                 logging.warning("Current accuracy {} is more or equal batch duration {}. You can get incorrect "
                                 "results of analysis in this case ".format(self._accuracy, self._batch_duration))
-            nano_timestamp, nano_delta, nano_accuracy = nanotime.timestamp(time()), nanotime.seconds(
+            if self._history_depth and index <= self._history_depth:
+                if self._history is None:
+                    self._read_history()
+                point_key = (_history_key(self._key), index)
+                if point_key in self._history:
+                    historical_values = dict(self._history[point_key])
+                    historical_values["key"] = self._key
+                    return historical_values
+                return {}
+
+            nano_timestamp, nano_delta, nano_accuracy = nanotime.timestamp(self._now if self._now else time()), nanotime.seconds(
                 index * self._batch_duration), nanotime.seconds(self._accuracy)
 
             begin_time_interval = nano_timestamp - nano_delta - nano_accuracy
@@ -60,3 +200,14 @@ class HistoricalData:
                 return historical_values
             else:
                 return {}
+
+
+def _history_key(key):
+    return tuple(map(str, key)) if key else ()
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
@@ -0,0 +1,70 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from collections import OrderedDict, deque
+
+from singelton.worker_cache import worker_cached
+
+
+class HistoryCache:
+    """
+    Ring buffers of the last results of aggregation keys. The cache keeps at most capacity keys, the least recently
+    used key is evicted when a new key is added to the full cache. Every key keeps depth results.
+    """
+
+    def __init__(self, capacity, depth):
+        self._capacity = capacity
+        self._depth = depth
+        # key -> ring buffer of (time, values)
+        self._keys = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def append(self, key, timestamp, values):
+        """
+        Saves the result of the key for the batch analysed at timestamp
+        """
+        with self._lock:
+            results = self._keys.get(key)
+            if results is None:
+                if len(self._keys) >= self._capacity:
+                    self._keys.popitem(last=False)
+                results = deque(maxlen=self._depth)
+                self._keys[key] = results
+            else:
+                self._keys.move_to_end(key)
+            results.append((timestamp, values))
+
+    def get(self, key, from_timestamp, to_timestamp):
+        """
+        Returns the latest result of the key saved in the interval (from_timestamp, to_timestamp), None if the cache
+        doesn't have it
+        """
+        with self._lock:
+            results = self._keys.get(key)
+            if results is None:
+                return None
+            self._keys.move_to_end(key)
+            for timestamp, values in reversed(results):
+                if from_timestamp < timestamp < to_timestamp:
+                    return values
+        return None
+
+
+def get_cache(measurement, capacity, depth):
+    # results of previous batches analysed by the worker are available to the next batches without reading influx
+    return worker_cached(("history_cache", measurement, capacity, depth), lambda: HistoryCache(capacity, depth))
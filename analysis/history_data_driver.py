@@ -33,3 +33,34 @@ class HistoryDataDriver:
             query += ''.join(list(str_tags))
         result = self.client.query(query)
         return list(result.get_points(measurement=measurement))
+
+    def read_windows(self, measurement, intervals, tag_names=None, tags=None):
+        """
+        Reads points of several time windows by one query, time of points is returned in nanoseconds. InfluxQL 1.x
+        doesn't support OR between time ranges, so the query selects the single range covering all windows and the
+        caller should drop points between the windows
+        :param intervals: list of (from_nanoseconds, to_nanoseconds)
+        :param tag_names: names of key tags, the result is grouped by them and tags are added to every point
+        :param tags: list of dictionaries tag -> value, only points of these keys are read if it's set
+        """
+        query = "SELECT * from {0} WHERE time > {1} AND time < {2}".format(
+            measurement, min(map(lambda x: x[0], intervals)), max(map(lambda x: x[1], intervals)))
+        if tags:
+            query += " AND ({})".format(" OR ".join(map(_tag_condition, tags)))
+        if tag_names:
+            query += " GROUP BY {}".format(",".join(map(lambda x: "\"{}\"".format(x), tag_names)))
+
+        result = self.client.query(query, epoch="ns")
+        points = []
+        for (_, series_tags), series_points in result.items():
+            for point in series_points:
+                if series_tags:
+                    point.update(series_tags)
+                points.append(point)
+        return points
+
+
+def _tag_condition(tag):
+    return "({})".format(" AND ".join(map(
+        lambda x: "\"{}\"='{}'".format(x[0], str(x[1]).replace("\\", "\\\\").replace("'", "\\'")),
+        sorted(tag.items()))))
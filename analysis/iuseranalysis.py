@@ -13,9 +13,27 @@
 # limitations under the License.
 
 class IUserAnalysis(object):
+    # vectorized modules analyse all records of a partition by vector_analysis if history_depth is known
+    vectorized = False
+
     def __init__(self, option, name):
         self._option = option
         self.name = name
 
     def analysis(self, historical_data, alert_sender):
         raise NotImplementedError("analysis method should be overrided!")
+
+    def vector_analysis(self, batch, alert_sender):
+        """
+        Analyses all records of a partition
+        :param batch: object of AnalysisBatch with current values and history of all keys of the partition
+        :param alert_sender: object that send alert
+        """
+        raise NotImplementedError("vector_analysis method should be overrided!")
+
+    def history_depth(self):
+        """
+        Returns the largest index of historical data used by the analysis, history of all keys up to this index is
+        read once per partition. None means that the depth is unknown and history is read for every record
+        """
+        return None
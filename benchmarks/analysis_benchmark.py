@@ -0,0 +1,88 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of analysis of an aggregated partition: SimpleAnalysis and AverageAnalysis run per record against
+vectorized analysis of the whole partition. History is served from memory, so only analysis is measured.
+
+Usage: python -m benchmarks.analysis_benchmark [keys]
+"""
+
+import sys
+import timeit
+
+import nanotime
+
+from analysis.AverageAnalysis import AverageAnalysis
+from analysis.SimpleAnalysis import SimpleAnalysis
+from analysis.analysis_factory import analysis_record
+from analysis.historical_data import HistoricalData
+
+BATCH_DURATION = 10
+FIELDS = {"traffic": 0, "packet_size": 1, "count": 2}
+
+
+class MemoryHistory:
+    def __init__(self, points):
+        self._points = points
+
+    def read_windows(self, measurement, intervals, tag_names=None, tags=None):
+        return self._points
+
+
+class CountingAlert:
+    def __init__(self):
+        self.alerts = 0
+
+    def send_message(self, **kwargs):
+        self.alerts += 1
+
+
+def run(keys_count=100000):
+    nano_timestamp, nano_duration = nanotime.now().nanoseconds(), nanotime.seconds(BATCH_DURATION).nanoseconds()
+    # every hundredth key deviates from its history
+    records = [(("10.0.{}.{}".format(x // 256 % 256, x % 256), x), 2000 if x % 100 == 0 else 1000, 1500, 10)
+               for x in range(keys_count)]
+    points = [{"time": nano_timestamp - lag * nano_duration, "src_ip": key[0], "port": str(key[1]),
+               "traffic": 1000 + lag, "packet_size": 1500, "count": 10}
+              for key, *_ in records for lag in range(1, 6)]
+    modules = [SimpleAnalysis({"deviation": {"traffic": 2, "packet_size": 5}, "batch_number": 1}, "Simple"),
+               AverageAnalysis({"deviation": {"traffic": 2, "count": 5}, "num_average": 5}, "Average")]
+
+    historical_data = HistoricalData(MemoryHistory(points), FIELDS, "points", 2, ["src_ip", "port"], BATCH_DURATION,
+                                     keys_count)
+    historical_data.begin_partition(5, list(map(lambda x: x[0], records)))
+    historical_data.get_batch(records[:1])
+
+    def record_analysis(alert_sender):
+        for record in records:
+            analysis_record(record[1:], modules, alert_sender, historical_data, record[0])
+
+    def vector_analysis(alert_sender):
+        batch = historical_data.get_batch(records)
+        for module in modules:
+            module.vector_analysis(batch, alert_sender)
+
+    results = {}
+    for name, analyse in (("records", record_analysis), ("vector", vector_analysis)):
+        alert_sender = CountingAlert()
+        elapsed = min(timeit.repeat(lambda: analyse(alert_sender), number=1, repeat=3))
+        results[name] = elapsed
+        print("{:<10} {:>12.0f} keys/s {:>10} alerts".format(name, keys_count / elapsed, alert_sender.alerts // 3))
+
+    print("speedup: {:.2f}x".format(results["records"] / results["vector"]))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
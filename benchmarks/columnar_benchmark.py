@@ -0,0 +1,69 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the columnar transformation mode against the row transformation on a numeric-heavy
+configuration. The columnar time includes building the columns from rows and zipping results back.
+
+Usage: python -m benchmarks.columnar_benchmark [rows]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+from config_parsing.transformations_parser import TransformationsParser
+from operations.transformation_operations import TransformationOperations
+from processor.columnar_transformation_creator import ColumnarTransformationCreator
+from processor.transformation_creator import TransformationCreator
+from benchmarks.transformation_benchmark import DATA_PATH, load_rows
+
+TRANSFORMATION = [
+    "traffic: mul(packet_size,sampling_rate)",
+    "ip_traffic: mul(ip_size,sampling_rate)",
+    "overhead: sub(packet_size,ip_size)",
+    "kbytes: mathdiv(mul(packet_size,sampling_rate),1024)",
+    "big: gt(packet_size,1000)"
+]
+
+
+def run(rows_count=200000):
+    with open(os.path.join(DATA_PATH, "config_data_structure.json")) as cfg:
+        data_structure = json.load(cfg)
+    with open(os.path.join(DATA_PATH, "config.json")) as cfg:
+        config = json.load(cfg)
+
+    parser = TransformationsParser(TRANSFORMATION)
+    parser.run()
+    operations = TransformationOperations(config)
+
+    sample = load_rows(data_structure)
+    rows = [sample[i % len(sample)] for i in range(rows_count)]
+
+    row_transformation = TransformationCreator(data_structure, parser.expanded_transformation,
+                                               operations).build_lambda()
+    partition_transformation = ColumnarTransformationCreator(data_structure, parser.expanded_transformation,
+                                                             operations).build_lambda()
+
+    row_time = min(timeit.repeat(lambda: [row_transformation(row) for row in rows], number=1, repeat=3))
+    columnar_time = min(timeit.repeat(lambda: partition_transformation(iter(rows)), number=1, repeat=3))
+
+    print("{:<10} {:>12.0f} rows/s".format("row", rows_count / row_time))
+    print("{:<10} {:>12.0f} rows/s".format("columnar", rows_count / columnar_time))
+    print("speedup: {:.2f}x".format(row_time / columnar_time))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
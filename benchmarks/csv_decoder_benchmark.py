@@ -0,0 +1,74 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of the csv decoder of the input stage against the former decoder built of nested
+map/lambda closures.
+
+Usage: python -m benchmarks.csv_decoder_benchmark [records]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+from pyspark.sql import types
+
+from input.csv_decoder import CsvDecoder
+from benchmarks.transformation_benchmark import DATA_PATH
+
+
+def type_to_func(type_field):
+    if type_field in (types.IntegerType(), types.LongType()):
+        return lambda x: int(x)
+    if type_field == types.BooleanType():
+        return lambda x: bool(x)
+    if type_field in (types.DoubleType(), types.FloatType()):
+        return lambda x: float(x)
+    return lambda x: x
+
+
+def closures_decoder(data_structure_pyspark):
+    list_conversion_function = list((map(lambda x: type_to_func(x.dataType), data_structure_pyspark)))
+    ranked_pointer = list(enumerate(list_conversion_function))
+    functions_list = list(map(lambda x: lambda list_string: x[1](list_string[x[0]]), ranked_pointer))
+    function_convert = lambda x: list(map(lambda func: func(x), functions_list))
+    return lambda lines: [function_convert(line.split(",")) for line in lines]
+
+
+def run(records_count=200000):
+    with open(os.path.join(DATA_PATH, "config_data_structure.json")) as cfg:
+        data_structure = json.load(cfg)
+    data_structure_pyspark = types.StructType(
+        list(map(lambda x: types.StructField(x[0], getattr(types, x[1]["type"])()),
+                 sorted(data_structure.items(), key=lambda x: x[1]["index"]))))
+
+    with open(os.path.join(DATA_PATH, "test.csv")) as data:
+        sample = [line.strip() for line in data]
+    lines = [sample[i % len(sample)] for i in range(records_count)]
+
+    decoders = (("closures", closures_decoder(data_structure_pyspark)),
+                ("compiled", CsvDecoder(data_structure_pyspark).build_partition_lambda()))
+    results = {}
+    for name, decode in decoders:
+        elapsed = min(timeit.repeat(lambda: list(decode(iter(lines))), number=1, repeat=3))
+        results[name] = elapsed
+        print("{:<10} {:>12.0f} records/s".format(name, records_count / elapsed))
+
+    print("speedup: {:.2f}x".format(results["closures"] / results["compiled"]))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
@@ -0,0 +1,69 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Benchmark of serialization of an aggregated partition for influxdb: the line protocol serializer against
+dictionaries of points serialized by influxdb-python.
+
+Usage: python -m benchmarks.line_protocol_benchmark [rows]
+"""
+
+import sys
+import timeit
+
+import nanotime
+from influxdb.line_protocol import make_lines
+
+from output.line_protocol import LineProtocolSerializer
+
+KEY_FIELDS = ["src_ip", "dst_ip"]
+FIELDS_MAPPING = {"traffic": 0, "packet_size": 1, "avg_packet_size": 2, "count": 3}
+
+
+def points_serializer(measurement, key_field, fields_mapping):
+    def serialize_partition(iterator):
+        points = []
+        for t in iterator:
+            tags = dict(map(lambda x, y: (x, y), key_field, t[0]))
+            value = t[1:]
+            fields = dict(map(lambda x: (x, value[fields_mapping[x]]), fields_mapping.keys()))
+            points.append({"measurement": measurement, "fields": fields,
+                           "time": nanotime.now().nanoseconds(), "tags": tags})
+        return make_lines({"points": points}).encode("utf-8")
+
+    return serialize_partition
+
+
+def line_protocol_serializer(measurement, key_field, fields_mapping):
+    serializer = LineProtocolSerializer(measurement, key_field, fields_mapping)
+    return lambda iterator: b"\n".join(serializer.serialize_partition(iterator, str(nanotime.now().nanoseconds())))
+
+
+def run(rows_count=100000):
+    rows = [(("10.0.{}.{}".format(x // 256 % 256, x % 256), "192.168.0.1"), x * 1500, 1500, 1500.5, x % 100)
+            for x in range(rows_count)]
+
+    serializers = (("points", points_serializer("points", KEY_FIELDS, FIELDS_MAPPING)),
+                   ("lines", line_protocol_serializer("points", KEY_FIELDS, FIELDS_MAPPING)))
+    results = {}
+    for name, serialize in serializers:
+        elapsed = min(timeit.repeat(lambda: serialize(iter(rows)), number=1, repeat=3))
+        results[name] = elapsed
+        print("{:<10} {:>12.0f} points/s".format(name, rows_count / elapsed))
+
+    print("speedup: {:.2f}x".format(results["points"] / results["lines"]))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,113 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Micro-benchmark of the per-row transformation lambda.
+
+Compares the compiled closures built by TransformationCreator with the former
+approach that re-walked the syntax tree for every row.
+
+Usage: python -m benchmarks.transformation_benchmark [rows]
+"""
+
+import json
+import os
+import sys
+import timeit
+
+from config_parsing.transformations_parser import TransformationsParser, FieldTransformation
+from operations.transformation_operations import TransformationOperations
+from processor.transformation_creator import TransformationCreator
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), "..", "test", "data")
+
+TRANSFORMATION = [
+    "src_ip",
+    "dst_ip",
+    "traffic: mul(packet_size,sampling_rate)",
+    "kbytes: mathdiv(mul(packet_size,sampling_rate),1024)",
+    "big: gt(packet_size,1000)",
+    "counter: one(timestamp)",
+    "source: concat('src - ',src_ip)"
+]
+
+
+class TreeWalkingCreator(TransformationCreator):
+    """
+    Reference implementation that walks the syntax tree for every row
+    """
+
+    def _generate_params_list(self, children, row):
+        args = []
+        for ch in children:
+            if isinstance(ch, str):
+                if ch.startswith(self.stringQuote) and ch.endswith(self.stringQuote):
+                    args.append(ch)
+                    continue
+                args.append(row[self.mapping[ch]] if ch in self.mapping.keys() else int(ch))
+            elif isinstance(ch, (bool, int, float)):
+                args.append(ch)
+            else:
+                operation = self.transformation_operations.operations_dict[ch.operation].func
+                args.append(operation(*self._generate_params_list(ch.children, row)))
+        return args
+
+    def _make_operation_lambda(self, syntax_tree):
+        operation = self.transformation_operations.operations_dict[syntax_tree.operation].func
+        return lambda row: operation(*self._generate_params_list(syntax_tree.children, row))
+
+    def build_lambda(self):
+        lambdas = []
+        for exp_tr in self.parsed_transformation:
+            if isinstance(exp_tr, FieldTransformation) and not isinstance(exp_tr.body, str):
+                lambdas.append(self._make_operation_lambda(exp_tr.body))
+            else:
+                name = exp_tr.body if isinstance(exp_tr, FieldTransformation) else exp_tr
+                lambdas.append(self._get_column_value_lambda(self.mapping[name]))
+        return lambda row: (tuple(map(lambda x: x(row), lambdas)))
+
+
+def load_rows(data_structure):
+    types = [None] * len(data_structure)
+    for field in data_structure.values():
+        types[field["index"]] = int if field["type"] in ("LongType", "IntegerType") else str
+    with open(os.path.join(DATA_PATH, "test.csv")) as data:
+        return [[types[i](value) for i, value in enumerate(line.strip().split(","))] for line in data]
+
+
+def run(rows_count=200000):
+    with open(os.path.join(DATA_PATH, "config_data_structure.json")) as cfg:
+        data_structure = json.load(cfg)
+    with open(os.path.join(DATA_PATH, "config.json")) as cfg:
+        config = json.load(cfg)
+
+    parser = TransformationsParser(TRANSFORMATION)
+    parser.run()
+    operations = TransformationOperations(config)
+
+    sample = load_rows(data_structure)
+    rows = [sample[i % len(sample)] for i in range(rows_count)]
+
+    results = {}
+    for name, creator_class in (("tree walking", TreeWalkingCreator), ("compiled", TransformationCreator)):
+        transformation = creator_class(data_structure, parser.expanded_transformation, operations).build_lambda()
+        elapsed = min(timeit.repeat(lambda: [transformation(row) for row in rows], number=1, repeat=3))
+        results[name] = elapsed
+        print("{:<14} {:>12.0f} rows/s".format(name, rows_count / elapsed))
+
+    print("speedup: {:.2f}x".format(results["tree walking"] / results["compiled"]))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
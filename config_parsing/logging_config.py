@@ -0,0 +1,39 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+
+LOG_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+DEFAULT_LOG_LEVEL = "INFO"
+
+
+def get_log_level(content):
+    """
+    Returns the log level of the processing section of the config content, statistics are logged at the info level
+    """
+    return content.get("processing", {}).get("log_level", DEFAULT_LOG_LEVEL)
+
+
+def configure_logging(level=DEFAULT_LOG_LEVEL):
+    """
+    Sets the level of the root logger of the process and adds a handler writing to stderr if the root logger doesn't
+    have one. main.py configures the driver, python workers of executors don't run it, so reports of executors
+    configure their process before logging.
+    """
+    root = logging.getLogger()
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(level)
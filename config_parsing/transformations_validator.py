@@ -24,10 +24,14 @@ class TransformationsValidator:
         self.current_fields = data_structure_pyspark
         self.transformation_operations = transformation_operations
         self.stringQuote = "'"
+        # names of input fields referenced by validated transformations
+        self.used_fields = set()
 
     def __get_field(self, field):
         try:
-            return self.current_fields[field]
+            struct_field = self.current_fields[field]
+            self.used_fields.add(field)
+            return struct_field
         except KeyError:
             raise errors.FieldNotExists(
                 "Field with name '{}' does not exists".format(field))
@@ -63,7 +67,16 @@ class TransformationsValidator:
             raise errors.IncorrectArgumentsAmountForOperationError(
                 "Operation '{}' expects {} arguments.".format(operation, operation.op_count))
 
-        return operation.result_type(list(map(lambda ch: self._validate_syntax_tree(ch), tree.children)))
+        return operation.tree_result_type(tree.children,
+                                          list(map(lambda ch: self._validate_syntax_tree(ch), tree.children)))
+
+    def syntax_tree_type(self, tree):
+        """
+        Validates a single node of a transformation
+        :param tree: syntax tree, field name or literal
+        :return: pyspark type of the node result
+        """
+        return self._validate_syntax_tree(tree)
 
     def validate(self, transformations):
         new_fields = []
@@ -12,6 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import logging
+
+from pyspark import RDD, StorageLevel
+
 from analysis.analysis_factory import AnalysisFactory
 from input.input_module import ReadFactory
 from output.writer_factory import WriterFactory
@@ -20,11 +24,19 @@ from processor.processor import Processor
 
 class Dispatcher:
     def __init__(self, config, file_config):
-        self.executor = ReadFactory(config, file_config).get_executor()
         self.processor = Processor(config)
+        self.executor = ReadFactory(config, file_config, self.processor.used_input_fields).get_executor()
         self.writers = WriterFactory().get_writers(config, self.processor.aggregation_output_struct,
                                                       self.processor.enumerate_output_aggregation_field)
         self._isAnalysis = False
+        # storage level of the processed rdd which is reused by every writer and analysis, None disables persistence
+        storage_level = config.content["processing"].get("storage_level", "MEMORY_ONLY")
+        self._storage_level = getattr(StorageLevel, storage_level) if storage_level else None
+        # accumulator of computations of partitions of the processed rdd
+        self._stage_runs = None
+        # all writers and analysis are run by one job which passes every partition to them
+        self._is_fused_sink = config.content["processing"].get("fused_sink", False)
+        self._fused_sink = None
 
         if "analysis" in config.content.keys():
             self._isAnalysis = True
@@ -46,13 +58,73 @@ class Dispatcher:
             analysis_lambda = lambda x: x
             pipeline = lambda rdd: self._all_pipeline(rdd, processor_part, write_func, analysis_lambda)
 
+        if self.processor.stream_processing:
+            self.executor.set_stream_processing(self.processor.stream_processing)
         self.executor.set_pipeline_processing(pipeline)
         self.executor.run_pipeline()
 
     def _all_pipeline(self, rdd, processor_part, write_part, analysis_part):
         processed = processor_part(rdd)
-        write_part(processed)
-        analysis_part(processed)
+        if not isinstance(processed, RDD):
+            write_part(processed)
+            analysis_part(processed)
+            return
+
+        processed = self._count_stage_runs(processed)
+        if self._is_fused_sink:
+            processed.foreachPartition(self._get_fused_sink(processed.context))
+            for writer in self.writers:
+                writer.report_statistics()
+            self._report_stage_runs(processed)
+            return
+
+        # every writer and analysis runs its own action, so the processed rdd is computed once and reused
+        persist = self._storage_level is not None and len(self.writers) + self._isAnalysis > 1
+        if persist:
+            processed.persist(self._storage_level)
+        try:
+            write_part(processed)
+            analysis_part(processed)
+        finally:
+            if persist:
+                processed.unpersist()
+        self._report_stage_runs(processed)
+
+    def _get_fused_sink(self, sc):
+        if self._fused_sink is None:
+            partition_funcs = [writer.get_partition_lambda(sc) for writer in self.writers]
+            if self._isAnalysis:
+                partition_funcs.append(self.analysis.get_partition_lambda())
+
+            def write_partition(iterator):
+                # records of the partition are read once and passed to every writer and analysis
+                records = list(iterator)
+                for partition_func in partition_funcs:
+                    partition_func(records)
+
+            self._fused_sink = write_partition
+        return self._fused_sink
+
+    def _count_stage_runs(self, processed):
+        if self._stage_runs is None:
+            self._stage_runs = processed.context.accumulator(0)
+        stage_runs = self._stage_runs
+
+        def count_run(iterator):
+            stage_runs.add(1)
+            return iterator
+
+        return processed.mapPartitions(count_run, preservesPartitioning=True)
+
+    def _report_stage_runs(self, processed):
+        # number of computations of the processing stage in the batch
+        runs = self._stage_runs.value / float(max(processed.getNumPartitions(), 1))
+        self._stage_runs.value = 0
+        logging.info("Processing stage ran %.1f times in the batch", runs)
+        return runs
 
     def stop_pipeline(self):
+        # batches processed by the graceful stop are the final writes of asynchronous writers
+        for writer in self.writers:
+            writer.stop()
         self.executor.stop_pipeline()
@@ -54,3 +54,7 @@ class KafkaConnectError(BaseException):
 
 class UnsupportedAnalysisFormat(BaseException):
     pass
+
+
+class LookupTableError(BaseException):
+    pass
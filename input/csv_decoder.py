@@ -0,0 +1,79 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+
+from pyspark.sql.types import IntegerType, LongType, ShortType, ByteType, FloatType, DoubleType, BooleanType, \
+    StringType
+
+# conversion of a string field to the value of data type, None means that the string is used as is
+CONVERSIONS = {
+    IntegerType(): "int",
+    LongType(): "int",
+    ShortType(): "int",
+    ByteType(): "int",
+    FloatType(): "float",
+    DoubleType(): "float",
+    BooleanType(): "bool",
+    StringType(): None
+}
+
+
+class CsvDecoder(object):
+    """
+    Decoder of csv records specialized for a data structure. The conversion of a split record is generated
+    as a single python expression once, so a record is decoded without a function call per field.
+    Fields which are not used by processing are not converted and are None in the record, so indexes of
+    the data structure stay valid.
+    """
+
+    def __init__(self, data_structure_pyspark, sep=",", used_fields=None):
+        """
+        :param data_structure_pyspark: StructType of the input records
+        :param sep: fields delimiter
+        :param used_fields: names of fields to decode, all fields are decoded if it isn't set
+        """
+        self._data_structure_pyspark = data_structure_pyspark
+        self._sep = sep
+        self._used_fields = set(used_fields) if used_fields is not None else set(data_structure_pyspark.names)
+
+    def _generate_source(self):
+        fields = []
+        for index, struct_field in enumerate(self._data_structure_pyspark):
+            if struct_field.name not in self._used_fields:
+                fields.append("None")
+                continue
+            conversion = CONVERSIONS[struct_field.dataType]
+            value = "fields[{}]".format(index)
+            fields.append("{}({})".format(conversion, value) if conversion else value)
+        return "lambda fields: [{}]".format(", ".join(fields))
+
+    def build_record_lambda(self):
+        """
+        :return: function that converts a list of string fields to the list of typed values
+        """
+        return eval(compile(self._generate_source(), "<csv_decoder>", "eval"), {"int": int, "float": float,
+                                                                               "bool": bool})
+
+    def build_partition_lambda(self):
+        """
+        :return: function that decodes an iterator over csv lines of a partition to an iterator over records
+        """
+        convert = self.build_record_lambda()
+        sep = self._sep
+
+        def decode_partition(lines):
+            return map(convert, csv.reader(lines, delimiter=sep))
+
+        return decode_partition
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 from errors.errors import ExecutorError
+from singelton.driver_function import DriverFunction
 
 
 class Executor:
@@ -38,9 +39,10 @@ class Executor:
         """
         print("Override me in child classes!")
 
-    def stop_pipeline(self):
+    def stop_pipeline(self, on_stopped=None):
         """
-        run_pipeline runs execution of pipeline actions on the data
+        stop_pipeline stops execution of pipeline actions on the data
+        :param on_stopped: function called after the last action, before the spark context is stopped
         :return: None
         """
         print("Override me in child classes!")
@@ -54,19 +56,46 @@ class Executor:
         """
         print("Override me in child classes!")
 
+    def set_stream_processing(self, transformation):
+        """
+        set_stream_processing sets the transformation of the whole stream, which is applied before the action
+        :param transformation: function Dstream -> Dstream
+        :return: None
+        """
+        raise ExecutorError("Error: processing of the stream is supported only for streaming input")
+
 
 class StreamingExecutor(Executor):
     """
     StreamingExecutor is a class for execution action with Dstream data
     """
 
+    def __init__(self, input_data, ssc=None, on_batch_completed=None):
+        """
+        Create StreamingExecutor
+        :param input_data: Dstream
+        :param ssc: StreamingContext of the Dstream
+        :param on_batch_completed: function of the batch time, called on the driver after the action of the batch
+        """
+        super().__init__(input_data, ssc)
+        self._on_batch_completed = on_batch_completed
+
     def run_pipeline(self):
         """
         run_pipeline runs execution of pipeline actions on the streaming data
         :return: None
         """
         if (self._action):
-            self._data.foreachRDD(self._action)
+            action, on_batch_completed = self._action, self._on_batch_completed
+
+            def run_batch(time, rdd):
+                action(rdd)
+                if on_batch_completed:
+                    on_batch_completed(time)
+
+            # the action holds the dispatcher and contexts, it is kept out of pickled checkpoints of the graph
+            run_batch = DriverFunction(run_batch)
+            self._data.foreachRDD(lambda time, rdd: run_batch(time, rdd))
         else:
             raise ExecutorError("Error: action and options don't set. Use set_pipeline_processing")
         self._ssc.start()
@@ -83,8 +112,19 @@ class StreamingExecutor(Executor):
         self._action = action
         self._options = options
 
-    def stop_pipeline(self):
-        self._ssc.stop(stopSparkContext=True, stopGraceFully=True)
+    def set_stream_processing(self, transformation):
+        """
+        set_stream_processing sets the transformation of the whole stream, e.g. aggregation over a window
+        :param transformation: function Dstream -> Dstream
+        :return: None
+        """
+        self._data = transformation(self._data)
+
+    def stop_pipeline(self, on_stopped=None):
+        self._ssc.stop(stopSparkContext=False, stopGraceFully=True)
+        if on_stopped:
+            on_stopped()
+        self._ssc.sparkContext.stop()
 
 
 class BatchExecutor(Executor):
@@ -112,5 +152,6 @@ class BatchExecutor(Executor):
         self._action = action
         self._options = options
 
-    def stop_pipeline(self):
-        pass
+    def stop_pipeline(self, on_stopped=None):
+        if on_stopped:
+            on_stopped()
@@ -15,36 +15,12 @@
 import json
 
 from pyspark.sql import SparkSession
-from pyspark.sql.types import *
 from pyspark.streaming import StreamingContext
 from errors.errors import InputError, KafkaConnectError
 from .executors import StreamingExecutor
-from pyspark.streaming.kafka import KafkaUtils
-
-string_to_int = lambda x: int(x)
-string_to_string = lambda x: x
-string_to_float = lambda x: float(x)
-string_to_boolean = lambda x: bool(x)
-
-
-def type_to_func(type_field):
-    if type_field == IntegerType():
-        return string_to_int
-
-    if type_field == BooleanType():
-        return string_to_boolean
-
-    if type_field == LongType():
-        return string_to_int
-
-    if type_field == StringType():
-        return string_to_string
-
-    if type_field == DoubleType():
-        return string_to_float
-
-    if type_field == FloatType():
-        return string_to_float
+from .kafka_offset_store import KafkaOffsetStore
+from .csv_decoder import CsvDecoder
+from pyspark.streaming.kafka import KafkaUtils, TopicAndPartition
 
 
 class InputConfig:
@@ -68,14 +44,17 @@ class ReadFactory():
     configuration/
     """
 
-    def __init__(self, input_config, file_config):
+    def __init__(self, input_config, file_config, used_fields=None):
         """
         Create ReadFactory with set config file
 
         :param input_config: A object of Config class with input options
+        :param used_fields: names of input fields used by processing, other fields are not decoded.
+        All fields are decoded if it isn't set
         """
         self._config = input_config
         self._file_config = file_config
+        self._used_fields = used_fields
 
     def get_executor(self):
         """
@@ -84,14 +63,14 @@ class ReadFactory():
         """
         if "input" in self._config.content.keys():
             if self._config.content["input"]["input_type"] == "kafka":
-                return KafkaStreaming(self._config, self._file_config).get_streaming_executor()
+                return KafkaStreaming(self._config, self._file_config, self._used_fields).get_streaming_executor()
             raise InputError("Error: {} unsuported input format. ReadFactory cannot create Executable".format(
                 self._config.content["input"]))
         raise InputError("Error: Some option was miss in config file. ReadFactory cannot create Executable")
 
 
 class KafkaStreaming(object):
-    def __init__(self, config, file_config):
+    def __init__(self, config, file_config, used_fields=None):
 
         self._server = config.content["input"]["options"]["server"]
         self._port = config.content["input"]["options"]["port"]
@@ -99,8 +78,14 @@ class KafkaStreaming(object):
         self._consumer_group = config.content["input"]["options"]["consumer_group"]
         self._batchDuration = config.content["input"]["options"]["batchDuration"]
         self._sep = config.content["input"]["options"]["sep"]
-
-        self._spark = SparkSession.builder.appName("StreamingDataKafka").getOrCreate()
+        self._mode = config.content["input"]["options"].get("mode", "receiver")
+        self._on_batch_completed = None
+
+        builder = SparkSession.builder.appName("StreamingDataKafka")
+        if "maxRatePerPartition" in config.content["input"]["options"]:
+            builder = builder.config("spark.streaming.kafka.maxRatePerPartition",
+                                     config.content["input"]["options"]["maxRatePerPartition"])
+        self._spark = builder.getOrCreate()
         sc = self._spark.sparkContext
 
         # database files registration
@@ -112,23 +97,53 @@ class KafkaStreaming(object):
 
         self._ssc = StreamingContext(sc, self._batchDuration)
 
-        list_conversion_function = list((map(lambda x: type_to_func(x.dataType), config.data_structure_pyspark)))
-        ranked_pointer = list(enumerate(list_conversion_function))
-        functions_list = list(map(lambda x: lambda list_string: x[1](list_string[x[0]]), ranked_pointer))
-        function_convert = lambda x: list(map(lambda func: func(x), functions_list))
+        decode_partition = CsvDecoder(config.data_structure_pyspark, self._sep, used_fields).build_partition_lambda()
         try:
-            dstream = KafkaUtils.createStream(
-                self._ssc,
-                "{0}:{1}".format(self._server, self._port),
-                self._consumer_group,
-                {self._topic: 1})
-            self._dstream = dstream.map(lambda x: function_convert(x[1].split(",")))
+            if self._mode == "direct":
+                dstream = self._create_direct_stream()
+            else:
+                dstream = KafkaUtils.createStream(
+                    self._ssc,
+                    "{0}:{1}".format(self._server, self._port),
+                    self._consumer_group,
+                    {self._topic: 1})
+            self._dstream = dstream.mapPartitions(lambda messages: decode_partition(map(lambda x: x[1], messages)))
         except:
             raise KafkaConnectError("Kafka error: Connection refused: server={} port={} consumer_group={} topic={}".
                                     format(self._server, self._port, self._consumer_group, self._topic))
 
+    def _create_direct_stream(self):
+        """
+        Creates a direct stream: every kafka partition is read by its own spark partition. The stream starts from
+        offsets committed by the consumer group, offsets of a batch are committed after its output stage.
+        """
+        offset_store = KafkaOffsetStore(self._server, self._port, self._consumer_group, self._topic)
+        from_offsets = dict(map(lambda x: (TopicAndPartition(self._topic, x[0]), x[1]), offset_store.read().items()))
+
+        dstream = KafkaUtils.createDirectStream(
+            self._ssc,
+            [self._topic],
+            {"metadata.broker.list": "{0}:{1}".format(self._server, self._port), "group.id": self._consumer_group},
+            fromOffsets=from_offsets if from_offsets else None)
+
+        # offset ranges are available only on KafkaRDD, so they are saved by batch time before conversion
+        offset_ranges = {}
+
+        def save_offset_ranges(time, rdd):
+            offset_ranges[time] = rdd.offsetRanges()
+            return rdd
+
+        def commit_offset_ranges(time):
+            # with a sliding window the output stage runs once per slide, so all batches up to time are committed
+            completed = sorted(filter(lambda x: x <= time, list(offset_ranges.keys())))
+            offset_store.commit([offset_range for batch_time in completed for offset_range in
+                                 offset_ranges.pop(batch_time)])
+
+        self._on_batch_completed = commit_offset_ranges
+        return dstream.transform(save_offset_ranges)
+
     def get_streaming_executor(self):
         """
             getExecutable return Executor object
         """
-        return StreamingExecutor(self._dstream, self._ssc)
+        return StreamingExecutor(self._dstream, self._ssc, self._on_batch_completed)
@@ -0,0 +1,60 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from kafka import KafkaConsumer
+from kafka.structs import TopicPartition, OffsetAndMetadata
+
+
+class KafkaOffsetStore(object):
+    """
+    Keeps offsets of the direct kafka stream in the consumer group. Offsets are committed by the driver
+    after the output stage of a batch, so a restarted application continues from the last processed batch.
+    """
+
+    def __init__(self, server, port, consumer_group, topic):
+        self._bootstrap_servers = "{0}:{1}".format(server, port)
+        self._consumer_group = consumer_group
+        self._topic = topic
+        self._consumer = None
+
+    def _get_consumer(self):
+        if self._consumer is None:
+            self._consumer = KafkaConsumer(bootstrap_servers=self._bootstrap_servers, group_id=self._consumer_group,
+                                           enable_auto_commit=False)
+        return self._consumer
+
+    def read(self):
+        """
+        Reads committed offsets of the consumer group. The direct stream reads only partitions passed in
+        fromOffsets, so offsets are returned only if they are committed for every partition of the topic.
+        :return: dictionary partition -> offset or empty dictionary
+        """
+        consumer = self._get_consumer()
+        offsets = {}
+        for partition in consumer.partitions_for_topic(self._topic) or []:
+            offset = consumer.committed(TopicPartition(self._topic, partition))
+            if offset is None:
+                return {}
+            offsets[partition] = offset
+        return offsets
+
+    def commit(self, offset_ranges):
+        """
+        Commits the end of offset ranges of a processed batch
+        :param offset_ranges: list of OffsetRange of the KafkaRDD
+        """
+        if offset_ranges:
+            self._get_consumer().commit(dict(
+                map(lambda x: (TopicPartition(x.topic, x.partition), OffsetAndMetadata(x.untilOffset, None)),
+                    offset_ranges)))
@@ -15,6 +15,7 @@
 import sys
 import logging
 from config_parsing.config import Config
+from config_parsing.logging_config import configure_logging, get_log_level
 from dispatcher.dispatcher import Dispatcher
 
 if __name__ == "__main__":
@@ -25,6 +26,7 @@ if __name__ == "__main__":
 
         path_to_config = sys.argv[1].strip()
         config = Config(path_to_config)
+        configure_logging(get_log_level(config.content))
         dispatcher = Dispatcher(config, path_to_config)
         dispatcher.run_pipeline()
         dispatcher.stop_pipeline()
@@ -13,13 +13,23 @@
 # limitations under the License.
 
 from pyspark.sql.types import *
+from pyspark.sql import functions as F
+
+from operations import sketches
 
 
 class ReduceOperation:
-    def __init__(self, name, function, supported_arg_types=[]):
+    def __init__(self, name, function, supported_arg_types=[], sql_function=None, inverse=None):
         self.name = name
         self.function = function
+        # function which removes the second argument from the result of function, None if it doesn't exist
+        self.inverse = inverse
         self.supported_arg_types = supported_arg_types
+        # aggregate function of Spark SQL, None if the operation is available only for RDD
+        self.sql_function = sql_function
+        # functions value -> state and state -> value, None if the state is the value itself
+        self.init = None
+        self.finalize = None
 
     def output_type(self, input_type):
         return input_type
@@ -34,6 +44,10 @@ class ReduceOperation:
                 FloatType(),
                 DoubleType()]
 
+    @classmethod
+    def all_types(cls):
+        return cls.std_scalar_math_types() + [StringType()]
+
     def is_type_compatible(self, input_type):
         try:
             self.supported_arg_types.index(input_type)
@@ -42,6 +56,30 @@ class ReduceOperation:
             return False
 
 
+class StateReduceOperation(ReduceOperation):
+    """
+    Aggregation with a mergeable state: every value is converted to a state by init, states are combined
+    by function and the result is computed from the state by finalize after aggregation.
+    """
+
+    def __init__(self, name, init, function, finalize, result_type, supported_arg_types=[], sql_function=None,
+                 inverse=None):
+        super().__init__(name, function, supported_arg_types, sql_function, inverse)
+        self.init = init
+        self.finalize = finalize
+        self.result_type = result_type
+
+    def output_type(self, input_type):
+        return self.result_type
+
+
+def _quantile_operation(name, quantile):
+    return StateReduceOperation(name, sketches.quantile_init, sketches.quantile_merge,
+                                lambda state: float(sketches.quantile_finalize(state, quantile)), DoubleType(),
+                                ReduceOperation.std_scalar_math_types(),
+                                lambda field: F.expr("percentile_approx(`{}`, {})".format(field, quantile)))
+
+
 class SupportedReduceOperations:
     def add(self, operation):
         self.operation[operation.name] = operation
@@ -52,7 +90,25 @@ class SupportedReduceOperations:
     def __init__(self):
         self.operation = {}
 
-        self.add(ReduceOperation("sum", lambda x, y: x + y, ReduceOperation.std_scalar_math_types()))
+        self.add(ReduceOperation("sum", lambda x, y: x + y, ReduceOperation.std_scalar_math_types(), F.sum,
+                                 lambda x, y: x - y))
         self.add(ReduceOperation("mul", lambda x, y: x * y, ReduceOperation.std_scalar_math_types()))
-        self.add(ReduceOperation("max", lambda x, y: y if x < y else x, ReduceOperation.std_scalar_math_types()))
-        self.add(ReduceOperation("min", lambda x, y: y if x > y else x, ReduceOperation.std_scalar_math_types()))
+        self.add(ReduceOperation("max", lambda x, y: y if x < y else x, ReduceOperation.std_scalar_math_types(),
+                                 F.max))
+        self.add(ReduceOperation("min", lambda x, y: y if x > y else x, ReduceOperation.std_scalar_math_types(),
+                                 F.min))
+
+        self.add(StateReduceOperation("count", lambda x: 1, lambda x, y: x + y, None, LongType(),
+                                      ReduceOperation.all_types(), F.count, lambda x, y: x - y))
+        self.add(StateReduceOperation("avg", sketches.average_init, sketches.average_merge,
+                                      sketches.average_finalize, DoubleType(),
+                                      ReduceOperation.std_scalar_math_types(), F.avg, sketches.average_inverse))
+        self.add(StateReduceOperation("count_distinct", sketches.hll_init, sketches.hll_merge,
+                                      sketches.hll_finalize, LongType(), ReduceOperation.all_types(),
+                                      F.approx_count_distinct))
+        self.add(_quantile_operation("median", 0.5))
+        self.add(_quantile_operation("p90", 0.9))
+        self.add(_quantile_operation("p95", 0.95))
+        self.add(_quantile_operation("p99", 0.99))
+        self.add(StateReduceOperation("top_k", sketches.top_k_init, sketches.top_k_merge, sketches.top_k_finalize,
+                                      StringType(), ReduceOperation.all_types()))
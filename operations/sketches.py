@@ -0,0 +1,175 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Mergeable states of aggregation functions. Every function has three parts:
+init (value of a row -> state), merge (state, state -> state) and finalize (state -> value).
+States are plain python containers with bounded size, so they are cheap to pickle between executors.
+Merge functions may change and return the first state.
+"""
+
+import hashlib
+import heapq
+import math
+import random
+from operator import itemgetter
+
+# average: (sum, count)
+
+
+def average_init(value):
+    return value, 1
+
+
+def average_merge(state1, state2):
+    return state1[0] + state2[0], state1[1] + state2[1]
+
+
+def average_inverse(state1, state2):
+    return state1[0] - state2[0], state1[1] - state2[1]
+
+
+def average_finalize(state):
+    return state[0] / float(state[1])
+
+
+# HyperLogLog: sparse dictionary register -> rank or dense bytearray of registers
+
+HLL_PRECISION = 12
+HLL_REGISTERS = 1 << HLL_PRECISION
+HLL_SPARSE_LIMIT = HLL_REGISTERS // 16
+HLL_ALPHA = 0.7213 / (1 + 1.079 / HLL_REGISTERS)
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.md5(str(value).encode("utf-8")).digest()[:8], "big")
+
+
+def hll_init(value):
+    hash_value = _hash64(value)
+    register = hash_value >> (64 - HLL_PRECISION)
+    rest = hash_value & ((1 << (64 - HLL_PRECISION)) - 1)
+    return {register: (64 - HLL_PRECISION) - rest.bit_length() + 1}
+
+
+def _hll_dense(registers):
+    dense = bytearray(HLL_REGISTERS)
+    for register, rank in registers.items():
+        dense[register] = rank
+    return dense
+
+
+def hll_merge(state1, state2):
+    if isinstance(state1, dict) and isinstance(state2, dict):
+        for register, rank in state2.items():
+            if state1.get(register, 0) < rank:
+                state1[register] = rank
+        return state1 if len(state1) <= HLL_SPARSE_LIMIT else _hll_dense(state1)
+
+    if isinstance(state1, dict):
+        state1, state2 = state2, state1
+    items = state2.items() if isinstance(state2, dict) else enumerate(state2)
+    for register, rank in items:
+        if state1[register] < rank:
+            state1[register] = rank
+    return state1
+
+
+def hll_finalize(state):
+    registers = _hll_dense(state) if isinstance(state, dict) else state
+    estimate = HLL_ALPHA * HLL_REGISTERS * HLL_REGISTERS / sum(math.ldexp(1.0, -rank) for rank in registers)
+    zeros = registers.count(0)
+    if estimate <= 2.5 * HLL_REGISTERS and zeros:
+        estimate = HLL_REGISTERS * math.log(HLL_REGISTERS / float(zeros))
+    return int(round(estimate))
+
+
+# KLL quantiles: list of levels, an item of level h has weight 2^h
+
+QUANTILE_CAPACITY = 256
+
+
+def quantile_init(value):
+    return [[value]]
+
+
+def quantile_merge(state1, state2):
+    for level, items in enumerate(state2):
+        if level < len(state1):
+            state1[level].extend(items)
+        else:
+            state1.append(list(items))
+
+    level = 0
+    while level < len(state1):
+        if len(state1[level]) > QUANTILE_CAPACITY:
+            items = sorted(state1[level])
+            state1[level] = [items.pop()] if len(items) % 2 else []
+            if level + 1 == len(state1):
+                state1.append([])
+            state1[level + 1].extend(items[random.randint(0, 1)::2])
+        level += 1
+    return state1
+
+
+def quantile_finalize(state, quantile):
+    weighted = sorted((item, 1 << level) for level, items in enumerate(state) for item in items)
+    rank = quantile * sum(map(itemgetter(1), weighted))
+    cumulative = 0
+    for item, weight in weighted:
+        cumulative += weight
+        if cumulative >= rank:
+            return item
+    return weighted[-1][0]
+
+
+# top-k with space-saving counters: dictionary item -> count of at most TOP_K_CAPACITY items. Counts are upper
+# bounds of frequencies with the error at most (number of values) / TOP_K_CAPACITY
+
+TOP_K = 10
+TOP_K_CAPACITY = 100
+
+
+def top_k_init(value):
+    return {value: 1}
+
+
+def _top_k_floor(state):
+    # an item missing in a full summary may have a count up to its minimal counter
+    return min(state.values()) if len(state) >= TOP_K_CAPACITY else 0
+
+
+def top_k_merge(state1, state2):
+    """
+    Merges space-saving summaries as mergeable summaries do: an item missing in one summary gets the minimal counter
+    of that summary, then only TOP_K_CAPACITY largest counters are kept. Merging a single value into a full summary
+    replaces the minimal counter with the new value and the minimal count plus one, as the space-saving stream update.
+    """
+    floor1, floor2 = _top_k_floor(state1), _top_k_floor(state2)
+    if floor2:
+        for item in state1:
+            if item not in state2:
+                state1[item] += floor2
+    for item, count in state2.items():
+        state1[item] = state1.get(item, floor1) + count
+    excess = len(state1) - TOP_K_CAPACITY
+    if excess > 0:
+        for item, _ in heapq.nsmallest(excess, state1.items(), key=itemgetter(1)):
+            del state1[item]
+    return state1
+
+
+def top_k_finalize(state):
+    return ",".join(map(lambda x: "{}:{}".format(x[0], x[1]), heapq.nlargest(TOP_K, state.items(),
+                                                                               key=itemgetter(1))))
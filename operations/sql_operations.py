@@ -0,0 +1,69 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pyspark.sql import functions as F
+from pyspark.sql.types import LongType, IntegerType, FloatType, DoubleType
+
+
+def _cast(data_type):
+    return lambda x: x.cast(data_type)
+
+
+class SqlOperations:
+    """
+    Spark SQL expressions for transformation operations. Every builder takes columns and returns a column,
+    so the transformation is evaluated by Catalyst in the JVM. Operations without a builder are wrapped
+    in a python udf with the result type from the validator.
+
+    odd, pydiv, mathdiv and boolean are left to the udf on purpose: SQL modulo keeps the sign of the dividend,
+    division by zero gives null instead of ZeroDivisionError and the cast of a string to boolean parses it,
+    while the row mode follows python semantics.
+    """
+
+    def add(self, name, builder):
+        self.builders_dict[name] = builder
+
+    def __init__(self, transformation_operations):
+        self.transformation_operations = transformation_operations
+        self.builders_dict = {}
+        self.add("id", lambda x: x)
+
+        self.add("add", lambda x, y: x + y)
+        self.add("sub", lambda x, y: x - y)
+        self.add("mul", lambda x, y: x * y)
+
+        self.add("lt", lambda x, y: x < y)
+        self.add("le", lambda x, y: x <= y)
+        self.add("gt", lambda x, y: x > y)
+        self.add("ge", lambda x, y: x >= y)
+        self.add("eq", lambda x, y: x == y)
+        self.add("neq", lambda x, y: x != y)
+        self.add("or", lambda x, y: x | y)
+        self.add("and", lambda x, y: x & y)
+        self.add("concat", lambda x, y: F.concat(x.cast("string"), y.cast("string")))
+        self.add("truncate", lambda x, length: x.substr(F.lit(1), length))
+
+        self.add("long", _cast(LongType()))
+        self.add("int", _cast(IntegerType()))
+        self.add("float", _cast(FloatType()))
+        self.add("double", _cast(DoubleType()))
+        self.add("not", lambda x: ~x)
+
+        self.add("one", lambda x: F.lit(1).cast(IntegerType()))
+
+    def get_builder(self, name, result_type):
+        builder = self.builders_dict.get(name)
+        if builder is None:
+            builder = F.udf(self.transformation_operations.operations_dict[name].func, result_type)
+        return builder
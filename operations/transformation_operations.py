@@ -14,7 +14,11 @@
 
 from pyspark.sql.types import *
 import inspect
+from config_parsing.logging_config import get_log_level
 from processor import config_operations
+from processor.geo_operations import GeoLookup
+from processor.cidr_operations import CidrLookup
+from processor.lookup_operations import LookupTables
 
 from errors import errors
 
@@ -34,6 +38,13 @@ class MapOperation(object):
     def result_type(self, arg_types=[]):
         raise NotImplemented("Should be implemented in concrete operation.")
 
+    def tree_result_type(self, children, arg_types):
+        """
+        Returns the result type for arguments of the syntax tree, operations which depend on literal arguments
+        override it
+        """
+        return self.result_type(arg_types)
+
     @staticmethod
     def get_larger_type(t=[]):
 
@@ -79,6 +90,15 @@ class GreatTypeCastedOperation(MapOperation):
         return self.get_larger_type(arg_types)
 
 
+class PyDiv(MapOperation):
+    def __init__(self):
+        super().__init__("pydiv", 2, lambda x, y: x / y)
+
+    def result_type(self, _=[]):
+        # python 3 division is always true division
+        return DoubleType()
+
+
 class MathDiv(MapOperation):
     def __init__(self):
         super().__init__("mathdiv", 2, lambda x, y: x / float(y))
@@ -168,6 +188,68 @@ class Truncate(MapOperation):
         return StringType()
 
 
+class GeoOperation(MapOperation):
+    """
+    Lookup of an ip address in a MaxMind database listed in the "databases" section, e.g. country(src_ip)
+    """
+
+    def __init__(self, name, path, cache_size, log_level):
+        super().__init__(name, 1, GeoLookup(name, path, cache_size, log_level=log_level))
+
+    def result_type(self, arg_types=[]):
+        if arg_types[0] != StringType():
+            raise errors.IncorrectArgumentTypeForOperationError(
+                "Argument of {} should be a string. Got {}".format(self.name, arg_types[0]))
+        return StringType()
+
+
+class CidrOperation(MapOperation):
+    """
+    Value of the network containing an ip address from a csv table "network,value" listed in the "databases"
+    section, e.g. cidr('customers', src_ip)
+    """
+
+    def __init__(self, databases):
+        super().__init__("cidr", 2, CidrLookup(databases))
+        self._databases = databases
+
+    def result_type(self, arg_types=[]):
+        if arg_types != [StringType(), StringType()]:
+            raise errors.IncorrectArgumentTypeForOperationError(
+                "Arguments of cidr should be a table name and a string address. Got {}".format(arg_types))
+        return StringType()
+
+    def tree_result_type(self, children, arg_types):
+        table = children[0]
+        if not isinstance(table, str) or not table.strip().startswith("'"):
+            raise errors.IncorrectArgumentTypeForOperationError(
+                "First argument of cidr should be a table name. Got {}".format(table))
+        if table.strip().strip("'") not in self._databases:
+            raise errors.LookupTableError("Table {} isn't listed in the databases section".format(table))
+        return self.result_type(arg_types)
+
+
+class LookupOperation(MapOperation):
+    """
+    Value of a key in a table listed in the "databases" section, e.g. lookup('sites', sensor_id). The result type is
+    the value type of the table
+    """
+
+    def __init__(self, databases):
+        super().__init__("lookup", 2, LookupTables(databases))
+
+    def tree_result_type(self, children, arg_types):
+        table = children[0]
+        if not isinstance(table, str) or not table.strip().startswith("'"):
+            raise errors.IncorrectArgumentTypeForOperationError(
+                "First argument of lookup should be a table name. Got {}".format(table))
+        _, key_type, value_type = self.func.get_table(table.strip().strip("'"))
+        if arg_types[1] != key_type:
+            raise errors.IncorrectArgumentTypeForOperationError(
+                "Key of lookup table {} should be {}. Got {}".format(table, key_type, arg_types[1]))
+        return value_type
+
+
 class TransformationOperations:
     def add(self, operation):
         self.operations_dict[operation.name] = operation
@@ -180,7 +262,7 @@ class TransformationOperations:
         self.add(GreatTypeCastedOperation("sub", 2, lambda x, y: x - y))
         self.add(GreatTypeCastedOperation("mul", 2, lambda x, y: x * y))
         self.add(GreatTypeCastedOperation("odd", 2, lambda x, y: x % y))
-        self.add(GreatTypeCastedOperation("pydiv", 2, lambda x, y: x / y))
+        self.add(PyDiv())
         self.add(MathDiv())
         self.add(EmptyOperation())
         self.add(ConfigOperation(config))
@@ -206,3 +288,13 @@ class TransformationOperations:
 
         self.add(Cast("one", IntegerType(), lambda x: 1))
         self.add(Truncate())
+
+        # geo operations are available for databases of the config
+        databases = config.get("databases", {}) if isinstance(config, dict) else {}
+        geo_cache_size = config.get("processing", {}).get("geo_cache_size", 100000) if isinstance(config, dict) else 0
+        for name in ("country", "city", "asn"):
+            if name in databases:
+                self.add(GeoOperation(name, databases[name], geo_cache_size, get_log_level(config)))
+        if databases:
+            self.add(CidrOperation(databases))
+            self.add(LookupOperation(databases))
@@ -0,0 +1,83 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+
+def _as_type(dtype):
+    return lambda x: np.asarray(x).astype(dtype)
+
+
+def _checked_division(kernel):
+    """
+    Numpy gives inf or nan for division by zero, the row functions raise ZeroDivisionError, so do the kernels
+    """
+    def divide(x, y):
+        if np.any(np.asarray(y) == 0):
+            raise ZeroDivisionError("division by zero")
+        return kernel(x, y)
+
+    return divide
+
+
+def _one(x):
+    return np.ones(np.shape(x), dtype=np.int64) if np.ndim(x) else 1
+
+
+class VectorizedOperations:
+    """
+    Column kernels for transformation operations. Every kernel takes numpy arrays (or scalars for literals)
+    and returns an array of results for the whole column. Operations without a kernel are applied element-wise
+    with the row function from TransformationOperations.
+    """
+
+    def add(self, name, kernel):
+        self.kernels_dict[name] = kernel
+
+    def __init__(self, transformation_operations):
+        self.transformation_operations = transformation_operations
+        self.kernels_dict = {}
+        self.add("id", lambda x: x)
+
+        self.add("add", np.add)
+        self.add("sub", np.subtract)
+        self.add("mul", np.multiply)
+        self.add("odd", _checked_division(np.mod))
+        self.add("pydiv", _checked_division(np.true_divide))
+        self.add("mathdiv", _checked_division(lambda x, y: np.true_divide(x, np.asarray(y, dtype=np.float64))))
+
+        self.add("lt", np.less)
+        self.add("le", np.less_equal)
+        self.add("gt", np.greater)
+        self.add("ge", np.greater_equal)
+        self.add("eq", np.equal)
+        self.add("neq", np.not_equal)
+        self.add("or", np.logical_or)
+        self.add("and", np.logical_and)
+
+        self.add("long", _as_type(np.int64))
+        self.add("int", _as_type(np.int64))
+        self.add("float", _as_type(np.float64))
+        self.add("double", _as_type(np.float64))
+        self.add("boolean", _as_type(np.bool_))
+        self.add("not", np.logical_not)
+
+        self.add("one", _one)
+
+    def get_kernel(self, name):
+        kernel = self.kernels_dict.get(name)
+        if kernel is None:
+            operation = self.transformation_operations.operations_dict[name]
+            kernel = np.frompyfunc(operation.func, operation.op_count, 1)
+        return kernel
@@ -0,0 +1,104 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from singelton.worker_cache import worker_cached
+
+
+class AsyncSink:
+    """
+    Bounded queue of writes flushed by background threads of the python worker process. A task of the output stage
+    puts its writes into the queue and finishes without waiting for the database, so writes overlap with the next
+    batch. If the queue is full, the task waits for a free place (backpressure), so the batch doesn't finish before
+    the database catches up and the input rate of the stream is limited. Every write has a future, so a task waits
+    only for its own writes.
+    Counters of the sink are local to the worker process, tasks send them to the driver by take_statistics().
+    """
+
+    def __init__(self, queue_size, threads=1):
+        self._queue = queue.Queue(queue_size)
+        # time in seconds which producers waited for a free place in the queue and number of failed writes
+        self.blocked_time = 0.0
+        self.failures = 0
+        # counters already taken by tasks
+        self._taken = (0, 0.0)
+        self._statistics_lock = threading.Lock()
+        for _ in range(threads):
+            thread = threading.Thread(target=self._flush_queue, daemon=True)
+            thread.start()
+
+    def _flush_queue(self):
+        while True:
+            future, function, args = self._queue.get()
+            try:
+                future.set_result(function(*args))
+            except Exception as e:
+                with self._statistics_lock:
+                    self.failures += 1
+                logging.exception("Asynchronous write failed")
+                future.set_exception(e)
+            finally:
+                self._queue.task_done()
+
+    def submit(self, function, *args):
+        """
+        Puts the write into the queue, waits for a free place if the queue is full
+        :return: future of the write
+        """
+        future = Future()
+        try:
+            self._queue.put_nowait((future, function, args))
+        except queue.Full:
+            started = time.time()
+            self._queue.put((future, function, args))
+            with self._statistics_lock:
+                self.blocked_time += time.time() - started
+        return future
+
+    def flush(self, timeout=None):
+        """
+        Waits until all writes of the queue are done
+        :param timeout: the longest wait in seconds, waits without limit if it isn't set
+        :return: True if the queue is empty, False if the timeout expired
+        """
+        if timeout is None:
+            self._queue.join()
+            return True
+        deadline = time.time() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def take_statistics(self):
+        """
+        Returns number of failed writes and blocked time in seconds since the previous call
+        """
+        with self._statistics_lock:
+            failures, blocked_time = self.failures - self._taken[0], self.blocked_time - self._taken[1]
+            self._taken = (self.failures, self.blocked_time)
+        return failures, blocked_time
+
+
+def get_sink(queue_size, threads=1):
+    return worker_cached(("async_sink", queue_size, threads), lambda: AsyncSink(queue_size, threads))
+
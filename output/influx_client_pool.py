@@ -0,0 +1,23 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from influxdb import InfluxDBClient
+
+from singelton.worker_cache import worker_cached
+
+
+def get_client(host, port, username, password, database):
+    # every task reuses the http session (keep-alive connections) of the client instead of a pickled client
+    return worker_cached(("influx_client", host, port, username, password, database),
+                         lambda: InfluxDBClient(host, port, username, password, database))
@@ -12,34 +12,210 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gzip
+import logging
+import time
+from concurrent.futures import wait
+
 import nanotime
+from influxdb.exceptions import InfluxDBServerError
+from influxdb.line_protocol import make_lines
 from pyspark import rdd
+from requests.exceptions import RequestException
 
-from collections import Iterable
+from collections.abc import Iterable
+from .async_sink import get_sink
+from .influx_client_pool import get_client
+from .line_protocol import LineProtocolSerializer
 from .output_writer import OutputWriter
 
 
 class InfluxWriter(OutputWriter):
-    def __init__(self, client, database, measurement, input_fields, enumerate_input_field):
+    def __init__(self, client, database, measurement, input_fields, enumerate_input_field, options=None):
         # name of output field. for example: max_packet_size, sum_traffic
         self.input_rule = input_fields["rule"]
         fields = enumerate_input_field
         self.client, self.measurement, self.fields = client, measurement, fields
+        self.database = database
         self.client.create_database(database)
 
-    def get_write_lambda(self):
+        # points of a partition are written by chunks of batch_size points, all points at once if it isn't set
+        options = options if options else {}
+        self.batch_size = options.get("batch_size")
+        self.gzip = options.get("gzip", False)
+        self.retries = options.get("retries", 0)
+        self.retry_backoff = options.get("retry_backoff", 0.5)
+        # in the asynchronous mode partitions are written by background threads of executors
+        self.use_async = options.get("async", False)
+        self.queue_size = options.get("queue_size", 100)
+        self.flush_threads = options.get("flush_threads", 1)
+        self.flush_timeout = options.get("flush_timeout", 1.0)
+        # set by stop(), read when tasks are serialized: partitions of the last batches are written synchronously
+        self._final_write = [False]
+        # executors take the client from the pool by connection options, the pickled client is used without them
+        self.connection = None
+        if all(option in options for option in ("host", "port", "username", "password")):
+            self.connection = (options["host"], options["port"], options["username"], options["password"], database)
+
+        # accumulators of written points, requests, time of requests in seconds, failed asynchronous writes and time
+        # in seconds which tasks waited for a free place in the queue of asynchronous writes
+        self._counters = None
+
+    def stop(self):
+        """
+        Makes writes of the next batches synchronous, must be called on the driver before the last batches run.
+        A task of the final write waits for queued writes of its python worker and writes its points itself.
+        """
+        self._final_write[0] = True
+
+    def _get_counters(self, sc):
+        if self._counters is None:
+            self._counters = (sc.accumulator(0), sc.accumulator(0), sc.accumulator(0.0), sc.accumulator(0),
+                              sc.accumulator(0.0))
+        return self._counters
+
+    def get_statistics(self):
+        """
+        Returns counters of writes from executors since the last report, must be called on the driver
+        :return: dictionary with number of written points, number of requests, total time of requests in seconds,
+        number of failed asynchronous writes and time in seconds which tasks waited for the queue of asynchronous writes
+        """
+        points, requests, write_time, failed_writes, blocked_time = map(lambda x: x.value, self._counters) \
+            if self._counters else (0, 0, 0.0, 0, 0.0)
+        return {"points": points, "requests": requests, "write_time": write_time, "failed_writes": failed_writes,
+                "blocked_time": blocked_time}
+
+    def _build_write_body(self):
+        """
+        Builds function (client, body) which sends bytes of line protocol to the write endpoint
+        """
+        database, use_gzip = self.database, self.gzip
+        headers = {"Content-Type": "application/octet-stream"}
+        if use_gzip:
+            headers["Content-Encoding"] = "gzip"
+
+        def write_body(client, body):
+            client.request(url="write", method="POST", params={"db": database},
+                           data=gzip.compress(body) if use_gzip else body, expected_response_code=204,
+                           headers=headers)
+
+        return write_body
+
+    def _build_write_points(self):
+        """
+        Builds function (client, points, counters) which writes dictionaries of points by chunks
+        """
+        use_gzip = self.gzip
+        write_body = self._build_write_body()
+
+        def write_chunk(client, points):
+            if not use_gzip:
+                return client.write_points(points)
+            write_body(client, make_lines({"points": points}).encode("utf-8"))
+
+        return self._build_chunked_write(write_chunk)
+
+    def _build_write_lines(self):
+        """
+        Builds function (client, lines, counters) which writes encoded lines of line protocol by chunks
+        """
+        write_body = self._build_write_body()
+        return self._build_chunked_write(lambda client, lines: write_body(client, b"\n".join(lines) + b"\n"))
+
+    def _build_chunked_write(self, write_chunk):
+        """
+        Builds function (client, items, counters) which writes items by chunks of batch_size items. A chunk is
+        retried with exponential backoff on server and connection errors.
+        """
+        batch_size, retries, retry_backoff = self.batch_size, self.retries, self.retry_backoff
+
+        def write_items(client, items, counters=None):
+            size = batch_size if batch_size else max(len(items), 1)
+            for start in range(0, len(items), size):
+                chunk = items[start:start + size]
+                for attempt in range(retries + 1):
+                    started = time.time()
+                    try:
+                        write_chunk(client, chunk)
+                        break
+                    except (InfluxDBServerError, RequestException):
+                        if attempt == retries:
+                            raise
+                        time.sleep(retry_backoff * 2 ** attempt)
+                    finally:
+                        if counters:
+                            counters[1].add(1)
+                            counters[2].add(time.time() - started)
+                if counters:
+                    counters[0].add(len(chunk))
+
+        return write_items
+
+    def _build_write_partition(self):
+        """
+        Builds function (iterator, counters) which writes aggregated rows (key, field_1,..field_n) of a partition
+        """
         client, fields_mapping, measurement = self.client, self.fields, self.measurement
         key_field = list(map(lambda x: x["input_field"], filter(lambda x: x["key"], self.input_rule)))
+        connection = self.connection
+        write_lines = self._build_write_lines()
+        serializer = LineProtocolSerializer(measurement, key_field, fields_mapping)
+
+        # the driver client isn't shipped to executors if they take clients from the pool
+        executor_client = None if connection else client
 
-        def make_points_from_partition(iterator):
-            points = []
-            for t in iterator:
-                tags = dict(map(lambda x, y: (x, y), key_field, t[0]))
-                value = t[1:]
-                fields = dict(map(lambda x: (x, value[fields_mapping[x]]), fields_mapping.keys()))
-                points.append({"measurement": measurement, "fields": fields,
-                               "time": nanotime.now().nanoseconds(), "tags": tags})
-            return points
+        use_async, queue_size, flush_threads, flush_timeout = self.use_async, self.queue_size, self.flush_threads, \
+                                                              self.flush_timeout
+
+        def write_partition(iterator, counters, final_write=False):
+            partition_client = get_client(*connection) if connection else executor_client
+            lines = serializer.serialize_partition(iterator, str(nanotime.now().nanoseconds()))
+            if not use_async:
+                write_lines(partition_client, lines, counters)
+                return
+
+            sink = get_sink(queue_size, flush_threads)
+            if final_write:
+                # forked python workers exit without atexit handlers, so writes of the worker still queued are
+                # finished before the points of the task are written
+                sink.flush()
+                write_lines(partition_client, lines, counters)
+            else:
+                # counters of background writes can't be sent with the result of the task, queued points are counted.
+                # The task waits for its own write at most flush_timeout seconds
+                future = sink.submit(write_lines, partition_client, lines)
+                counters[0].add(len(lines))
+                wait([future], flush_timeout)
+            failures, blocked_time = sink.take_statistics()
+            counters[3].add(failures)
+            counters[4].add(blocked_time)
+
+        return write_partition
+
+    def report_statistics(self):
+        statistics = self.get_statistics()
+        logging.info("Influx: %d points written by %d requests in %.3f s", statistics["points"],
+                     statistics["requests"], statistics["write_time"])
+        if self.use_async:
+            logging.info("Influx: %d asynchronous writes failed, tasks waited for the queue %.3f s",
+                         statistics["failed_writes"], statistics["blocked_time"])
+        # accumulators are totals of the application, they are reset to count the next batch
+        if self._counters:
+            for counter, zero in zip(self._counters, (0, 0, 0.0, 0, 0.0)):
+                counter.value = zero
+        return statistics
+
+    def get_partition_lambda(self, sc):
+        write_partition = self._build_write_partition()
+        counters = self._get_counters(sc)
+        final_write = self._final_write
+        return lambda iterator: write_partition(iterator, counters, final_write[0])
+
+    def get_write_lambda(self):
+        client, fields_mapping, measurement = self.client, self.fields, self.measurement
+        write_points = self._build_write_points()
+        write_partition = self._build_write_partition()
+        final_write = self._final_write
 
         def make_points_from_tuple_or_number(object):
             t = object if isinstance(object, Iterable) else [object]  # tuple or number
@@ -50,9 +226,10 @@ class InfluxWriter(OutputWriter):
 
         def run_necessary_lambda(rdd_or_object):
             if isinstance(rdd_or_object, rdd.RDD):
-                return (lambda rdd: rdd.foreachPartition(
-                    lambda iterator: client.write_points(make_points_from_partition(iterator))))(rdd_or_object)
+                counters = self._get_counters(rdd_or_object.context)
+                rdd_or_object.foreachPartition(lambda iterator: write_partition(iterator, counters, final_write[0]))
+                self.report_statistics()
             else:
-                return (lambda object: client.write_points(make_points_from_tuple_or_number(object)))(rdd_or_object)
+                write_points(client, make_points_from_tuple_or_number(rdd_or_object))
 
         return lambda rdd_or_object: run_necessary_lambda(rdd_or_object)
@@ -0,0 +1,112 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numbers
+
+_KEY_ESCAPES = str.maketrans({"\\": "\\\\", " ": "\\ ", ",": "\\,", "=": "\\=", "\n": "\\n"})
+_MEASUREMENT_ESCAPES = str.maketrans({"\\": "\\\\", " ": "\\ ", ",": "\\,", "\n": "\\n"})
+_STRING_ESCAPES = str.maketrans({"\\": "\\\\", "\"": "\\\"", "\n": "\\n"})
+
+
+def _format_bool(value):
+    return "true" if value else "false"
+
+
+def _format_int(value):
+    return "%di" % value
+
+
+def _format_float(value):
+    return repr(float(value))
+
+
+def _format_string(value):
+    return "\"" + str(value).translate(_STRING_ESCAPES) + "\""
+
+
+def _find_formatter(value_type):
+    if issubclass(value_type, bool):
+        return _format_bool
+    if issubclass(value_type, numbers.Integral):
+        return _format_int
+    if issubclass(value_type, numbers.Real):
+        return _format_float
+    return _format_string
+
+
+class LineProtocolSerializer:
+    """
+    Serializes aggregated rows (key, field_1,..field_n) to the line protocol of influxdb without intermediate
+    points. The escaped measurement, tag keys and field keys are prepared once, tags and fields are sorted by key
+    as influxdb-python does. Values None and empty tags are skipped like in influxdb-python.
+    """
+
+    def __init__(self, measurement, tag_keys, fields_mapping):
+        self._measurement = measurement.translate(_MEASUREMENT_ESCAPES)
+        # (",tag_key=", index of the tag in the key)
+        self._tags = [("," + key.translate(_KEY_ESCAPES) + "=", index)
+                      for key, index in sorted(map(lambda x: (x[1], x[0]), enumerate(tag_keys)))]
+        # ("field_key=", index of the field in the value)
+        self._fields = [(key.translate(_KEY_ESCAPES) + "=", index) for key, index in sorted(fields_mapping.items())]
+        # type of value -> function value -> string
+        self._formatters = {bool: _format_bool, int: _format_int, float: _format_float, str: _format_string}
+
+    def serialize_row(self, key, value, timestamp):
+        """
+        Serializes one row to a line without the line break
+        :param key: tuple of tag values
+        :param value: sequence of field values
+        :param timestamp: string with the time in nanoseconds
+        :return: line or None if the row doesn't have fields
+        """
+        formatters = self._formatters
+        parts = [self._measurement]
+        for prefix, index in self._tags:
+            tag = key[index]
+            if tag is not None and tag != "":
+                parts.append(prefix)
+                parts.append(str(tag).translate(_KEY_ESCAPES))
+
+        separator = " "
+        for prefix, index in self._fields:
+            field = value[index]
+            if field is None:
+                continue
+            formatter = formatters.get(type(field))
+            if formatter is None:
+                formatter = formatters[type(field)] = _find_formatter(type(field))
+            parts.append(separator)
+            parts.append(prefix)
+            parts.append(formatter(field))
+            separator = ","
+
+        if separator == " ":
+            return None
+        parts.append(" ")
+        parts.append(timestamp)
+        return "".join(parts)
+
+    def serialize_partition(self, iterator, timestamp):
+        """
+        Serializes rows (key, field_1,..field_n) of a partition. Keys of rows in a partition are unique after
+        aggregation, so all points of the partition have the same time.
+        :return: list of encoded lines
+        """
+        serialize_row = self.serialize_row
+        lines = []
+        for row in iterator:
+            line = serialize_row(row[0], row[1:], timestamp)
+            if line is not None:
+                lines.append(line.encode("utf-8"))
+        return lines
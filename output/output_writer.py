@@ -14,4 +14,23 @@
 
 class OutputWriter:
     def get_write_lambda(self):
-        raise NotImplementedError("Write method should be overrided!")
\ No newline at end of file
+        raise NotImplementedError("Write method should be overrided!")
+
+    def get_partition_lambda(self, sc):
+        """
+        Returns function which writes records of a partition on an executor, the function is used by the fused sink
+        :param sc: SparkContext
+        """
+        raise NotImplementedError("Partition write method should be overrided!")
+
+    def report_statistics(self):
+        """
+        Logs statistics of writes of the batch and resets them, called on the driver after every batch
+        """
+        pass
+
+    def stop(self):
+        """
+        Prepares the final writes, called on the driver before the last batches of the application run
+        """
+        pass
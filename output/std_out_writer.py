@@ -12,22 +12,70 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import itertools
+import random
+
 import pyspark
 
+from errors import errors
 from .output_writer import OutputWriter
 
 
 class StdOutWriter(OutputWriter):
-    def __init__(self):
-        pass
+    """
+    Prints results to stdout without collecting the whole rdd on the driver. Modes of printing an rdd:
+    "page" - all records are fetched by toLocalIterator, the driver keeps one partition at a time;
+    "take" - the first "limit" records;
+    "sample" - at most "limit" records of a random sample of "fraction" of records;
+    "partition" - every partition is printed by its executor.
+    """
+    MODES = ("page", "take", "sample", "partition")
+
+    def __init__(self, options=None):
+        options = options if options else {}
+        self.mode = options.get("mode", "page")
+        self.limit = options.get("limit", 100)
+        self.fraction = options.get("fraction", 0.01)
+        # number of records between separators in the "page" mode
+        self.page_size = options.get("page_size", 1000)
+        if self.mode not in self.MODES:
+            raise errors.UnsupportedOutputFormat("Stdout mode {} not supported".format(self.mode))
+
+    def _print_rdd(self, rdd):
+        if self.mode == "partition":
+            rdd.foreachPartition(self.get_partition_lambda(rdd.context))
+        elif self.mode == "take":
+            for record in rdd.take(self.limit):
+                print(record)
+        elif self.mode == "sample":
+            for record in rdd.sample(False, self.fraction).take(self.limit):
+                print(record)
+        else:
+            for number, record in enumerate(rdd.toLocalIterator()):
+                if number and number % self.page_size == 0:
+                    print('- - - - - - - - - - - - - -')
+                print(record)
 
     def get_write_lambda(self):
         def print_result(rdd_or_object):
             print('---------------------------')
             if isinstance(rdd_or_object, pyspark.rdd.RDD):
-                for field in rdd_or_object.collect():
-                    print(field)
+                self._print_rdd(rdd_or_object)
             else:
                 print(rdd_or_object)
 
         return print_result
+
+    def get_partition_lambda(self, sc):
+        # "take" and "sample" limit printed records of every partition
+        mode, limit, fraction = self.mode, self.limit, self.fraction
+
+        def print_partition(iterator):
+            if mode == "take":
+                iterator = itertools.islice(iterator, limit)
+            elif mode == "sample":
+                iterator = itertools.islice(filter(lambda x: random.random() < fraction, iterator), limit)
+            for record in iterator:
+                print(record)
+
+        return print_partition
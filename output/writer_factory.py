@@ -26,8 +26,8 @@ class WriterFactory:
         if output["method"] == "influx":
             conf = output["options"]["influx"]    
             client = InfluxDBClient(conf["host"], conf["port"], conf["username"], conf["password"], conf["database"])
-            return InfluxWriter(client, conf["database"], conf["measurement"], struct, enumerate_input_field)
+            return InfluxWriter(client, conf["database"], conf["measurement"], struct, enumerate_input_field, conf)
         elif output["method"] == "stdout":
-            return StdOutWriter()
+            return StdOutWriter(output.get("options"))
 
         raise errors.UnsupportedOutputFormat("Format {} not supported".format(output["method"]))
@@ -13,8 +13,45 @@
 # limitations under the License.
 
 import copy
+import logging
+import operator
+import math
+import pickle
+import random
+import time
+from functools import reduce
 from config_parsing.aggregations_parser import AggregationsParser
+from errors.errors import NotValidAggregationExpression
 from operations.aggregation_operations import SupportedReduceOperations
+from singelton.driver_function import DriverFunction
+
+# number of state entries pickled to estimate the size of the state
+STATE_SAMPLE_SIZE = 1000
+
+
+def measure_state(rdd):
+    """
+    Counts entries of the rdd and estimates their pickled size by one job: every partition keeps a uniform sample
+    of its entries (reservoir sampling), the size of a partition is its count multiplied by the mean size of the sample
+    :return: (number of entries, estimated size in bytes)
+    """
+    sample_size = int(math.ceil(STATE_SAMPLE_SIZE / float(max(rdd.getNumPartitions(), 1))))
+
+    def measure_partition(iterator):
+        count, sample = 0, []
+        for entry in iterator:
+            count += 1
+            if len(sample) < sample_size:
+                sample.append(entry)
+            else:
+                index = random.randrange(count)
+                if index < sample_size:
+                    sample[index] = entry
+        sizes = [len(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL)) for entry in sample]
+        return [(count, sum(sizes) * count / float(len(sizes)) if sizes else 0.0)]
+
+    measures = rdd.mapPartitions(measure_partition).collect()
+    return sum(map(lambda x: x[0], measures)), int(sum(map(lambda x: x[1], measures)))
 
 
 class AggregationProcessor:
@@ -42,8 +79,35 @@ class AggregationProcessor:
 
         self._field_to_func_name = {(field["input_field"]): (field["func_name"]) for field in
                                     aggregation_data["rule"]}
+        self._partial_aggregation = config_processor.content["processing"]["aggregations"].get(
+            "partial_aggregation", False)
+        # length and slide interval of the window in seconds, the window is disabled by default
+        self._window = config_processor.content["processing"]["aggregations"].get("window")
+        self._slide = config_processor.content["processing"]["aggregations"].get("slide")
+        # cumulative aggregation across batches, keys without updates during state_timeout seconds are removed
+        self._stateful = config_processor.content["processing"]["aggregations"].get("stateful", False)
+        self._state_timeout = config_processor.content["processing"]["aggregations"].get("state_timeout")
+        self._checkpoint_directory = config_processor.content["processing"]["aggregations"].get(
+            "checkpoint_directory", "checkpoint")
+        if self._stateful and self._window is not None:
+            raise NotValidAggregationExpression("Stateful aggregation can't be used with window")
+        # the state is measured every state_report_interval batches, 0 disables measurements
+        self._state_report_interval = config_processor.content["processing"]["aggregations"].get(
+            "state_report_interval", 10)
+        self._state_batches = 0
+        # number of keys and estimated size of the state in bytes measured by the last report
+        self._state_size = None
         self._enumerate_output_field = dict(map(lambda x: (x[1], x[0]), enumerate(self._input_field_name)))
 
+        # functions of operations with state, None for operations which aggregate values directly
+        self._init_functions = [self.operations[self._field_to_func_name[field]].init
+                                for field in self._input_field_name]
+        self._finalize_functions = [self.operations[self._field_to_func_name[field]].finalize
+                                    for field in self._input_field_name]
+
+    def is_stream_aggregation(self):
+        return self._window is not None or self._stateful
+
     def get_enumerate_field(self):
         return self._enumerate_output_field
 
@@ -54,13 +118,28 @@ class AggregationProcessor:
     def _build_separate_key_lambda(self):
         num_field = [self._input_data_structure.names.index(field) for field in self._input_field_name]
         lambdas_key = list(map(lambda x: lambda row: row[x[0]], self.key_data))
-        lambdas_field = list(map(lambda x: lambda row: row[x], num_field))
+        lambdas_field = list(map(lambda x: (lambda row: row[x[0]]) if x[1] is None else (lambda row: x[1](row[x[0]])),
+                                 zip(num_field, self._init_functions)))
         return lambda row: (tuple(map(lambda x: x(row), lambdas_key)),
                             tuple(map(lambda x: x(row), lambdas_field)))
 
+    # aggregated fields (field_1,..field_n) -> final values of states
+    def _build_finalize_lambda(self):
+        ranked_finalize = [(number, finalize) for number, finalize in enumerate(self._finalize_functions)
+                           if finalize is not None]
+
+        def finalize_fields(fields):
+            fields = list(fields)
+            for number, finalize in ranked_finalize:
+                fields[number] = finalize(fields[number])
+            return fields
+
+        return finalize_fields if ranked_finalize else list
+
     # input row: (key, (field_1,..field_n)) -> (key,field_1,..,field_n)
     def _bulid_postprocessing_lambda(self):
-        postprocessing = lambda row: tuple([row[0]] + list(row[1]))
+        finalize_fields = self._build_finalize_lambda()
+        postprocessing = lambda row: tuple([row[0]] + finalize_fields(row[1]))
         return lambda rdd: rdd.map(postprocessing)
 
     # apply separate key lambda to rdd
@@ -68,6 +147,37 @@ class AggregationProcessor:
         separate_key_lambda = self._build_separate_key_lambda()
         return lambda rdd: rdd.map(separate_key_lambda)
 
+    # (field_1,..,key,..field_n) -> (key, (field_1,..field_n)) with one record per key in a partition
+    def _build_partial_aggregation_lambda(self):
+        key_indexes = [index for index, _ in self.key_data]
+        field_indexes = [self._input_data_structure.names.index(field) for field in self._input_field_name]
+        init_functions = self._init_functions
+        # (accumulator_number, field_index, function, init)
+        ranked_functions = [(number, field_indexes[number], self.operations[self._field_to_func_name[field]].function,
+                             init_functions[number]) for number, field in enumerate(self._input_field_name)]
+
+        def aggregate_partition(iterator):
+            # key -> mutable list of accumulators
+            accumulators = {}
+            for row in iterator:
+                key = tuple([row[index] for index in key_indexes])
+                accumulator = accumulators.get(key)
+                if accumulator is None:
+                    accumulators[key] = [row[index] if init is None else init(row[index])
+                                         for _, index, _, init in ranked_functions]
+                else:
+                    for number, index, function, init in ranked_functions:
+                        accumulator[number] = function(accumulator[number],
+                                                       row[index] if init is None else init(row[index]))
+            return map(lambda x: (x[0], tuple(x[1])), accumulators.items())
+
+        return aggregate_partition
+
+    # apply partial aggregation to rdd
+    def _get_partial_aggregation_lambda(self):
+        partial_aggregation_lambda = self._build_partial_aggregation_lambda()
+        return lambda rdd: rdd.mapPartitions(partial_aggregation_lambda)
+
     # apply aggregation to rdd
     def _make_reduce_by_key_aggregation(self):
         aggregation = self.build_aggregation_lambda()
@@ -86,11 +196,161 @@ class AggregationProcessor:
 
     def get_aggregation_lambda(self):
         if self.key_data:
-            separator = self._get_separate_key_lambda()
+            if self._partial_aggregation:
+                separator = self._get_partial_aggregation_lambda()
+            else:
+                separator = self._get_separate_key_lambda()
             aggregation = self._make_reduce_by_key_aggregation()
             postprocessing = self._bulid_postprocessing_lambda()
             return lambda rdd: postprocessing(aggregation(separator(rdd)))
 
         aggregation = self.build_aggregation_lambda()
+        if any(init is not None for init in self._init_functions):
+            ranked_init = list(enumerate(self._init_functions))
+            init_row = lambda row: tuple([value if init is None else init(value)
+                                          for value, (_, init) in zip(row, ranked_init)])
+            finalize_fields = self._build_finalize_lambda()
+            return lambda rdd: tuple(finalize_fields(rdd.map(init_row).reduce(aggregation))) \
+                if not rdd.isEmpty() else rdd
+
         return lambda rdd: rdd.reduce(aggregation) if not rdd.isEmpty() else rdd
         # return lambda rdd: rdd.reduce(aggregation)
+
+    def get_sql_aggregation_lambda(self):
+        """
+        Builds aggregation of a DataFrame with Spark SQL aggregate functions. The result has the same shape as
+        the result of get_aggregation_lambda: rdd of (key, field_1,..field_n) for reduceByKey and a tuple for reduce.
+        """
+        sql_functions = []
+        for field in self._input_field_name:
+            func_name = self._field_to_func_name[field]
+            if self.operations[func_name].sql_function is None:
+                raise NotValidAggregationExpression(
+                    "Function {} is not supported by the sql processing mode".format(func_name))
+            sql_functions.append((field, self.operations[func_name].sql_function))
+        key_names = [key_struct["input_field"] for _, key_struct in self.key_data]
+        key_count = len(key_names)
+
+        def aggregate(dataframe):
+            columns = [func(field).alias(field) for field, func in sql_functions]
+            return dataframe.groupBy(*key_names).agg(*columns) if key_names else dataframe.agg(*columns)
+
+        if self.key_data:
+            postprocessing = lambda row: tuple([tuple(row[:key_count])] + list(row[key_count:]))
+            return lambda dataframe: aggregate(dataframe).rdd.map(postprocessing)
+
+        return lambda dataframe: tuple(aggregate(dataframe).first()) if not dataframe.rdd.isEmpty() else dataframe.rdd
+
+    def get_stream_aggregation_lambda(self):
+        """
+        Builds aggregation of a DStream across batches: window or stateful aggregation
+        """
+        if self._stateful:
+            return self.get_stateful_aggregation_lambda()
+        return self.get_window_aggregation_lambda()
+
+    def get_window_aggregation_lambda(self):
+        """
+        Builds aggregation of a DStream over a sliding window: dstream of (field_1,..,key,..field_n) ->
+        dstream of (key, (field_1,..field_n)) with states of the window. Every batch is aggregated once. If all
+        operations have an inverse function, the window is updated with values of the new batch and values of the
+        batch that left the window are subtracted, otherwise the aggregated batches of the window are merged.
+        """
+        if self._partial_aggregation:
+            separator = self._get_partial_aggregation_lambda()
+        else:
+            separator = self._get_separate_key_lambda()
+        window, slide, checkpoint_directory = self._window, self._slide, self._checkpoint_directory
+        operations = [self.operations[self._field_to_func_name[field]] for field in self._input_field_name]
+
+        if any(operation.inverse is None for operation in operations):
+            aggregation = self.build_aggregation_lambda()
+            return lambda dstream: dstream.transform(separator).reduceByKeyAndWindow(aggregation, None, window, slide)
+
+        # the last field counts records of a key in the window, keys without records are removed from the window
+        functions = [operation.function for operation in operations] + [operator.add]
+        inverse_functions = [operation.inverse for operation in operations] + [operator.sub]
+        aggregation = lambda row1, row2: tuple([function(x, y) for function, x, y in zip(functions, row1, row2)])
+        inverse = lambda row1, row2: tuple([function(x, y) for function, x, y in zip(inverse_functions, row1, row2)])
+
+        def aggregate(dstream):
+            # the inverse reduce keeps the window as a state of the stream, so it requires checkpointing
+            dstream.context().checkpoint(checkpoint_directory)
+            return dstream.transform(separator) \
+                .mapValues(lambda fields: fields + (1,)) \
+                .reduceByKeyAndWindow(aggregation, inverse, window, slide, filterFunc=lambda x: x[1][-1] > 0) \
+                .mapValues(lambda fields: fields[:-1])
+
+        return aggregate
+
+    def get_stateful_aggregation_lambda(self):
+        """
+        Builds cumulative aggregation of a DStream: dstream of (field_1,..,key,..field_n) -> dstream of
+        (key, (field_1,..field_n)) with states of keys updated in the batch. Every batch is aggregated and merged
+        with the state of keys, the state is checkpointed.
+        """
+        if self._partial_aggregation:
+            separator = self._get_partial_aggregation_lambda()
+        else:
+            separator = self._get_separate_key_lambda()
+        aggregation = self.build_aggregation_lambda()
+        timeout, checkpoint_directory = self._state_timeout, self._checkpoint_directory
+        # the processor is kept out of pickled checkpoints of the graph
+        report_state = DriverFunction(self._report_state)
+
+        def aggregate(dstream):
+            dstream.context().checkpoint(checkpoint_directory)
+
+            # state of a key: (fields, time of the last update, is updated in the batch)
+            def update_state(values, state):
+                now = time.time()
+                if values:
+                    fields = reduce(aggregation, values if state is None else [state[0]] + list(values))
+                    state = (fields, now, True)
+                elif timeout is not None and now - state[1] > timeout:
+                    return None
+                else:
+                    state = (state[0], state[1], False)
+                return state
+
+            state = dstream.transform(separator) \
+                .reduceByKey(aggregation) \
+                .updateStateByKey(update_state)
+            # the output operation is registered before outputs of the pipeline, so they reuse the cached state
+            if self._state_report_interval:
+                state.foreachRDD(lambda rdd: report_state(rdd))
+            return state \
+                .filter(lambda x: x[1][2]) \
+                .mapValues(lambda state: state[0])
+
+        return aggregate
+
+    def _report_state(self, rdd):
+        """
+        Measures the state rdd every state_report_interval batches, runs on the driver
+        """
+        self._state_batches += 1
+        if self._state_batches % self._state_report_interval:
+            return
+        self._state_size = measure_state(rdd)
+        logging.info("Aggregation state: %d keys, %d bytes", self._state_size[0], self._state_size[1])
+
+    def get_state_size(self):
+        """
+        Returns the size of the state of the stateful aggregation measured by the last batch. Must be called on the
+        driver.
+        :return: (number of keys, estimated size of the pickled state in bytes) or None if the aggregation doesn't have
+        state
+        """
+        return self._state_size
+
+    def get_stream_postprocessing_lambda(self):
+        """
+        Builds the last step of the stream aggregation for rdd of a batch: the result has the same shape as the
+        result of get_aggregation_lambda.
+        """
+        postprocessing = self._bulid_postprocessing_lambda()
+        if not self.key_data:
+            finalize_fields = self._build_finalize_lambda()
+            postprocessing = lambda rdd: tuple(finalize_fields(rdd.first()[1])) if not rdd.isEmpty() else rdd
+        return postprocessing
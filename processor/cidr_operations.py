@@ -0,0 +1,136 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+import socket
+import struct
+from array import array
+from bisect import bisect_right
+
+from processor.geo_operations import resolve_path
+from singelton.worker_cache import worker_cached
+
+UNKNOWN = "unknown"
+
+
+def ip_to_int(ip_addr):
+    return struct.unpack("!I", socket.inet_aton(ip_addr))[0]
+
+
+def parse_network(network):
+    """
+    Returns the first and the last address of the ipv4 network "a.b.c.d/len" as integers
+    """
+    address, _, length = network.partition("/")
+    length = int(length) if length else 32
+    if not 0 <= length <= 32:
+        raise ValueError("Incorrect prefix length in {}".format(network))
+    mask = (0xFFFFFFFF << (32 - length)) & 0xFFFFFFFF
+    start = ip_to_int(address) & mask
+    return start, start | (~mask & 0xFFFFFFFF)
+
+
+class CidrIndex:
+    """
+    Sorted disjoint address intervals with values. Nested networks are split, so an address in several networks gets
+    the value of the most specific one. A lookup is a binary search over the array of interval starts.
+    """
+
+    def __init__(self, networks):
+        """
+        :param networks: iterable of (network "a.b.c.d/len", value)
+        """
+        values, value_ids = [], {}
+        intervals = []
+        for network, value in networks:
+            start, end = parse_network(network)
+            if value not in value_ids:
+                value_ids[value] = len(values)
+                values.append(value)
+            intervals.append((start, end, value_ids[value]))
+
+        self._starts, self._ends, self._value_ids = array("I"), array("I"), array("I")
+        self._values = values
+        self._split_nested(sorted(intervals, key=lambda x: (x[0], -x[1])))
+
+    def _add(self, start, end, value_id):
+        if start <= end:
+            self._starts.append(start)
+            self._ends.append(end)
+            self._value_ids.append(value_id)
+
+    def _split_nested(self, intervals):
+        # enclosing intervals are kept on the stack, an interval covers addresses until its first nested interval
+        stack = []
+        cursor = 0
+        for start, end, value_id in intervals:
+            while stack and stack[-1][0] < start:
+                outer_end, outer_value_id = stack.pop()
+                self._add(cursor, outer_end, outer_value_id)
+                cursor = max(cursor, outer_end + 1)
+            if stack:
+                self._add(cursor, start - 1, stack[-1][1])
+            cursor = start
+            stack.append((end, value_id))
+        while stack:
+            outer_end, outer_value_id = stack.pop()
+            self._add(cursor, outer_end, outer_value_id)
+            cursor = max(cursor, outer_end + 1)
+
+    def __len__(self):
+        return len(self._starts)
+
+    def lookup(self, ip_addr, default=UNKNOWN):
+        try:
+            address = ip_to_int(ip_addr)
+        except (OSError, TypeError):
+            return default
+        position = bisect_right(self._starts, address) - 1
+        if position >= 0 and address <= self._ends[position]:
+            return self._values[self._value_ids[position]]
+        return default
+
+
+def load_index(path):
+    """
+    Builds the index from a csv file with rows "network,value", rows with an incorrect network (e.g. a header) are
+    skipped
+    """
+    networks = []
+    with open(resolve_path(path), newline="") as table:
+        for row in csv.reader(table):
+            if len(row) < 2:
+                continue
+            try:
+                parse_network(row[0].strip())
+            except (OSError, ValueError):
+                continue
+            networks.append((row[0].strip(), row[1].strip()))
+    return CidrIndex(networks)
+
+
+def get_index(path):
+    return worker_cached(("cidr_index", path), lambda: load_index(path))
+
+
+class CidrLookup:
+    """
+    Function (table name, address) -> value of the network of the table that contains the address
+    """
+
+    def __init__(self, databases):
+        self._databases = databases
+
+    def __call__(self, table, ip_addr):
+        return get_index(self._databases[table.strip("'")]).lookup(ip_addr)
@@ -0,0 +1,120 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from config_parsing.transformations_parser import FieldTransformation
+from operations.vectorized_operations import VectorizedOperations
+
+NUMPY_TYPES = {
+    "BooleanType": np.bool_,
+    "ByteType": np.int64,
+    "ShortType": np.int64,
+    "IntegerType": np.int64,
+    "LongType": np.int64,
+    "FloatType": np.float64,
+    "DoubleType": np.float64,
+    "StringType": object
+}
+
+
+class ColumnarTransformationCreator:
+    """
+    Builds a transformation over a whole partition. Rows of the partition are turned into numpy columns once,
+    every syntax tree is evaluated as a chain of column kernels and the result columns are zipped back to rows.
+    """
+
+    def __init__(self, data_structure, parsed_transformation, transformation_operations):
+        self.parsed_transformation = parsed_transformation
+        self.mapping = dict(
+            map(lambda x: (x, data_structure[x]["index"]), data_structure.keys()))
+        self.types = dict(
+            map(lambda x: (x, NUMPY_TYPES[data_structure[x]["type"]]), data_structure.keys()))
+        self.transformation_operations = transformation_operations
+        self.vectorized_operations = VectorizedOperations(transformation_operations)
+        self.stringQuote = "'"
+        self._used_fields = set()
+
+    def _is_string_literal(self, node):
+        return node.startswith(self.stringQuote) and node.endswith(self.stringQuote)
+
+    def _get_column_lambda(self, field):
+        self._used_fields.add(field)
+        return lambda columns: columns[field]
+
+    @staticmethod
+    def _constant_lambda(value):
+        return lambda columns: value
+
+    def _compile_node(self, node):
+        """
+        :return: tuple (is_constant, value) where value is a constant or a function of the column dictionary
+        """
+        if isinstance(node, str):
+            if self._is_string_literal(node):
+                return True, node
+            if node.strip() in self.mapping:
+                return False, self._get_column_lambda(node.strip())
+            return True, int(node)
+        elif isinstance(node, (bool, int, float)):
+            return True, node
+        return False, self._make_operation_lambda(node)
+
+    def _make_operation_lambda(self, syntax_tree):
+        children = [self._compile_node(ch) for ch in syntax_tree.children]
+
+        if all(is_constant for is_constant, _ in children):
+            # literals only, the operation is evaluated once per partition
+            operation = self.transformation_operations.operations_dict[syntax_tree.operation].func
+            args = [value for _, value in children]
+            return lambda columns: operation(*args)
+
+        kernel = self.vectorized_operations.get_kernel(syntax_tree.operation)
+        args = [value if not is_constant else self._constant_lambda(value) for is_constant, value in children]
+        return lambda columns: kernel(*[arg(columns) for arg in args])
+
+    def build_lambda(self):
+        """
+        :return: function that takes an iterator over rows of a partition and returns a list of tuples
+        """
+        lambdas = []
+        for exp_tr in self.parsed_transformation:
+            if isinstance(exp_tr, FieldTransformation):
+                if isinstance(exp_tr.body, str):
+                    if self._is_string_literal(exp_tr.body):
+                        lambdas.append(self._constant_lambda(exp_tr.body))
+                        continue
+                    lambdas.append(self._get_column_lambda(exp_tr.body))
+                elif isinstance(exp_tr.body, (bool, int, float)):
+                    lambdas.append(self._constant_lambda(exp_tr.body))
+                else:
+                    lambdas.append(self._make_operation_lambda(exp_tr.body))
+            else:
+                lambdas.append(self._get_column_lambda(exp_tr))
+
+        columns_types = [(field, self.mapping[field], self.types[field]) for field in self._used_fields]
+
+        def transform_partition(iterator):
+            rows = list(iterator)
+            if not rows:
+                return []
+            columns = dict(map(lambda x: (x[0], np.array([row[x[1]] for row in rows], dtype=x[2])),
+                               columns_types))
+            result = []
+            for f in lambdas:
+                value = f(columns)
+                result.append(value.tolist() if isinstance(value, np.ndarray) else [value] * len(rows))
+            return list(zip(*result))
+
+        return transform_partition
@@ -12,48 +12,129 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import geoip2.database
+import logging
 import os
+from functools import lru_cache
 
+from pyspark import SparkFiles
 
-class GeoIPReaderSingleton(object):
-    __instance = None
+from config_parsing.logging_config import configure_logging, DEFAULT_LOG_LEVEL
+from singelton.worker_cache import worker_cached
 
-    def __new__(cls, path):
-        if cls.__instance is None:
-            cls.__instance = geoip2.database.Reader(os.path.basename(path))
 
-        return cls.__instance
+def resolve_path(path):
+    """
+    Returns the path of the database file shipped to the worker by sc.addFile, or the path itself if the file
+    isn't shipped
+    """
+    try:
+        shipped_path = SparkFiles.get(os.path.basename(path))
+        if os.path.exists(shipped_path):
+            return shipped_path
+    except Exception:
+        pass
+    return path
 
 
-def country(ip_addr, country_path):
+def _open_reader(path):
     import geoip2.database
-    country_reader = GeoIPReaderSingleton(country_path)
+    from maxminddb import MODE_MMAP
+    return geoip2.database.Reader(resolve_path(path), mode=MODE_MMAP)
 
-    try:
-        match = country_reader.country(ip_addr)
-        return match.country.name
-    except geoip2.errors.AddressNotFoundError:
-        return "unknown_country"
 
+def get_reader(path):
+    # a reader memory-maps its file once, so every database has one reader per worker
+    return worker_cached(("geo_reader", path), lambda: _open_reader(path))
 
-def city(ip_addr, city_path):
-    import geoip2.database
-    city_reader = GeoIPReaderSingleton(city_path)
 
-    try:
-        match = city_reader.city(ip_addr)
-        return match.city.names["en"] if match.city.names else "unknown_city"
-    except geoip2.errors.AddressNotFoundError:
-        return "unknown_city"
+def _country(reader, ip_addr):
+    return reader.country(ip_addr).country.name
 
 
-def aarea(ip_addr, asn_path):
-    import geoip2.database
-    asn_reader = GeoIPReaderSingleton(asn_path)
+def _city(reader, ip_addr):
+    match = reader.city(ip_addr)
+    return match.city.names["en"] if match.city.names else "unknown_city"
 
+
+def _asn(reader, ip_addr):
+    return str(reader.asn(ip_addr).autonomous_system_number)
+
+
+# lookup name -> (function of the reader and address, result for unknown addresses)
+LOOKUPS = {
+    "country": (_country, "unknown_country"),
+    "city": (_city, "unknown_city"),
+    "asn": (_asn, "unknown_asn")
+}
+
+
+def _lookup(lookup_name, path, ip_addr):
+    import geoip2.errors
+    function, unknown = LOOKUPS[lookup_name]
     try:
-        match = asn_reader.asn(ip_addr)
-        return str(match.autonomous_system_number)
-    except geoip2.errors.AddressNotFoundError:
-        return "unknown_asn"
+        return function(get_reader(path), ip_addr)
+    except (geoip2.errors.AddressNotFoundError, ValueError):
+        return unknown
+
+
+def get_cached_lookup(lookup_name, path, cache_size):
+    """
+    Returns the lookup of the worker process for the database file with a LRU cache of cache_size addresses
+    """
+    return worker_cached(("geo_lookup", lookup_name, path, cache_size),
+                         lambda: lru_cache(maxsize=cache_size)(lambda ip_addr: _lookup(lookup_name, path, ip_addr)))
+
+
+class GeoLookup:
+    """
+    Function address -> value of the geo database for transformations. The reader and the cache live in the worker
+    process, so the object is pickled without them. The hit rate of the cache is logged every report_interval
+    lookups of the worker, lookups are counted by the cache of the worker, so every task continues the count.
+    """
+
+    def __init__(self, lookup_name, path, cache_size=100000, report_interval=1000000, log_level=DEFAULT_LOG_LEVEL):
+        self.lookup_name = lookup_name
+        self.path = path
+        self.cache_size = cache_size
+        self.report_interval = report_interval
+        self.log_level = log_level
+        self._lookup = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_lookup"] = None
+        return state
+
+    def __call__(self, ip_addr):
+        if self._lookup is None:
+            self._lookup = get_cached_lookup(self.lookup_name, self.path, self.cache_size)
+        result = self._lookup(ip_addr)
+        info = self._lookup.cache_info()
+        if (info.hits + info.misses) % self.report_interval == 0:
+            self.log_statistics()
+        return result
+
+    def cache_info(self):
+        """
+        Returns statistics of the cache of the worker process: hits, misses, maxsize and currsize
+        """
+        return get_cached_lookup(self.lookup_name, self.path, self.cache_size).cache_info()
+
+    def log_statistics(self):
+        info = self.cache_info()
+        lookups = info.hits + info.misses
+        configure_logging(self.log_level)
+        logging.info("{} lookups: {}, cache hit rate: {:.2%}, cached addresses: {}".format(
+            self.lookup_name, lookups, info.hits / lookups if lookups else 0.0, info.currsize))
+
+
+def country(ip_addr, country_path):
+    return _lookup("country", country_path, ip_addr)
+
+
+def city(ip_addr, city_path):
+    return _lookup("city", city_path, ip_addr)
+
+
+def aarea(ip_addr, asn_path):
+    return _lookup("asn", asn_path, ip_addr)
@@ -0,0 +1,91 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import csv
+
+import pyspark.sql.types as types
+from pyspark import SparkContext
+
+from errors import errors
+from processor.geo_operations import resolve_path
+
+_CONVERTERS = {
+    types.StringType(): str,
+    types.LongType(): int,
+    types.IntegerType(): int,
+    types.ShortType(): int,
+    types.ByteType(): int,
+    types.DoubleType(): float,
+    types.FloatType(): float,
+    types.BooleanType(): lambda x: x.strip().lower() == "true"
+}
+
+
+def load_table(path):
+    """
+    Reads a csv table with the header "key_name:KeyType,value_name:ValueType", e.g. "sensor_id:LongType,site:StringType"
+    :return: tuple (dictionary key -> value, key type, value type)
+    """
+    with open(resolve_path(path), newline="") as table:
+        reader = csv.reader(table)
+        try:
+            header = next(reader)
+            key_type, value_type = map(lambda x: getattr(types, x.split(":")[1].strip())(), header[:2])
+            convert_key, convert_value = _CONVERTERS[key_type], _CONVERTERS[value_type]
+        except (StopIteration, IndexError, AttributeError, KeyError, TypeError):
+            raise errors.LookupTableError("Lookup table {} should have a header "
+                                          "\"key_name:KeyType,value_name:ValueType\" of primitive types".format(path))
+        return dict(map(lambda x: (convert_key(x[0]), convert_value(x[1])), filter(lambda x: len(x) >= 2, reader))), \
+               key_type, value_type
+
+
+class LookupTables:
+    """
+    Function (table name, key) -> value of the key in a table of the "databases" section, None for missing keys.
+    Tables are read on the driver when transformations are validated. When the function is sent to executors, the
+    read tables are sent by one broadcast variable, so every executor gets them once instead of with every task.
+    """
+
+    def __init__(self, databases):
+        self._databases = databases
+        # table name -> (dictionary, key type, value type)
+        self._tables = {}
+        self._broadcast = None
+        self._broadcast_names = set()
+
+    def get_table(self, name):
+        table = self._tables.get(name)
+        if table is None:
+            if self._broadcast is not None and name in self._broadcast.value:
+                table = self._broadcast.value[name]
+            elif name in self._databases:
+                table = load_table(self._databases[name])
+            else:
+                raise errors.LookupTableError("Lookup table '{}' isn't listed in the databases section".format(name))
+            self._tables[name] = table
+        return table
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        spark_context = SparkContext._active_spark_context
+        if self._tables and spark_context is not None:
+            if self._broadcast_names != set(self._tables.keys()):
+                self._broadcast = spark_context.broadcast(dict(self._tables))
+                self._broadcast_names = set(self._tables.keys())
+            state["_broadcast"] = self._broadcast
+            state["_tables"] = {}
+        return state
+
+    def __call__(self, table, key):
+        return self.get_table(table.strip("'"))[0].get(key)
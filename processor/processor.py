@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from errors.errors import NotValidAggregationExpression
 from .transformation_processor import TransformationProcessor
 from .aggregation_processor import AggregationProcessor
 
@@ -22,13 +23,31 @@ class Processor:
         self.transformation = self.transformation_processor.transformation
 
         self.transformation_processor_fields = self.transformation_processor.fields
+        # input fields which should be decoded by the input stage
+        self.used_input_fields = self.transformation_processor.used_fields
         aggregation_processor = AggregationProcessor(config, self.transformation_processor.fields)
 
         self.aggregation_output_struct = aggregation_processor.get_output_structure()
 
-        self.aggregation = aggregation_processor.get_aggregation_lambda()
+        # processing of the whole stream, None if every batch is processed separately
+        self.stream_processing = None
+        if aggregation_processor.is_stream_aggregation():
+            if config.content["processing"].get("mode", "rdd") == "sql":
+                raise NotValidAggregationExpression("Window and stateful aggregations aren't supported by the sql "
+                                                    "processing mode")
+            transformation = self.transformation
+            stream_aggregation = aggregation_processor.get_stream_aggregation_lambda()
+            self.stream_processing = lambda dstream: stream_aggregation(dstream.transform(transformation))
+            self.aggregation = aggregation_processor.get_stream_postprocessing_lambda()
+        elif config.content["processing"].get("mode", "rdd") == "sql":
+            self.aggregation = aggregation_processor.get_sql_aggregation_lambda()
+        else:
+            self.aggregation = aggregation_processor.get_aggregation_lambda()
         self.enumerate_output_aggregation_field = aggregation_processor.get_enumerate_field()
 
     # should return lambda:
     def get_pipeline_processing(self):
+        if self.stream_processing:
+            # batches are already transformed and aggregated by the stream processing
+            return lambda rdd: self.aggregation(rdd)
         return lambda rdd: self.aggregation(self.transformation(rdd))
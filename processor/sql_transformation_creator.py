@@ -0,0 +1,81 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from pyspark.sql import functions as F
+
+from config_parsing.transformations_parser import FieldTransformation
+from operations.sql_operations import SqlOperations
+
+
+class SqlTransformationCreator:
+    """
+    Translates parsed transformations into Spark SQL columns for DataFrame.select
+    """
+
+    def __init__(self, data_structure_pyspark, parsed_transformation, transformation_operations,
+                 transformations_validator):
+        self.parsed_transformation = parsed_transformation
+        self.fields = data_structure_pyspark.names
+        self.transformation_operations = transformation_operations
+        self.sql_operations = SqlOperations(transformation_operations)
+        self.transformations_validator = transformations_validator
+        self.stringQuote = "'"
+
+    def _is_string_literal(self, node):
+        return node.startswith(self.stringQuote) and node.endswith(self.stringQuote)
+
+    def _literal(self, value):
+        return F.lit(value.strip(self.stringQuote) if isinstance(value, str) else value)
+
+    def _compile_node(self, node):
+        """
+        :return: tuple (is_constant, value) where value is a python constant or a column
+        """
+        if isinstance(node, str):
+            if self._is_string_literal(node):
+                return True, node
+            if node.strip() in self.fields:
+                return False, F.col(node.strip())
+            return True, int(node)
+        elif isinstance(node, (bool, int, float)):
+            return True, node
+        return False, self._make_operation_column(node)
+
+    def _make_operation_column(self, syntax_tree):
+        children = [self._compile_node(ch) for ch in syntax_tree.children]
+
+        if all(is_constant for is_constant, _ in children):
+            # literals only, the operation is evaluated once on the driver
+            operation = self.transformation_operations.operations_dict[syntax_tree.operation].func
+            return self._literal(operation(*[value for _, value in children]))
+
+        result_type = self.transformations_validator.syntax_tree_type(syntax_tree)
+        builder = self.sql_operations.get_builder(syntax_tree.operation, result_type)
+        return builder(*[value if not is_constant else self._literal(value) for is_constant, value in children])
+
+    def build_columns(self):
+        columns = []
+        for exp_tr in self.parsed_transformation:
+            if isinstance(exp_tr, FieldTransformation):
+                if isinstance(exp_tr.body, str):
+                    column = self._literal(exp_tr.body) if self._is_string_literal(exp_tr.body) \
+                        else F.col(exp_tr.body)
+                elif isinstance(exp_tr.body, (bool, int, float)):
+                    column = self._literal(exp_tr.body)
+                else:
+                    column = self._make_operation_column(exp_tr.body)
+                columns.append(column.alias(exp_tr.name))
+            else:
+                columns.append(F.col(exp_tr))
+        return columns
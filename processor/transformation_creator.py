@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from operator import itemgetter
+
 from config_parsing.transformations_parser import FieldTransformation
 
 
@@ -23,30 +25,50 @@ class TransformationCreator:
         self.transformation_operations = transformation_operations
         self.stringQuote = "'"
 
-    def __generate_params_list(self, children, row):
-        args = []
-        for ch in children:
-            if isinstance(ch, str):
-                if ch.startswith(self.stringQuote) and \
-                        ch.endswith(self.stringQuote):
-                    args.append(ch)
-                    continue
-                args.append(row[self.mapping[ch]] if ch in self.mapping.keys() else int(ch))
-            elif isinstance(ch, (bool, int, float)):
-                args.append(ch)
-            else:
-                operation = self.transformation_operations.operations_dict[ch.operation].func
-                args.append(
-                    operation(*self.__generate_params_list(ch.children, row)))
-        return args
+    def _is_string_literal(self, node):
+        return node.startswith(self.stringQuote) and node.endswith(self.stringQuote)
+
+    @staticmethod
+    def _constant_lambda(value):
+        return lambda row: value
 
     def _get_column_value_lambda(self, index):
-        return lambda row: row[index]
+        return itemgetter(index)
+
+    def _compile_node(self, node):
+        """
+        Compiles a node of the syntax tree into a closure over a row. All type checks, literal parsing and
+        operation lookups are done here once, so the resulting closure only calls the operations.
+        :param node: SyntaxTree, field name, string literal or number
+        :return: tuple (is_constant, value) where value is a constant or a function of the row
+        """
+        if isinstance(node, str):
+            if self._is_string_literal(node):
+                return True, node
+            if node.strip() in self.mapping:
+                return False, self._get_column_value_lambda(self.mapping[node.strip()])
+            return True, int(node)
+        elif isinstance(node, (bool, int, float)):
+            return True, node
+        return False, self._make_operation_lambda(node)
 
     def _make_operation_lambda(self, syntax_tree):
         operation = self.transformation_operations.operations_dict[syntax_tree.operation].func
+        children = [self._compile_node(ch) for ch in syntax_tree.children]
+
+        if all(is_constant for is_constant, _ in children):
+            # operation over literals only, arguments are bound once
+            args = [value for _, value in children]
+            return lambda row: operation(*args)
 
-        return lambda row: operation(*self.__generate_params_list(syntax_tree.children, row))
+        args = [value if not is_constant else self._constant_lambda(value) for is_constant, value in children]
+        if len(args) == 1:
+            arg0, = args
+            return lambda row: operation(arg0(row))
+        if len(args) == 2:
+            arg0, arg1 = args
+            return lambda row: operation(arg0(row), arg1(row))
+        return lambda row: operation(*[arg(row) for arg in args])
 
     def build_lambda(self):
         lambdas = []
@@ -54,17 +76,16 @@ class TransformationCreator:
             # always FieldTransformation
             if isinstance(exp_tr, FieldTransformation):
                 if isinstance(exp_tr.body, str):
-                    if exp_tr.body.startswith(self.stringQuote) and \
-                            exp_tr.body.endswith(self.stringQuote):
-                        lambdas.append(exp_tr.body)
+                    if self._is_string_literal(exp_tr.body):
+                        lambdas.append(self._constant_lambda(exp_tr.body))
                         continue
                     lambdas.append(self._get_column_value_lambda(self.mapping[exp_tr.body]))
                 elif isinstance(exp_tr.body, (bool, int, float)):
-                    lambdas.append(exp_tr.body)
+                    lambdas.append(self._constant_lambda(exp_tr.body))
                 else:
                     syntax_tree = exp_tr.body
                     lambdas.append(self._make_operation_lambda(syntax_tree))
             else:
                 lambdas.append(self._get_column_value_lambda(
                     self.mapping[exp_tr]))
-        return lambda row: (tuple(map(lambda x: x(row), lambdas)))
+        return lambda row: tuple([f(row) for f in lambdas])
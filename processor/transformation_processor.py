@@ -12,10 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from pyspark.sql import SparkSession
+
 from config_parsing.transformations_parser import TransformationsParser
 from config_parsing.transformations_validator import TransformationsValidator
 from operations.transformation_operations import TransformationOperations
 from .transformation_creator import TransformationCreator
+from .columnar_transformation_creator import ColumnarTransformationCreator
+from .sql_transformation_creator import SqlTransformationCreator
 
 
 class TransformationProcessor:
@@ -27,8 +31,27 @@ class TransformationProcessor:
 
         self.transformations_validator = TransformationsValidator(operations, config.data_structure_pyspark)
         self.fields = self.transformations_validator.validate(transformations_parser.expanded_transformation)
+        self.used_fields = self.transformations_validator.used_fields
 
-        transformations_creator = TransformationCreator(config.data_structure,
-                                                        transformations_parser.expanded_transformation, operations)
-        row_transformations = transformations_creator.build_lambda()
-        self.transformation = lambda rdd: rdd.map(row_transformations)
+        mode = config.content["processing"].get("mode", "rdd")
+        if mode == "sql":
+            transformations_creator = SqlTransformationCreator(config.data_structure_pyspark,
+                                                               transformations_parser.expanded_transformation,
+                                                               operations,
+                                                               self.transformations_validator)
+            schema = config.data_structure_pyspark
+            # rdd -> DataFrame with projections, casts and arithmetic evaluated by Spark SQL
+            self.transformation = lambda rdd: SparkSession.builder.getOrCreate().createDataFrame(rdd, schema).select(
+                transformations_creator.build_columns())
+        elif mode == "columnar":
+            transformations_creator = ColumnarTransformationCreator(config.data_structure,
+                                                                    transformations_parser.expanded_transformation,
+                                                                    operations)
+            partition_transformations = transformations_creator.build_lambda()
+            self.transformation = lambda rdd: rdd.mapPartitions(partition_transformations)
+        else:
+            transformations_creator = TransformationCreator(config.data_structure,
+                                                            transformations_parser.expanded_transformation,
+                                                            operations)
+            row_transformations = transformations_creator.build_lambda()
+            self.transformation = lambda rdd: rdd.map(row_transformations)
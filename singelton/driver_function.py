@@ -0,0 +1,52 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import threading
+
+# functions of the driver process by id
+_functions = {}
+_ids = itertools.count()
+_lock = threading.Lock()
+
+
+def _from_id(function_id):
+    return DriverFunction.__new__(DriverFunction)._bind(function_id)
+
+
+class DriverFunction:
+    """
+    Function of the DStream graph which runs on the driver, e.g. the action of foreachRDD. When checkpointing is
+    enabled, Spark pickles the graph with all its python functions when the streaming context starts and every batch,
+    while driver functions hold objects which can't be pickled: the dispatcher, contexts and kafka consumers.
+    The wrapper is pickled as the id of the function registered in the driver process. The application creates a new
+    StreamingContext at start and never recovers the graph from a checkpoint, so the id is never resolved in another
+    process.
+    """
+
+    def __init__(self, function):
+        with _lock:
+            function_id = next(_ids)
+            _functions[function_id] = function
+        self._bind(function_id)
+
+    def _bind(self, function_id):
+        self._id = function_id
+        return self
+
+    def __call__(self, *args):
+        return _functions[self._id](*args)
+
+    def __reduce__(self):
+        return _from_id, (self._id,)
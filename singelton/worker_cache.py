@@ -0,0 +1,40 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+_objects = {}
+_lock = threading.RLock()
+
+
+def worker_cached(key, factory):
+    """
+    Returns the object of the python worker process for the key. A python worker is reused by tasks of an executor,
+    so the object is created by factory() in the first task which needs it and shared by the next tasks and threads
+    of the worker instead of being pickled with every task: clients, readers of databases, indexes, caches.
+    :param key: hashable key, the first item is the kind of the object, e.g. ("influx_client", host, port, ...)
+    :param factory: function without arguments which creates the object
+    """
+    with _lock:
+        if key not in _objects:
+            _objects[key] = factory()
+        return _objects[key]
+
+
+def clear_worker_cache():
+    """
+    Forgets objects of the worker process, they are created again by the next calls
+    """
+    with _lock:
+        _objects.clear()
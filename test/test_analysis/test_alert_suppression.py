@@ -0,0 +1,124 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+from errors.errors import UnsupportedAnalysisFormat
+from analysis.alert_message import AlertSuppressionTable, SuppressedAlert, TokenBucket, AlertMessageFactory
+from singelton.worker_cache import clear_worker_cache
+
+
+def alert_config(suppression):
+    return {"analysis": {"alert": {"method": "stdout", "option": {}, "suppression": suppression}}}
+
+
+class TestAlertSuppression(TestCase):
+    def setUp(self):
+        clear_worker_cache()
+
+    def test_token_bucket(self):
+        bucket = TokenBucket(2, 3)
+
+        self.assertListEqual(list(map(lambda x: bucket.consume(0), range(4))), [True, True, True, False])
+        self.assertTrue(bucket.consume(0.5), "One token should be added in half a second")
+        self.assertFalse(bucket.consume(0.5))
+
+    def test_cooldown_suppresses_alerts_of_incident(self):
+        table = AlertSuppressionTable(10, 60)
+
+        self.assertEqual(table.check(("Simple", "8.8.8.8", "traffic"), 0), 0)
+        self.assertIsNone(table.check(("Simple", "8.8.8.8", "traffic"), 10))
+        self.assertIsNone(table.check(("Simple", "8.8.8.8", "traffic"), 20))
+        self.assertEqual(table.check(("Simple", "8.8.8.8", "packets"), 20), 0, "Other fields are other incidents")
+        self.assertEqual(table.check(("Simple", "8.8.8.8", "traffic"), 61), 2,
+                         "The alert after cooldown should count suppressed alerts")
+
+    def test_rate_limit(self):
+        table = AlertSuppressionTable(10, 0, rate=1, burst=2)
+
+        results = list(map(lambda x: table.check(("Simple", str(x), "traffic"), 0), range(4)))
+
+        self.assertListEqual(results, [0, 0, None, None])
+        self.assertEqual(table.pop_rate_limited(), 2)
+        self.assertEqual(table.pop_rate_limited(), 0)
+        self.assertEqual(table.check(("Simple", "2", "traffic"), 1), 1)
+
+    def test_fractional_rate_allows_alerts(self):
+        table = AlertSuppressionTable(10, 0, rate=0.5)
+
+        self.assertEqual(table.check(("Simple", "a", "traffic"), 0), 0, "Bucket should hold at least one alert")
+        self.assertIsNone(table.check(("Simple", "b", "traffic"), 1))
+        self.assertEqual(table.check(("Simple", "b", "traffic"), 2), 1, "One alert should be allowed in 2 seconds")
+        with self.assertRaises(UnsupportedAnalysisFormat):
+            SuppressedAlert(alert_config({"rate": 0.5, "burst": 0.5}), MagicMock())
+
+    def test_summaries_of_incidents_without_next_alert(self):
+        table = AlertSuppressionTable(2, 60)
+        for now in (0, 10, 20):
+            table.check(("Simple", "a", "traffic"), now)
+        table.check(("Simple", "b", "traffic"), 30)
+        table.check(("Simple", "b", "traffic"), 40)
+
+        self.assertListEqual(table.pop_summaries(50), [], "Incidents in cooldown should wait for the next alert")
+        self.assertListEqual(table.pop_summaries(60), [(("Simple", "a", "traffic"), 2)],
+                             "Suppressed alerts should be reported after the cooldown")
+        self.assertListEqual(table.pop_summaries(61), [], "Suppressed alerts should be reported once")
+
+        table.check(("Simple", "c", "traffic"), 62)
+        table.check(("Simple", "d", "traffic"), 63)
+        self.assertListEqual(table.pop_summaries(63), [(("Simple", "b", "traffic"), 1)],
+                             "Suppressed alerts of an evicted incident should be reported")
+
+    def test_table_is_bounded(self):
+        table = AlertSuppressionTable(2, 60)
+        table.check(("Simple", "a", "traffic"), 0)
+        table.check(("Simple", "b", "traffic"), 0)
+        table.check(("Simple", "a", "traffic"), 1)
+        table.check(("Simple", "c", "traffic"), 1)
+
+        self.assertEqual(len(table), 2)
+        self.assertEqual(table.check(("Simple", "b", "traffic"), 2), 0, "The least recent incident should be evicted")
+
+    @patch('analysis.alert_message.time')
+    def test_suppressed_alert_sends_summary(self, mock_time):
+        sink = MagicMock()
+        alert = SuppressedAlert(alert_config({"cooldown": 60}), sink)
+        parameters = {"key": ("8.8.8.8",), "field": "traffic", "lower_bound": 1, "upper_bound": 2, "value": 3}
+
+        for now in (0, 10, 20, 70):
+            mock_time.return_value = now
+            alert.send_message(AnalysisModule="Simple", timestamp=now, param=parameters)
+        alert.flush()
+
+        self.assertEqual(sink.send_message.call_count, 2)
+        self.assertNotIn("suppressed", sink.send_message.call_args_list[0][1]["param"])
+        self.assertEqual(sink.send_message.call_args_list[1][1]["param"]["suppressed"], 2)
+        self.assertTrue(sink.flush.called)
+
+        mock_time.return_value = 80
+        alert.send_message(AnalysisModule="Simple", timestamp=80, param=parameters)
+        alert.flush()
+        self.assertEqual(sink.send_message.call_count, 2, "Summary should wait for the cooldown")
+        mock_time.return_value = 140
+        alert.flush()
+
+        self.assertEqual(sink.send_message.call_count, 3, "Incident without next alert should get a summary")
+        self.assertEqual(sink.send_message.call_args_list[2][1]["param"],
+                         {"key": "('8.8.8.8',)", "field": "traffic", "suppressed": 1, "summary": True})
+
+    def test_factory_wraps_sink(self):
+        alert = AlertMessageFactory(alert_config({"cooldown": 10, "rate": 100})).instance_alert()
+
+        self.assertIsInstance(alert, SuppressedAlert)
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import time
 import types
 from unittest import TestCase
 from unittest.mock import MagicMock, patch
@@ -25,6 +26,34 @@ class TestConfig():
         self.content = input_content
 
 
+class AccumulatorAlert(IAllertMessage):
+    def __init__(self, alerts, flushes):
+        super().__init__({})
+        self._alerts = alerts
+        self._flushes = flushes
+
+    def send_message(self, **kwargs):
+        self._alerts.add(1)
+
+    def flush(self):
+        self._flushes.add(1)
+
+
+class AccumulatorHistory:
+    def __init__(self, queries, accuracy):
+        self._queries = queries
+        self._accuracy = accuracy
+
+    def read_windows(self, measurement, intervals, tag_names=None, tags=None):
+        self._queries.add(1)
+        # every key had the same value one batch ago
+        return list(map(lambda x: {"time": intervals[0][1] - self._accuracy * 10 ** 9, "ip": x["ip"], "ip_size": 100,
+                                   "ip_size_sum": 100}, tags))
+
+    def read(self, measurement, from_nanoseconds, to_nanoseconds, tag=None):
+        raise AssertionError("History should be read once per partition")
+
+
 class TestAnalysisFactory(TestCase):
     def setUp(self):
         # set up structure of config
@@ -152,7 +181,7 @@ class TestAnalysisFactory(TestCase):
 
         def mock_foreachPartition(test_lambda):
             test_data = [(1, 2, 3)]
-            return list(test_lambda(test_data))
+            test_lambda(test_data)
 
         mock_rdd.foreachPartition.side_effect = mock_foreachPartition
 
@@ -245,3 +274,63 @@ class TestAnalysisFactory(TestCase):
 
         self.assertTrue("Missing required analysis" in context.exception.args[0],
                         "Catch exeception, but it differs from test exception")
+
+    @patch('analysis.analysis_factory.HistoricalData', autospec=True)
+    @patch('analysis.alert_message.AlertMessageFactory.instance_alert')
+    @patch('analysis.historical_delivery.HistoricalDataDeliveryFactory.instance_data_delivery')
+    def test_get_partition_lambda(self, mock_data_delivery, mock_alert_factory, mock_historical_data):
+        input_data_structure = {'rule': [{'key': True, 'func_name': '', 'input_field': 'ip'},
+                                         {'key': False, 'func_name': 'Max', 'input_field': 'ip_size'},
+                                         {'key': False, 'func_name': 'Sum', 'input_field': 'ip_size_sum'}],
+                                'operation_type': 'reduceByKey'}
+        enumerate_output_aggregation_field = {"ip_size": 0, "ip_size_sum": 1}
+
+        mock_class = MagicMock()
+        mock_analysis = MagicMock()
+        mock_class.MockAnalysis.return_value = mock_analysis
+        sys.modules['analysis.MockAnalysis'] = mock_class
+        obj_mock_historical_data = MagicMock()
+        mock_historical_data.return_value = obj_mock_historical_data
+
+        analysis_factory = AnalysisFactory(self._config, input_data_structure, enumerate_output_aggregation_field)
+        analysis_partition = analysis_factory.get_partition_lambda()
+        analysis_partition([(("10.0.0.1",), 2, 3), (("10.0.0.2",), 4, 5)])
+
+        obj_mock_historical_data.set_zero_value.assert_called_with((4, 5))
+        obj_mock_historical_data.set_key.assert_called_with(("10.0.0.2",))
+        self.assertEqual(mock_analysis.analysis.call_count, 4,
+                         "Every record of the partition should be analysed by every analysis module")
+
+    def test_analysis_lambda_fires_alerts_on_rdd(self):
+        from pyspark.sql import SparkSession
+
+        sc = SparkSession.builder.getOrCreate().sparkContext
+        alerts, flushes, queries = sc.accumulator(0), sc.accumulator(0), sc.accumulator(0)
+        keys = ["10.0.0.{}".format(x) for x in range(6)]
+        self._config.content["analysis"]["rule"] = [{"module": "SimpleAnalysis", "name": "SimpleAnalysis",
+                                                     "options": {"deviation": {"ip_size": 10}, "batch_number": 1}}]
+        input_data_structure = {'rule': [{'key': True, 'func_name': '', 'input_field': 'ip'},
+                                         {'key': False, 'func_name': 'Max', 'input_field': 'ip_size'},
+                                         {'key': False, 'func_name': 'Sum', 'input_field': 'ip_size_sum'}],
+                                'operation_type': 'reduceByKey'}
+
+        with patch('analysis.historical_delivery.HistoricalDataDeliveryFactory.instance_data_delivery',
+                   return_value=AccumulatorHistory(queries, 3)), \
+                patch('analysis.alert_message.AlertMessageFactory.instance_alert',
+                      return_value=AccumulatorAlert(alerts, flushes)):
+            analysis_factory = AnalysisFactory(self._config, input_data_structure, {"ip_size": 0, "ip_size_sum": 1})
+            analysis_lambda = analysis_factory.get_analysis_lambda()
+
+        # four keys deviate from history, two keys have the same value
+        records = [((key,), 100 if index < 2 else 200, 100) for index, key in enumerate(keys)]
+        analysis_lambda(sc.parallelize(records, 3))
+
+        # updates of python accumulators reach the driver asynchronously
+        for _ in range(50):
+            if (alerts.value, flushes.value, queries.value) == (4, 3, 3):
+                break
+            time.sleep(0.1)
+
+        self.assertEqual(alerts.value, 4, "Every deviated key should fire an alert")
+        self.assertEqual(queries.value, 3, "History should be read once per partition")
+        self.assertEqual(flushes.value, 3, "Alerts should be flushed once per partition")
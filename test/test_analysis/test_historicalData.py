@@ -89,3 +89,82 @@ class TestHistoricalData(TestCase):
                              "Error in overload __getitem__")
 
         self.assertDictEqual(historical_data[4], {}, "Error in overload __getitem__")
+
+    @patch('analysis.historical_data.time')
+    def test_index_reads_history_once_per_partition(self, mock_time):
+        mock_time.return_value = 1000.000
+        nano_timestamp, nano_duration = nanotime.timestamp(1000).nanoseconds(), \
+                                        nanotime.seconds(self.__batch_duration).nanoseconds()
+        historical_data_repository_singleton = MagicMock()
+        historical_data_repository_singleton.read_windows.return_value = [
+            {"time": nano_timestamp - nano_duration, "ip": "8.8.8.8", "ip_size": 1111, "ip_size_sum": 1111},
+            {"time": nano_timestamp - nano_duration - 1, "ip": "8.8.8.8", "ip_size": 9999, "ip_size_sum": 9999},
+            {"time": nano_timestamp - 3 * nano_duration, "ip": "8.8.8.8", "ip_size": 3333, "ip_size_sum": 3333},
+            {"time": nano_timestamp - 16 * nano_duration // 10, "ip": "8.8.8.8", "ip_size": 7777, "ip_size_sum": 7777},
+            {"time": nano_timestamp - nano_duration, "ip": "1.1.1.1", "ip_size": 5555, "ip_size_sum": 5555}]
+        historical_data_repository_singleton.read.return_value = []
+        historical_data = HistoricalData(historical_data_repository_singleton, self._enumerate_output_aggregation_field,
+                                         "test_measurement", self._accuracy, self._key_fields_name,
+                                         self.__batch_duration)
+        historical_data.begin_partition(3, [("8.8.8.8",), ("1.1.1.1",), ("8.8.8.8",)])
+
+        historical_data.set_key(("8.8.8.8",))
+        self.assertDictEqual(historical_data[1], {"time": nano_timestamp - nano_duration, "ip": "8.8.8.8",
+                                                  "ip_size": 1111, "ip_size_sum": 1111, "key": ("8.8.8.8",)},
+                             "The latest point of the time window should be returned")
+        self.assertDictEqual(historical_data[2], {}, "Points between time windows should be skipped")
+        self.assertEqual(historical_data[3]["ip_size"], 3333)
+
+        historical_data.set_key(("1.1.1.1",))
+        self.assertEqual(historical_data[1]["ip_size"], 5555)
+
+        self.assertEqual(historical_data_repository_singleton.read_windows.call_count, 1,
+                         "History of all keys should be read by one query")
+        measurement, intervals, tag_names, tags = historical_data_repository_singleton.read_windows.call_args[0]
+        self.assertEqual(len(intervals), 3, "Time windows of all indexes should be read")
+        self.assertListEqual(tag_names, ["ip"])
+        self.assertListEqual(tags, [{"ip": "1.1.1.1"}, {"ip": "8.8.8.8"}], "Every key should be read once")
+        self.assertFalse(historical_data_repository_singleton.read.called)
+
+        self.assertDictEqual(historical_data[4], {}, "Indexes deeper than the partition history are read per key")
+        self.assertTrue(historical_data_repository_singleton.read.called)
+
+    def test_history_is_read_by_chunks_of_keys(self):
+        historical_data_repository_singleton = MagicMock()
+        historical_data_repository_singleton.read_windows.return_value = []
+        historical_data = HistoricalData(historical_data_repository_singleton, self._enumerate_output_aggregation_field,
+                                         "test_measurement", self._accuracy, self._key_fields_name,
+                                         self.__batch_duration, keys_per_query=2)
+        historical_data.begin_partition(1, [("10.0.0.{}".format(x),) for x in range(5)])
+        historical_data.set_key(("10.0.0.1",))
+
+        self.assertDictEqual(historical_data[1], {})
+        self.assertEqual(historical_data_repository_singleton.read_windows.call_count, 3,
+                         "Every query should read history of keys_per_query keys")
+
+    @patch('analysis.historical_data.time')
+    def test_index_reads_influx_only_for_keys_missing_in_cache(self, mock_time):
+        historical_data_repository_singleton = MagicMock()
+        historical_data_repository_singleton.read_windows.return_value = []
+        historical_data = HistoricalData(historical_data_repository_singleton, self._enumerate_output_aggregation_field,
+                                         "test_cached_measurement_{}".format(id(self)), self._accuracy,
+                                         self._key_fields_name, self.__batch_duration, cache_size=10)
+
+        # the first batch is read from influx and saved to the cache
+        mock_time.return_value = 1000.000
+        historical_data.begin_partition(1, [("8.8.8.8",)])
+        historical_data.set_zero_value((1111, 2222))
+        historical_data.set_key(("8.8.8.8",))
+        self.assertDictEqual(historical_data[1], {})
+        historical_data.save_value()
+        self.assertEqual(historical_data_repository_singleton.read_windows.call_count, 1)
+
+        # the next batch of the key is read from the cache, the new key is read from influx
+        mock_time.return_value = 1000.000 + self.__batch_duration
+        historical_data.begin_partition(1, [("8.8.8.8",), ("1.1.1.1",)])
+        historical_data.set_key(("8.8.8.8",))
+        self.assertDictEqual(historical_data[1], {"ip_size": 1111, "ip_size_sum": 2222, "key": ("8.8.8.8",),
+                                                  "time": nanotime.timestamp(1000).nanoseconds()})
+        self.assertEqual(historical_data_repository_singleton.read_windows.call_count, 2)
+        self.assertListEqual(historical_data_repository_singleton.read_windows.call_args[0][3], [{"ip": "1.1.1.1"}],
+                             "Only keys missing in the cache should be read from influx")
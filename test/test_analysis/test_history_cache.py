@@ -0,0 +1,57 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+
+from analysis.history_cache import HistoryCache, get_cache
+
+
+class TestHistoryCache(TestCase):
+    def test_get_returns_latest_value_of_interval(self):
+        cache = HistoryCache(10, 3)
+        cache.append(("8.8.8.8",), 10, {"traffic": 1})
+        cache.append(("8.8.8.8",), 20, {"traffic": 2})
+        cache.append(("8.8.8.8",), 21, {"traffic": 3})
+
+        self.assertDictEqual(cache.get(("8.8.8.8",), 5, 15), {"traffic": 1})
+        self.assertDictEqual(cache.get(("8.8.8.8",), 15, 25), {"traffic": 3})
+        self.assertIsNone(cache.get(("8.8.8.8",), 25, 35))
+        self.assertIsNone(cache.get(("1.1.1.1",), 5, 15))
+
+    def test_ring_buffer_keeps_depth_values(self):
+        cache = HistoryCache(10, 2)
+        for timestamp in range(1, 4):
+            cache.append((), timestamp * 10, {"traffic": timestamp})
+
+        self.assertIsNone(cache.get((), 5, 15), "The oldest value should be overwritten")
+        self.assertDictEqual(cache.get((), 15, 25), {"traffic": 2})
+        self.assertDictEqual(cache.get((), 25, 35), {"traffic": 3})
+
+    def test_least_recently_used_key_is_evicted(self):
+        cache = HistoryCache(2, 1)
+        cache.append(("a",), 10, {"traffic": 1})
+        cache.append(("b",), 10, {"traffic": 2})
+        cache.get(("a",), 5, 15)
+        cache.append(("c",), 10, {"traffic": 3})
+
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get(("b",), 5, 15), "The idle key should be evicted")
+        self.assertDictEqual(cache.get(("a",), 5, 15), {"traffic": 1})
+        self.assertDictEqual(cache.get(("c",), 5, 15), {"traffic": 3})
+
+    def test_get_cache_is_shared_by_measurement(self):
+        cache = get_cache("test_cache_measurement", 10, 2)
+
+        self.assertIs(get_cache("test_cache_measurement", 10, 2), cache)
+        self.assertIsNot(get_cache("test_cache_measurement", 10, 3), cache, "Cache should be recreated with new depth")
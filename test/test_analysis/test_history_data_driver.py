@@ -14,7 +14,7 @@
 
 import re
 import unittest
-from unittest.mock import Mock
+from unittest.mock import Mock, MagicMock
 from datetime import datetime
 from analysis.history_data_driver import HistoryDataDriver
 
@@ -89,3 +89,19 @@ class HistoryDataDriverTestCase(unittest.TestCase):
 
         result = history_data_driver.read("points", 1495005255000000000, 1495005258000000000, {'country': 'USA'})
         self.assertListEqual(result, [{'time': '2017-05-17T07:14:16Z', 'sum_traffic': 12345, 'country': 'USA'}])
+
+    def test_read_windows_groups_by_tags(self):
+        client = MagicMock()
+        client.query.return_value.items.return_value = [
+            (("points", {"country": "Russia"}), iter([{"time": 1495005256000000000, "sum_traffic": 1}])),
+            (("points", {"country": "O'Neil"}), iter([{"time": 1495005258000000000, "sum_traffic": 2}]))]
+        history_data_driver = HistoryDataDriver(client)
+
+        result = history_data_driver.read_windows("points", [(1, 2), (3, 4)], ["country"],
+                                                  [{"country": "Russia"}, {"country": "O'Neil"}])
+
+        client.query.assert_called_with("SELECT * from points WHERE time > 1 AND time < 4 AND "
+                                        "((\"country\"='Russia') OR (\"country\"='O\\'Neil')) "
+                                        "GROUP BY \"country\"", epoch="ns")
+        self.assertListEqual(result, [{"time": 1495005256000000000, "sum_traffic": 1, "country": "Russia"},
+                                      {"time": 1495005258000000000, "sum_traffic": 2, "country": "O'Neil"}])
@@ -13,9 +13,13 @@
 # limitations under the License.
 
 import json
+import time
 from unittest import TestCase
-from unittest.mock import patch, MagicMock, Mock
+from unittest.mock import patch, MagicMock
+
 from analysis.alert_message import KafkaOutAlert
+from singelton.singleton import Singleton
+from singelton.worker_cache import clear_worker_cache
 
 
 class TestConfig():
@@ -23,15 +27,68 @@ class TestConfig():
         self.content = input_content
 
 
-class TestKafkaOutAlert(TestCase):
-    @patch('analysis.alert_message.SingleKafkaProducer', autospec=True)
-    def test_send_message(self, mock_single_kafka_producer):
-        mock_class = MagicMock()
-        mock_class.send.return_value = None
-        mock_class.flush.return_value = None
-        mock_single_kafka_producer.return_value = mock_class
+class FakeFuture:
+    def __init__(self):
+        self._callbacks = []
+        self._errbacks = []
+
+    def add_callback(self, callback):
+        self._callbacks.append(callback)
+
+    def add_errback(self, errback):
+        self._errbacks.append(errback)
+
+
+class FakeBroker:
+    """
+    In-process broker: every request of a producer costs one round trip
+    """
+
+    def __init__(self, round_trip):
+        self.round_trip = round_trip
+        self.requests = 0
+        self.messages = []
+        self.rejected_topics = set()
+
+    def request(self, batch):
+        time.sleep(self.round_trip)
+        self.requests += 1
+        for topic, value, future in batch:
+            if topic in self.rejected_topics:
+                for errback in future._errbacks:
+                    errback(Exception("topic is rejected"))
+            else:
+                self.messages.append((topic, value))
+                for callback in future._callbacks:
+                    callback(None)
+
+
+class FakeProducer:
+    """
+    Producer which sends buffered messages by one request on flush
+    """
+
+    def __init__(self, broker, **options):
+        self.broker = broker
+        self.options = options
+        self._batch = []
+
+    def send(self, topic, value):
+        future = FakeFuture()
+        self._batch.append((topic, value, future))
+        return future
+
+    def flush(self):
+        if self._batch:
+            self.broker.request(self._batch)
+        self._batch = []
 
-        config = TestConfig(
+
+class TestKafkaOutAlert(TestCase):
+    def setUp(self):
+        Singleton._instances.pop(KafkaOutAlert, None)
+        clear_worker_cache()
+        self._config = TestConfig(
             {
                 "input": {
                     "options": {
@@ -50,7 +107,9 @@ class TestKafkaOutAlert(TestCase):
                         "option": {
                             "server": "localhost",
                             "port": 29092,
-                            "topic": "testalert"
+                            "topic": "testalert",
+                            "linger_ms": 100,
+                            "compression": "gzip"
                         }
                     },
                     "accuracy": 3,
@@ -66,12 +125,59 @@ class TestKafkaOutAlert(TestCase):
                 }
             })
 
-        test_alert_kafka = KafkaOutAlert(config.content)
+    def tearDown(self):
+        Singleton._instances.pop(KafkaOutAlert, None)
+        clear_worker_cache()
+
+    @patch('analysis.alert_message.KafkaProducer')
+    def test_send_message(self, mock_kafka_producer):
+        mock_class = MagicMock()
+        mock_kafka_producer.return_value = mock_class
+
+        test_alert_kafka = KafkaOutAlert(self._config.content)
+        test_alert_kafka.send_message(va1_x="test_val", val_y={"x": 1, "y": 2})
         test_alert_kafka.send_message(va1_x="test_val", val_y={"x": 1, "y": 2})
-        self.assertTrue(mock_class.send.called,
-                        "Failed. The send didn't call in send_message method.")
+
+        mock_kafka_producer.assert_called_once_with(bootstrap_servers="localhost:29092", linger_ms=100,
+                                                    batch_size=16384, compression_type="gzip")
         mock_class.send.assert_called_with('testalert',
-            str.encode(json.dumps({"va1_x": "test_val", "val_y": {"x": 1, "y": 2}})))
+                                           str.encode(json.dumps({"va1_x": "test_val", "val_y": {"x": 1, "y": 2}})))
+        self.assertFalse(mock_class.flush.called, "Messages should be flushed once per partition, not per message")
 
+        test_alert_kafka.flush()
         self.assertTrue(mock_class.flush.called,
-                        "Failed. The send didn't call in send_message method.")
+                        "Failed. The flush didn't call in flush method.")
+
+    def test_alerts_are_sent_without_flush_per_message(self):
+        broker = FakeBroker(0)
+        producer = FakeProducer(broker)
+        producer.flush = MagicMock(side_effect=producer.flush)
+        self._config.content["analysis"]["alert"]["option"]["batch_size"] = 65536
+
+        with patch('analysis.alert_message.get_producer', return_value=producer) as mock_get_producer:
+            test_alert_kafka = KafkaOutAlert(self._config.content)
+            for index in range(100):
+                test_alert_kafka.send_message(AnalysisModule="SimpleAnalysis", timestamp=index, param={})
+
+            self.assertFalse(producer.flush.called, "Alerts shouldn't wait for the broker one by one")
+            test_alert_kafka.flush()
+
+        self.assertEqual(producer.flush.call_count, 1, "Alerts of a partition should be flushed once")
+        self.assertEqual(len(broker.messages), 100)
+        self.assertTrue(mock_get_producer.called)
+        for call in mock_get_producer.call_args_list:
+            self.assertEqual(call[1], {"bootstrap_servers": "localhost:29092", "linger_ms": 100, "batch_size": 65536,
+                                       "compression_type": "gzip"},
+                             "Producer should batch alerts by linger_ms and batch_size of the config")
+
+    def test_failed_alerts_are_reported_on_flush(self):
+        broker = FakeBroker(0)
+        broker.rejected_topics.add("testalert")
+
+        with patch('analysis.alert_message.KafkaProducer', side_effect=lambda **x: FakeProducer(broker, **x)), \
+                patch('analysis.alert_message.logging') as mock_logging:
+            test_alert_kafka = KafkaOutAlert(self._config.content)
+            test_alert_kafka.send_message(AnalysisModule="SimpleAnalysis", timestamp=0, param={})
+            test_alert_kafka.flush()
+
+        mock_logging.warning.assert_called_with("1 of 1 alerts are not delivered to kafka topic testalert")
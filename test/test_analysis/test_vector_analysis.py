@@ -0,0 +1,85 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from unittest.mock import MagicMock, patch
+
+import nanotime
+
+from analysis.AverageAnalysis import AverageAnalysis
+from analysis.SimpleAnalysis import SimpleAnalysis
+from analysis.analysis_factory import analysis_record
+from analysis.historical_data import HistoricalData
+
+BATCH_DURATION = 10
+
+
+class TestVectorAnalysis(TestCase):
+    def setUp(self):
+        nano_timestamp, nano_duration = nanotime.timestamp(1000).nanoseconds(), \
+                                        nanotime.seconds(BATCH_DURATION).nanoseconds()
+        # history of the key i is 100 + lag * i, the key 0.0.0.3 doesn't have history one batch ago
+        self._points = [{"time": nano_timestamp - lag * nano_duration, "ip": "0.0.0.{}".format(i),
+                         "traffic": 100 + lag * i, "packets": 10}
+                        for i in range(6) for lag in range(1, 4) if (i, lag) != (3, 1)]
+        self._records = [(("0.0.0.{}".format(i),), 100 + 10 * i, 10 + i) for i in range(6)]
+        self._modules = [SimpleAnalysis({"deviation": {"traffic": 5, "packets": 20}, "batch_number": 1}, "Simple"),
+                         AverageAnalysis({"deviation": {"traffic": 3}, "num_average": 3}, "Average")]
+
+    def _historical_data(self):
+        repository = MagicMock()
+        repository.read_windows.return_value = [dict(point) for point in self._points]
+        historical_data = HistoricalData(repository, {"traffic": 0, "packets": 1}, "test_measurement", 2, ["ip"],
+                                         BATCH_DURATION)
+        historical_data.begin_partition(3, list(map(lambda x: x[0], self._records)))
+        return historical_data
+
+    def _alerts(self, alert_sender):
+        return sorted(map(lambda x: (x[1]["AnalysisModule"], x[1]["param"]["key"], x[1]["param"]["field"],
+                                     x[1]["param"]["lower_bound"], x[1]["param"]["upper_bound"],
+                                     x[1]["param"]["value"]), alert_sender.send_message.call_args_list))
+
+    @patch('analysis.historical_data.time')
+    def test_vector_analysis_equals_record_analysis(self, mock_time):
+        mock_time.return_value = 1000.000
+        record_sender, vector_sender = MagicMock(), MagicMock()
+
+        historical_data = self._historical_data()
+        for record in self._records:
+            analysis_record(record[1:], self._modules, record_sender, historical_data, record[0])
+
+        historical_data = self._historical_data()
+        batch = historical_data.get_batch(self._records)
+        for module in self._modules:
+            module.vector_analysis(batch, vector_sender)
+
+        self.assertTrue(record_sender.send_message.called)
+        self.assertListEqual(list(map(lambda x: type(x[-1]), self._alerts(vector_sender))),
+                             list(map(lambda x: type(x[-1]), self._alerts(record_sender))),
+                             "Alerts should send values of records unchanged")
+        self.assertListEqual(self._alerts(vector_sender), self._alerts(record_sender),
+                             "Vectorized modules should fire the same alerts as per record analysis")
+
+    @patch('analysis.historical_data.time')
+    def test_get_batch(self, mock_time):
+        mock_time.return_value = 1000.000
+
+        batch = self._historical_data().get_batch(self._records)
+
+        self.assertListEqual(batch.fields, ["traffic", "packets"])
+        self.assertEqual(batch.current.shape, (6, 2))
+        self.assertEqual(batch.history.shape, (6, 3, 2))
+        self.assertEqual(batch.current[2, batch.field_index("packets")], 12)
+        self.assertEqual(batch.history[2, 1, batch.field_index("traffic")], 104)
+        self.assertTrue(all(map(lambda x: x != x, batch.history[3, 0])), "Missing history should be NaN")
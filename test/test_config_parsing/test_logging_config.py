@@ -0,0 +1,39 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+from unittest import TestCase
+
+from config_parsing.logging_config import configure_logging, get_log_level
+
+
+class LoggingConfigTestCase(TestCase):
+    def setUp(self):
+        self.root_level = logging.getLogger().level
+
+    def tearDown(self):
+        logging.getLogger().setLevel(self.root_level)
+
+    def test_statistics_are_logged_by_default(self):
+        logging.getLogger().setLevel(logging.WARNING)
+        configure_logging(get_log_level({"processing": {}}))
+
+        self.assertTrue(logging.getLogger().isEnabledFor(logging.INFO), "Reports at the info level should be logged")
+        self.assertTrue(logging.getLogger().handlers, "Root logger should have a handler")
+
+    def test_log_level_from_config(self):
+        configure_logging(get_log_level({"processing": {"log_level": "WARNING"}}))
+
+        self.assertFalse(logging.getLogger().isEnabledFor(logging.INFO))
+        self.assertTrue(logging.getLogger().isEnabledFor(logging.WARNING))
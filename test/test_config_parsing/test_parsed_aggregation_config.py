@@ -66,14 +66,14 @@ class TestAggregationsParser(TestCase):
 
         # test exception to incorrect type,function name or field name
         test_input_rule = json.loads(
-            """["key : field_name1","count(field_name2)","sum(field_nameN)"]""")
+            """["key : field_name1","stddev(field_name2)","sum(field_nameN)"]""")
         test_input_operation = "reduceByKey"
         config = TestConfig({"processing": {"aggregations": {"operation_type": test_input_operation,
                                                              "rule": test_input_rule}}})
         test_aggregation_config = AggregationsParser(
             config, self.data_structure_pyspark)
 
-        with self.assertRaisesRegexp(NotValidAggregationExpression, "^Unsupported function\(s\): {'count'}$"):
+        with self.assertRaisesRegexp(NotValidAggregationExpression, "^Unsupported function\(s\): {'stddev'}$"):
             test_expression_token = test_aggregation_config.get_parse_expression()
 
     def test__field_validation(self):
@@ -272,4 +272,38 @@ class TransformationsValidatorTestCase(unittest.TestCase):
 
         self.assertEqual(fields, types.StructType([
             types.StructField('result', types.StringType())
-        ]))
\ No newline at end of file
+        ]))
+
+    def test_validate_used_fields(self):
+        validator = TransformationsValidator(
+            TransformationOperations(CONFIG_PATH), self.data_structure_pyspark)
+
+        syntaxtree = SyntaxTree()
+        syntaxtree.operation = "mul"
+        syntaxtree.children = ["packet_size", "sampling_rate"]
+
+        concat_syntax_tree = SyntaxTree()
+        concat_syntax_tree.operation = "concat"
+        concat_syntax_tree.children = ["'src_port'", "dst_ip"]
+
+        validator.validate(["src_ip", FieldTransformation("size", "ip_size"),
+                            FieldTransformation("traffic", syntaxtree),
+                            FieldTransformation("destination", concat_syntax_tree)])
+
+        self.assertSetEqual(validator.used_fields, {"src_ip", "ip_size", "packet_size", "sampling_rate", "dst_ip"},
+                            "Only fields referenced by transformations should be used")
+
+    def test_syntax_tree_type(self):
+        validator = TransformationsValidator(
+            TransformationOperations(CONFIG_PATH), self.data_structure_pyspark)
+
+        syntaxtree = SyntaxTree()
+        syntaxtree.operation = "pydiv"
+        syntaxtree.children = ["packet_size", "sampling_rate"]
+
+        self.assertEqual(validator.syntax_tree_type(syntaxtree), types.DoubleType(),
+                         "Type of the subtree should be returned")
+        self.assertEqual(validator.syntax_tree_type("dst_ip"), types.StringType(),
+                         "Type of the field should be returned")
+        with self.assertRaises(errors.FieldNotExists):
+            validator.syntax_tree_type("unknown")
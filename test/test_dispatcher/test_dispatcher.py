@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import os
+import time
 import unittest
 from unittest import mock
 from unittest.mock import MagicMock
@@ -60,3 +61,58 @@ class DispatcherTestCase(unittest.TestCase):
 
         self.assertIsInstance(dispatcher.writers[0], OutputWriter, "Writer should has type WriterMock")
         self.assertTrue(hasattr(dispatcher.writers[0], "get_write_lambda"), "Writer should has get_write_lambda method")
+
+    def test_all_pipeline_computes_processed_rdd_once(self):
+        from pyspark import StorageLevel
+        from pyspark.sql import SparkSession
+
+        sc = SparkSession.builder.getOrCreate().sparkContext
+        dispatcher = Dispatcher.__new__(Dispatcher)
+        dispatcher.writers = [MagicMock(), MagicMock()]
+        dispatcher._isAnalysis = True
+        dispatcher._storage_level = StorageLevel.MEMORY_ONLY
+        dispatcher._stage_runs = None
+        dispatcher._is_fused_sink = False
+
+        results = []
+        write_part = lambda rdd: [results.append(rdd.collect()) for _ in dispatcher.writers]
+        analysis_part = lambda rdd: results.append(rdd.count())
+        dispatcher._all_pipeline(sc.parallelize([(1, 2), (3, 4)], 2), lambda rdd: rdd.map(lambda x: x),
+                                 write_part, analysis_part)
+
+        self.assertListEqual(results, [[(1, 2), (3, 4)], [(1, 2), (3, 4)], 2], "Every sink should get the rdd")
+        processed = sc.parallelize([(1, 2), (3, 4)], 2)
+        with self.assertLogs(level="INFO") as logs:
+            self.assertEqual(dispatcher._report_stage_runs(processed), 0, "Counter should be reset after the batch")
+        self.assertIn("Processing stage ran 0.0 times", logs.output[0])
+
+    def test_all_pipeline_fused_sink(self):
+        from pyspark.sql import SparkSession
+
+        sc = SparkSession.builder.getOrCreate().sparkContext
+        dispatcher = Dispatcher.__new__(Dispatcher)
+        counter = sc.accumulator(0)
+        writer = MagicMock()
+        writer.get_partition_lambda.side_effect = lambda sc: lambda records: counter.add(len(records))
+        dispatcher.writers = [writer, writer]
+        dispatcher._isAnalysis = True
+        dispatcher.analysis = MagicMock()
+        dispatcher.analysis.get_partition_lambda.return_value = lambda records: counter.add(len(records))
+        dispatcher._is_fused_sink = True
+        dispatcher._fused_sink = None
+        dispatcher._stage_runs = None
+
+        write_part, analysis_part = MagicMock(), MagicMock()
+        dispatcher._all_pipeline(sc.parallelize([(1, 2), (3, 4), (5, 6)], 2), lambda rdd: rdd, write_part,
+                                 analysis_part)
+
+        # updates of python accumulators reach the driver asynchronously
+        for _ in range(50):
+            if counter.value == 9:
+                break
+            time.sleep(0.1)
+
+        self.assertFalse(write_part.called, "Writers should be run by the fused sink")
+        self.assertFalse(analysis_part.called, "Analysis should be run by the fused sink")
+        self.assertEqual(counter.value, 9, "Every record should be passed to every writer and analysis")
+        self.assertEqual(writer.report_statistics.call_count, 2, "Statistics of every writer should be reported")
@@ -0,0 +1,68 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from unittest import TestCase
+
+from pyspark.sql import types
+
+from input.csv_decoder import CsvDecoder
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.path.join("..", "data", "test.csv"))
+
+
+class TestCsvDecoder(TestCase):
+    def setUp(self):
+        self.data_structure_pyspark = types.StructType([types.StructField("timestamp", types.LongType()),
+                                                        types.StructField("src_ip", types.StringType()),
+                                                        types.StructField("size", types.IntegerType()),
+                                                        types.StructField("rate", types.DoubleType()),
+                                                        types.StructField("flag", types.BooleanType())])
+
+    def test_build_partition_lambda(self):
+        decode_partition = CsvDecoder(self.data_structure_pyspark).build_partition_lambda()
+        records = list(decode_partition(iter(["1484794182,217.69.143.60,74,0.5,1", "1484794183,10.0.0.1,68,2,"])))
+        self.assertListEqual(records, [[1484794182, "217.69.143.60", 74, 0.5, True],
+                                       [1484794183, "10.0.0.1", 68, 2.0, False]],
+                             "Records should be converted to types of data structure")
+
+    def test_build_partition_lambda_sep_and_quoting(self):
+        decode_partition = CsvDecoder(self.data_structure_pyspark, ";").build_partition_lambda()
+        records = list(decode_partition(iter(['1484794182;"217.69.143.60; gateway";74;0.5;1'])))
+        self.assertListEqual(records, [[1484794182, "217.69.143.60; gateway", 74, 0.5, True]],
+                             "Decoder should split on sep and keep quoted delimiters")
+
+    def test_build_partition_lambda_sflow(self):
+        with open(os.path.join(os.path.dirname(__file__),
+                               os.path.join("..", "data", "config_data_structure.json"))) as cfg:
+            data_structure = json.load(cfg)
+        data_structure_pyspark = types.StructType(
+            list(map(lambda x: types.StructField(x[0], getattr(types, x[1]["type"])()),
+                     sorted(data_structure.items(), key=lambda x: x[1]["index"]))))
+
+        decode_partition = CsvDecoder(data_structure_pyspark).build_partition_lambda()
+        with open(DATA_PATH) as data:
+            records = list(decode_partition(data))
+
+        self.assertEqual(len(records), 5, "Every line should be decoded")
+        self.assertEqual(records[0][data_structure["src_ip"]["index"]], "217.69.143.60")
+        self.assertEqual(records[0][data_structure["packet_size"]["index"]], 74)
+        self.assertEqual(records[0][data_structure["sampling_rate"]["index"]], 512)
+
+    def test_build_partition_lambda_used_fields(self):
+        decode_partition = CsvDecoder(self.data_structure_pyspark, ",", ["src_ip", "rate"]).build_partition_lambda()
+        records = list(decode_partition(iter(["1484794182,217.69.143.60,74,0.5,1"])))
+        self.assertListEqual(records, [[None, "217.69.143.60", None, 0.5, None]],
+                             "Only used fields should be decoded, indexes of fields should be kept")
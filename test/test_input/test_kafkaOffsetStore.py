@@ -0,0 +1,54 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from collections import namedtuple
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+from input.kafka_offset_store import KafkaOffsetStore
+
+OffsetRange = namedtuple("OffsetRange", ["topic", "partition", "fromOffset", "untilOffset"])
+OffsetAndMetadata = namedtuple("OffsetAndMetadata", ["offset", "metadata"])
+
+
+class TestKafkaOffsetStore(TestCase):
+    @patch('input.kafka_offset_store.KafkaConsumer')
+    def test_read(self, mock_kafka_consumer):
+        mock_consumer = MagicMock()
+        mock_consumer.partitions_for_topic.return_value = {0, 1}
+        mock_consumer.committed.side_effect = lambda topic_partition: 100 + topic_partition.partition
+        mock_kafka_consumer.return_value = mock_consumer
+
+        offset_store = KafkaOffsetStore("localhost", 29092, "data-consumer", "data")
+        self.assertDictEqual(offset_store.read(), {0: 100, 1: 101}, "Committed offsets should be read by partition")
+        mock_kafka_consumer.assert_called_with(bootstrap_servers="localhost:29092", group_id="data-consumer",
+                                               enable_auto_commit=False)
+
+        mock_consumer.committed.side_effect = lambda topic_partition: None if topic_partition.partition else 100
+        self.assertDictEqual(offset_store.read(), {},
+                             "Offsets should be empty if one of partitions doesn't have committed offset")
+
+    @patch('input.kafka_offset_store.OffsetAndMetadata', OffsetAndMetadata)
+    @patch('input.kafka_offset_store.KafkaConsumer')
+    def test_commit(self, mock_kafka_consumer):
+        mock_consumer = MagicMock()
+        mock_kafka_consumer.return_value = mock_consumer
+
+        offset_store = KafkaOffsetStore("localhost", 29092, "data-consumer", "data")
+        offset_store.commit([])
+        self.assertFalse(mock_consumer.commit.called, "Empty batch shouldn't be committed")
+
+        offset_store.commit([OffsetRange("data", 0, 10, 20), OffsetRange("data", 1, 5, 7)])
+        committed = mock_consumer.commit.call_args[0][0]
+        self.assertDictEqual(dict(map(lambda x: ((x[0].topic, x[0].partition), x[1].offset), committed.items())),
+                             {("data", 0): 20, ("data", 1): 7}, "The end of offset ranges should be committed")
@@ -12,7 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pickle
+import threading
 from unittest import TestCase, mock
+
+from pyspark import cloudpickle
+
 from errors.errors import ExecutorError
 from input.executors import StreamingExecutor
 
@@ -22,11 +27,17 @@ class TestStreamingExecutor(TestCase):
     @mock.patch('pyspark.streaming.StreamingContext')
     def test_run_pipeline(self, mock_streaming_context, mock_dstream):
         test_executor = StreamingExecutor(mock_dstream, mock_streaming_context)
-        test_function = lambda rdd: rdd
+        calls = []
+        lock = threading.Lock()
+        test_function = lambda rdd: calls.append((lock, rdd))
         test_executor.set_pipeline_processing(test_function)
         test_executor.run_pipeline()
 
-        mock_dstream.foreachRDD.assert_called_with(test_function)
+        run_batch = mock_dstream.foreachRDD.call_args[0][0]
+        run_batch(1000, "rdd")
+        self.assertListEqual(calls, [(lock, "rdd")], "Action should be called for the batch")
+        pickle.loads(cloudpickle.dumps(run_batch))(1000, "rdd")
+        self.assertEqual(len(calls), 2, "Pickled action should refer to the action of the driver")
 
         self.assertTrue(mock_streaming_context.start.called, "Failed streaming. The method 'start' didn't call.")
         self.assertTrue(mock_streaming_context.awaitTermination.called,
@@ -49,3 +60,43 @@ class TestStreamingExecutor(TestCase):
 
         self.assertEqual(test_function, test_executor._action,
                          "field _action after set_pipeline_processing should be equal inpud action")
+
+    @mock.patch('pyspark.streaming.DStream')
+    @mock.patch('pyspark.streaming.StreamingContext')
+    def test_run_pipeline_on_batch_completed(self, mock_streaming_context, mock_dstream):
+        calls = []
+        test_executor = StreamingExecutor(mock_dstream, mock_streaming_context,
+                                          lambda time: calls.append(("completed", time)))
+        test_executor.set_pipeline_processing(lambda rdd: calls.append(("action", rdd)))
+        test_executor.run_pipeline()
+
+        run_batch = mock_dstream.foreachRDD.call_args[0][0]
+        run_batch(1000, "rdd")
+        self.assertListEqual(calls, [("action", "rdd"), ("completed", 1000)],
+                             "on_batch_completed should be called after the action of the batch")
+
+    @mock.patch('pyspark.streaming.DStream')
+    @mock.patch('pyspark.streaming.StreamingContext')
+    def test_set_stream_processing(self, mock_streaming_context, mock_dstream):
+        test_executor = StreamingExecutor(mock_dstream, mock_streaming_context)
+        test_executor.set_stream_processing(lambda dstream: dstream.window(60, 10))
+        test_function = lambda rdd: rdd
+        test_executor.set_pipeline_processing(test_function)
+        test_executor.run_pipeline()
+
+        mock_dstream.window.assert_called_with(60, 10)
+        self.assertTrue(mock_dstream.window.return_value.foreachRDD.called,
+                        "Action should be applied to the processed stream")
+
+    @mock.patch('pyspark.streaming.DStream')
+    @mock.patch('pyspark.streaming.StreamingContext')
+    def test_stop_pipeline(self, mock_streaming_context, mock_dstream):
+        calls = []
+        mock_streaming_context.stop.side_effect = lambda **kwargs: calls.append(("stop", kwargs))
+        mock_streaming_context.sparkContext.stop.side_effect = lambda: calls.append(("stop_context",))
+        test_executor = StreamingExecutor(mock_dstream, mock_streaming_context)
+        test_executor.stop_pipeline(lambda: calls.append(("on_stopped",)))
+
+        self.assertListEqual(calls, [("stop", {"stopSparkContext": False, "stopGraceFully": True}), ("on_stopped",),
+                                     ("stop_context",)],
+                             "on_stopped should be called after the last batch before the spark context is stopped")
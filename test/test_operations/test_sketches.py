@@ -0,0 +1,79 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pickle
+import random
+from functools import reduce
+from unittest import TestCase
+
+from operations import sketches
+
+
+def aggregate(values, init, merge, partitions=4):
+    # merges states of every partition as reduceByKey does
+    states = [reduce(merge, map(init, values[number::partitions])) for number in range(partitions)]
+    return reduce(merge, map(lambda x: pickle.loads(pickle.dumps(x)), states))
+
+
+class SketchesTestCase(TestCase):
+    def test_average(self):
+        state = aggregate([1, 2, 3, 4, 5, 6, 7, 8], sketches.average_init, sketches.average_merge)
+        self.assertEqual(sketches.average_finalize(state), 4.5, "Average should be equal")
+
+    def test_hll_count_distinct(self):
+        values = ["192.168.{}.{}".format(x // 256, x % 256) for x in range(50000)] * 2
+        state = aggregate(values, sketches.hll_init, sketches.hll_merge)
+        self.assertAlmostEqual(sketches.hll_finalize(state), 50000, delta=50000 * 0.05,
+                               msg="Estimation of distinct values should be in 5% interval")
+
+    def test_hll_count_distinct_small_cardinality(self):
+        state = aggregate(["a", "b", "c", "a", "b"], sketches.hll_init, sketches.hll_merge)
+        self.assertIsInstance(state, dict, "State of small cardinality should be sparse")
+        self.assertEqual(sketches.hll_finalize(state), 3, "Small cardinality should be exact")
+
+    def test_quantiles(self):
+        values = list(range(100000))
+        random.shuffle(values)
+        state = aggregate(values, sketches.quantile_init, sketches.quantile_merge)
+        self.assertLess(sum(map(len, state)), 20 * sketches.QUANTILE_CAPACITY, "State should be bounded")
+        for quantile in (0.5, 0.9, 0.99):
+            self.assertAlmostEqual(sketches.quantile_finalize(state, quantile), quantile * 100000,
+                                   delta=100000 * 0.02, msg="Quantile should be in 2% interval")
+
+    def test_top_k(self):
+        values = ["heavy{}".format(x) for x in range(5) for _ in range(1000 - x)] + \
+                 ["light{}".format(x) for x in range(2000)]
+        random.shuffle(values)
+        state = aggregate(values, sketches.top_k_init, sketches.top_k_merge)
+        self.assertLessEqual(len(state), sketches.TOP_K_CAPACITY, "State should be bounded")
+        result = sketches.top_k_finalize(state).split(",")
+        self.assertListEqual([item.split(":")[0] for item in result[:5]], ["heavy0", "heavy1", "heavy2", "heavy3",
+                                                                            "heavy4"],
+                             "The most frequent values should be first")
+
+    def test_top_k_space_saving_bounds(self):
+        values = ["heavy{}".format(x) for x in range(3) for _ in range(300)] + \
+                 ["light{}".format(x) for x in range(5000)]
+        random.shuffle(values)
+        state = aggregate(values, sketches.top_k_init, sketches.top_k_merge)
+
+        error = len(values) / sketches.TOP_K_CAPACITY
+        for item in ("heavy0", "heavy1", "heavy2"):
+            self.assertGreaterEqual(state[item], 300, "Count should be an upper bound of the frequency")
+            self.assertLessEqual(state[item], 300 + error, "Count error should be bounded by n / capacity")
+
+        full = {"item{}".format(x): 2 for x in range(sketches.TOP_K_CAPACITY)}
+        state = sketches.top_k_merge(full, {"new": 1})
+        self.assertEqual(len(state), sketches.TOP_K_CAPACITY, "New value should replace the minimal counter")
+        self.assertEqual(state["new"], 3, "New value should get the minimal count plus its count")
@@ -0,0 +1,70 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from unittest import TestCase
+
+from output.async_sink import AsyncSink, get_sink
+
+
+class AsyncSinkTestCase(TestCase):
+    def test_submit_and_flush(self):
+        sink = AsyncSink(10, 2)
+        written = []
+        for number in range(20):
+            sink.submit(lambda x: written.append(x), number)
+        sink.flush()
+
+        self.assertListEqual(sorted(written), list(range(20)), "All writes should be done after flush")
+        self.assertEqual(sink.failures, 0, "Writes shouldn't fail")
+
+    def test_backpressure(self):
+        sink = AsyncSink(1)
+        release = threading.Event()
+        sink.submit(release.wait)
+        sink.submit(lambda: None)
+        threading.Timer(0.2, release.set).start()
+        sink.submit(lambda: None)
+        sink.flush()
+
+        self.assertGreater(sink.blocked_time, 0.1, "Producer should wait for a free place in the full queue")
+
+    def test_failed_write(self):
+        sink = AsyncSink(1)
+        sink.submit(lambda: 1 / 0)
+        sink.flush()
+
+        self.assertEqual(sink.failures, 1, "Failed write should be counted")
+        self.assertEqual(sink.take_statistics(), (1, 0.0))
+        self.assertEqual(sink.take_statistics(), (0, 0.0), "Taken statistics shouldn't be taken again")
+
+    def test_flush_timeout(self):
+        sink = AsyncSink(2)
+        release = threading.Event()
+        sink.submit(release.wait)
+
+        self.assertFalse(sink.flush(0.1), "Flush should stop waiting after the timeout")
+        release.set()
+        self.assertTrue(sink.flush(5), "Flush should return when the queue is empty")
+
+    def test_submit_returns_future(self):
+        sink = AsyncSink(2)
+        done = sink.submit(lambda x: x * 2, 21)
+        failed = sink.submit(lambda: 1 / 0)
+
+        self.assertEqual(done.result(5), 42, "Future should contain the result of the write")
+        self.assertIsInstance(failed.exception(5), ZeroDivisionError, "Future should contain the error of the write")
+
+    def test_get_sink(self):
+        self.assertIs(get_sink(5, 1), get_sink(5, 1), "Sink should be created once per process")
@@ -12,12 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import gzip
 import os
+import threading
+import time
 from unittest import TestCase
 from unittest.mock import Mock
 
+from influxdb.exceptions import InfluxDBServerError
+
 from pyspark.sql import SparkSession
 from config_parsing.config import Config
+from output.async_sink import get_sink
 from output.influx_writer import InfluxWriter
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), os.path.join("..", "data", "config_influx.json"))
@@ -115,3 +121,147 @@ class InfluxWriterTestCase(TestCase):
                              self.__class__.influx_options["measurement"]))
 
         self.assertEqual(points[0]["packet_size"], 6, "Value should be 6")
+
+    def test_write_points_by_batches_with_retry(self):
+        struct = {'operation_type': 'reduceByKey',
+                  'rule': [{'key': True, 'input_field': 'src_ip', 'func_name': ''},
+                           {'key': False, 'input_field': 'traffic', 'func_name': 'sum'}]}
+        config = Config(CONFIG_PATH)
+        self.__class__.influx_options = config.content["outputs"][0]["options"]["influx"]
+        client = InfluxDBClientMock(self.__class__.influx_options["host"], self.__class__.influx_options["port"],
+                                    self.__class__.influx_options["username"],
+                                    self.__class__.influx_options["password"],
+                                    self.__class__.influx_options["database"])
+        batches = []
+        failures = [InfluxDBServerError("timeout")]
+
+        def write_points(points):
+            if failures:
+                raise failures.pop()
+            batches.append(points)
+
+        client.write_points.side_effect = write_points
+        self.__class__.writer = InfluxWriter(client, self.__class__.influx_options["database"],
+                                             self.__class__.influx_options["measurement"], struct, {"traffic": 0},
+                                             {"batch_size": 2, "retries": 1, "retry_backoff": 0.01})
+
+        spark = SparkSession.builder.getOrCreate()
+        counters = self.__class__.writer._get_counters(spark.sparkContext)
+        write_points = self.__class__.writer._build_write_points()
+        write_points(client, [{"measurement": "points", "fields": {"traffic": x}, "tags": {"src_ip": "10.0.0.1"}}
+                              for x in range(5)], counters)
+
+        self.assertListEqual(list(map(len, batches)), [2, 2, 1], "Points should be written by chunks of batch_size")
+        self.assertEqual(batches[2][0]["fields"], {"traffic": 4}, "Points should be written in order")
+        statistics = self.__class__.writer.get_statistics()
+        self.assertEqual(statistics["points"], 5, "Counter should contain all written points")
+        self.assertEqual(statistics["requests"], 4, "Counter should contain requests with retries")
+
+        with self.assertLogs(level="INFO") as logs:
+            self.assertEqual(self.__class__.writer.report_statistics()["points"], 5, "Report should log the batch")
+        self.assertIn("Influx: 5 points written by 4 requests", logs.output[0])
+        self.assertEqual(self.__class__.writer.get_statistics()["points"], 0, "Counters should be reset by the report")
+
+    def test_async_write_reports_failures(self):
+        struct = {'operation_type': 'reduceByKey',
+                  'rule': [{'key': True, 'input_field': 'src_ip', 'func_name': ''},
+                           {'key': False, 'input_field': 'traffic', 'func_name': 'sum'}]}
+        config = Config(CONFIG_PATH)
+        self.__class__.influx_options = config.content["outputs"][0]["options"]["influx"]
+        client = Mock()
+        client.request.side_effect = InfluxDBServerError("timeout")
+        self.__class__.writer = InfluxWriter(client, self.__class__.influx_options["database"],
+                                             self.__class__.influx_options["measurement"], struct, {"traffic": 0},
+                                             {"async": True, "queue_size": 7, "flush_timeout": 5})
+
+        spark = SparkSession.builder.getOrCreate()
+        write_partition = self.__class__.writer.get_partition_lambda(spark.sparkContext)
+        write_partition(iter([("10.0.0.1", 1), ("10.0.0.2", 2)]))
+
+        self.assertTrue(client.request.called, "Task should wait until the queue is written")
+        statistics = self.__class__.writer.get_statistics()
+        self.assertEqual(statistics["points"], 2, "Queued points should be counted")
+        self.assertEqual(statistics["failed_writes"], 1, "Failed write should be sent to the driver by the task")
+
+    def test_async_write_waits_for_own_write(self):
+        struct = {'operation_type': 'reduceByKey',
+                  'rule': [{'key': True, 'input_field': 'src_ip', 'func_name': ''},
+                           {'key': False, 'input_field': 'traffic', 'func_name': 'sum'}]}
+        config = Config(CONFIG_PATH)
+        self.__class__.influx_options = config.content["outputs"][0]["options"]["influx"]
+        client = Mock()
+        self.__class__.writer = InfluxWriter(client, self.__class__.influx_options["database"],
+                                             self.__class__.influx_options["measurement"], struct, {"traffic": 0},
+                                             {"async": True, "queue_size": 9, "flush_threads": 2, "flush_timeout": 5})
+        # a slow write of another task occupies one thread of the sink
+        release = threading.Event()
+        get_sink(9, 2).submit(release.wait)
+
+        spark = SparkSession.builder.getOrCreate()
+        write_partition = self.__class__.writer.get_partition_lambda(spark.sparkContext)
+        started = time.time()
+        write_partition(iter([("10.0.0.1", 1)]))
+        release.set()
+
+        self.assertTrue(client.request.called, "Task should wait until its write is done")
+        self.assertLess(time.time() - started, 4, "Task shouldn't wait for writes of other tasks")
+
+    def test_final_write_is_synchronous(self):
+        struct = {'operation_type': 'reduceByKey',
+                  'rule': [{'key': True, 'input_field': 'src_ip', 'func_name': ''},
+                           {'key': False, 'input_field': 'traffic', 'func_name': 'sum'}]}
+        config = Config(CONFIG_PATH)
+        self.__class__.influx_options = config.content["outputs"][0]["options"]["influx"]
+        client = Mock()
+        self.__class__.writer = InfluxWriter(client, self.__class__.influx_options["database"],
+                                             self.__class__.influx_options["measurement"], struct, {"traffic": 0},
+                                             {"async": True, "queue_size": 11, "flush_timeout": 0})
+        written = []
+        get_sink(11, 1).submit(lambda: time.sleep(0.2) or written.append("queued"))
+        client.request.side_effect = lambda **kwargs: written.append("final")
+
+        spark = SparkSession.builder.getOrCreate()
+        write_partition = self.__class__.writer.get_partition_lambda(spark.sparkContext)
+        self.__class__.writer.stop()
+        write_partition(iter([("10.0.0.1", 1), ("10.0.0.2", 2)]))
+
+        self.assertListEqual(written, ["queued", "final"],
+                             "Final write should wait for queued writes of the worker and write its points itself")
+        statistics = self.__class__.writer.get_statistics()
+        self.assertEqual(statistics["points"], 2, "Written points should be counted")
+        self.assertEqual(statistics["requests"], 1, "Request of the final write should be counted")
+
+    def test_write_gzip_line_protocol(self):
+        struct = {'operation_type': 'reduce',
+                  'rule': [{'key': False, 'input_field': 'packet_size', 'func_name': 'Min'}]}
+        config = Config(CONFIG_PATH)
+        self.__class__.influx_options = config.content["outputs"][0]["options"]["influx"]
+        client = Mock()
+        self.__class__.writer = InfluxWriter(client, self.__class__.influx_options["database"],
+                                             self.__class__.influx_options["measurement"], struct,
+                                             {"packet_size": 0}, {"gzip": True})
+        self.__class__.writer.get_write_lambda()(6)
+
+        kwargs = client.request.call_args[1]
+        self.assertEqual(kwargs["headers"]["Content-Encoding"], "gzip", "Body should be compressed by gzip")
+        self.assertTrue(gzip.decompress(kwargs["data"]).decode("utf-8").startswith(
+            "{} packet_size=6i ".format(self.__class__.influx_options["measurement"])),
+            "Body should contain points in line protocol")
+
+    def test_write_lines_by_batches(self):
+        struct = {'operation_type': 'reduceByKey',
+                  'rule': [{'key': True, 'input_field': 'src_ip', 'func_name': ''},
+                           {'key': False, 'input_field': 'traffic', 'func_name': 'sum'}]}
+        config = Config(CONFIG_PATH)
+        self.__class__.influx_options = config.content["outputs"][0]["options"]["influx"]
+        client = Mock()
+        self.__class__.writer = InfluxWriter(client, self.__class__.influx_options["database"],
+                                             self.__class__.influx_options["measurement"], struct, {"traffic": 0},
+                                             {"batch_size": 2})
+
+        write_lines = self.__class__.writer._build_write_lines()
+        write_lines(client, [b"points traffic=1i 1", b"points traffic=2i 1", b"points traffic=3i 1"])
+
+        bodies = [call[1]["data"] for call in client.request.call_args_list]
+        self.assertListEqual(bodies, [b"points traffic=1i 1\npoints traffic=2i 1\n", b"points traffic=3i 1\n"],
+                             "Lines should be written by chunks of batch_size")
@@ -0,0 +1,43 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+
+from influxdb.line_protocol import make_lines
+
+from output.line_protocol import LineProtocolSerializer
+
+
+class LineProtocolSerializerTestCase(TestCase):
+    def test_serialize_partition_as_influxdb_python(self):
+        fields_mapping = {"traffic": 0, "packet size": 1, "avg": 2, "top_k": 3, "is_local": 4}
+        rows = [(("217.69.143.60", "ru"), 4000, 100, 1.5, "80:2,\"443\":1", False),
+                (("192.168.30.2", ""), 54000, None, 2.0, "a\\b", True),
+                (("10.0.0.1, 10.0.0.2", "us=1"), 1, 2, 1e+20, "", False)]
+        serializer = LineProtocolSerializer("points, test", ["src_ip", "country"], fields_mapping)
+
+        lines = serializer.serialize_partition(iter(rows), "1500000000000000000")
+
+        points = [{"measurement": "points, test", "time": 1500000000000000000,
+                   "tags": {"src_ip": row[0][0], "country": row[0][1]},
+                   "fields": {name: row[1:][index] for name, index in fields_mapping.items()}} for row in rows]
+        expected = make_lines({"points": points}).replace("=True", "=true").replace("=False", "=false")
+        self.assertEqual(b"\n".join(lines).decode("utf-8") + "\n", expected,
+                         "Lines should be equal to lines of influxdb-python")
+
+    def test_serialize_row_without_fields(self):
+        serializer = LineProtocolSerializer("points", ["src_ip"], {"traffic": 0})
+        self.assertIsNone(serializer.serialize_row(("10.0.0.1",), (None,), "1"), "Row without fields should be skipped")
+        self.assertEqual(serializer.serialize_row(("10.0.0.1",), (10,), "1"), "points,src_ip=10.0.0.1 traffic=10i 1",
+                         "Line should be equal")
@@ -0,0 +1,67 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import io
+from contextlib import redirect_stdout
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from pyspark import RDD
+from pyspark.sql import SparkSession
+
+from errors import errors
+from output.std_out_writer import StdOutWriter
+
+
+class StdOutWriterTestCase(TestCase):
+    def _print(self, writer, rdd):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            writer.get_write_lambda()(rdd)
+        return output.getvalue().splitlines()[1:]
+
+    def test_print_rdd_without_collect(self):
+        rdd = MagicMock(spec=RDD)
+        rdd.toLocalIterator.return_value = iter([(("10.0.0.1",), 1), (("10.0.0.2",), 2), (("10.0.0.3",), 3)])
+        rdd.take.return_value = [(("10.0.0.1",), 1)]
+
+        lines = self._print(StdOutWriter({"page_size": 2}), rdd)
+        self.assertListEqual(lines, ["(('10.0.0.1',), 1)", "(('10.0.0.2',), 2)", "- - - - - - - - - - - - - -",
+                                     "(('10.0.0.3',), 3)"], "All records should be printed by pages")
+
+        lines = self._print(StdOutWriter({"mode": "take", "limit": 1}), rdd)
+        rdd.take.assert_called_with(1)
+        self.assertListEqual(lines, ["(('10.0.0.1',), 1)"], "First records should be printed")
+
+        rdd.sample.return_value.take.return_value = [(("10.0.0.2",), 2)]
+        lines = self._print(StdOutWriter({"mode": "sample", "fraction": 0.5, "limit": 10}), rdd)
+        rdd.sample.assert_called_with(False, 0.5)
+        self.assertListEqual(lines, ["(('10.0.0.2',), 2)"], "Sample should be printed")
+
+        self.assertFalse(rdd.collect.called, "Rdd shouldn't be collected on the driver")
+
+    def test_print_partition(self):
+        output = io.StringIO()
+        with redirect_stdout(output):
+            StdOutWriter({"mode": "take", "limit": 2}).get_partition_lambda(None)(iter([1, 2, 3]))
+        self.assertListEqual(output.getvalue().splitlines(), ["1", "2"], "Partition should be limited")
+
+    def test_print_rdd_pages_on_local_spark(self):
+        rdd = SparkSession.builder.getOrCreate().sparkContext.parallelize(range(5), 3)
+        lines = self._print(StdOutWriter({"page_size": 10}), rdd)
+        self.assertListEqual(lines, ["0", "1", "2", "3", "4"], "All records should be printed")
+
+    def test_unsupported_mode(self):
+        with self.assertRaises(errors.UnsupportedOutputFormat):
+            StdOutWriter({"mode": "collect"})
@@ -14,13 +14,18 @@
 
 from unittest import TestCase
 import os
+import pickle
+import tempfile
+import time
 import types
 import json
 
 from config_parsing.config import Config
 from pyspark.sql import SparkSession
+from pyspark.streaming import StreamingContext
 from pyspark.sql.types import StructType, StructField, LongType, StringType
-from processor.aggregation_processor import AggregationProcessor
+from processor.aggregation_processor import AggregationProcessor, measure_state
+from singelton.driver_function import DriverFunction
 
 traffic = StructField('traffic', LongType())
 src_ip = StructField('src_ip', StringType())
@@ -148,3 +153,186 @@ class TestAggregationProcessor(TestCase):
                              [(("192.168.30.2",), 1900, 60000), (("217.69.143.60",), 200, 8000)],
                              "Lists should be equal")
         spark.stop()
+
+    def test_build_lambda_for_reduce_by_key_partial_aggregation(self):
+        spark = SparkSession.builder.getOrCreate()
+        sc = spark.sparkContext
+
+        rdd = sc.parallelize([
+            ("217.69.143.60", 100, 4000),
+            ("217.69.143.60", 100, 4000),
+            ("192.168.30.2", 1500, 54000),
+            ("192.168.30.2", 200, 3000),
+            ("192.168.30.2", 200, 3000)
+        ], 2)
+
+        config = Config(CONFIG_PATH)
+        config.content["processing"]["aggregations"]["partial_aggregation"] = True
+        aggregation_processor = AggregationProcessor(config, data_struct)
+
+        partial_aggregation = aggregation_processor._get_partial_aggregation_lambda()
+        partitions = partial_aggregation(rdd).glom().collect()
+        for partition in partitions:
+            keys = [record[0] for record in partition]
+            self.assertEqual(len(keys), len(set(keys)), "Partition should contain one record per key")
+
+        aggregation_lambda = aggregation_processor.get_aggregation_lambda()
+        output_list = sorted(aggregation_lambda(rdd).collect(), key=lambda x: x[0][0])
+
+        self.assertListEqual(output_list,
+                             [(("192.168.30.2",), 1900, 60000), (("217.69.143.60",), 200, 8000)],
+                             "Lists should be equal")
+        spark.stop()
+
+    def test_build_lambda_for_state_aggregation(self):
+        spark = SparkSession.builder.getOrCreate()
+        sc = spark.sparkContext
+
+        rdd = sc.parallelize([
+            ("217.69.143.60", 100, 4000),
+            ("217.69.143.60", 300, 4000),
+            ("192.168.30.2", 1500, 54000),
+            ("192.168.30.2", 200, 3000),
+            ("192.168.30.2", 100, 3000)
+        ], 2)
+        rule = ["key: src_ip", "avg(packet_size)", "count_distinct(traffic)"]
+
+        for partial_aggregation in (False, True):
+            config = TestConfig({"processing": {"aggregations": {"operation_type": "reduceByKey", "rule": rule,
+                                                                 "partial_aggregation": partial_aggregation}}})
+            aggregation_processor = AggregationProcessor(config, data_struct)
+            aggregation_lambda = aggregation_processor.get_aggregation_lambda()
+            output_list = sorted(aggregation_lambda(rdd).collect(), key=lambda x: x[0][0])
+
+            self.assertListEqual(output_list,
+                                 [(("192.168.30.2",), 600.0, 2), (("217.69.143.60",), 200.0, 1)],
+                                 "Lists should be equal")
+
+        config = TestConfig({"processing": {"aggregations": {"operation_type": "reduce",
+                                                             "rule": ["count(src_ip)", "median(packet_size)",
+                                                                      "top_k(traffic)"]}}})
+        aggregation_processor = AggregationProcessor(config, data_struct)
+        test_result = aggregation_processor.get_aggregation_lambda()(rdd)
+        self.assertEqual(test_result[:2], (5, 200.0), "Error in aggregation operation. Tuple should be equal")
+        self.assertSetEqual(set(test_result[2].split(",")[:2]), {"4000:2", "3000:2"},
+                            "The most frequent values should be first")
+        spark.stop()
+
+    def _run_stream_aggregation(self, sc, aggregation_processor, batches, batches_count):
+        """
+        Runs the stream aggregation on batches, returns results of batches and sizes of the state. Batches are read
+        by a file stream, which can be checkpointed unlike a queue stream: the file of a batch gets a modification
+        time between the previous batch and its batch, so every batch reads only its file
+        """
+        stream_aggregation = aggregation_processor.get_stream_aggregation_lambda()
+        postprocessing = aggregation_processor.get_stream_postprocessing_lambda()
+        ssc = StreamingContext(sc, 1)
+        directory, files = tempfile.mkdtemp(), tempfile.mkdtemp()
+        # batch time in seconds -> (result, size of the state)
+        results = {}
+
+        def collect_batch(batch_time, rdd):
+            results[int(time.mktime(batch_time.timetuple()))] = (
+                sorted(postprocessing(rdd).collect(), key=lambda x: x[0][0]), aggregation_processor.get_state_size())
+
+        collect_batch = DriverFunction(collect_batch)
+        dstream = ssc.textFileStream(directory).map(lambda line: line.split(",")) \
+            .map(lambda fields: (fields[0], int(fields[1]), int(fields[2])))
+        stream_aggregation(dstream).foreachRDD(lambda batch_time, rdd: collect_batch(batch_time, rdd))
+        ssc.start()
+
+        first_batch = int(time.time()) + 3
+        for number, batch in enumerate(batches):
+            path = os.path.join(files, "batch{}".format(number))
+            with open(path, "w") as batch_file:
+                batch_file.writelines(map(lambda row: "{},{},{}\n".format(*row), batch))
+            os.utime(path, (first_batch + number - 0.5, first_batch + number - 0.5))
+            os.rename(path, os.path.join(directory, "batch{}".format(number)))
+
+        batch_times = list(range(first_batch, first_batch + batches_count))
+        for _ in range(60):
+            if all(map(lambda x: x in results, batch_times)) or ssc.awaitTerminationOrTimeout(1):
+                break
+        ssc.stop(stopSparkContext=False, stopGraceFully=True)
+        return [results[x][0] for x in batch_times], [results[x][1] for x in batch_times]
+
+    def test_window_aggregation_lambda(self):
+        spark = SparkSession.builder.getOrCreate()
+        sc = spark.sparkContext
+        batches = [[("217.69.143.60", 100, 4000), ("192.168.30.2", 1500, 54000)],
+                   [("217.69.143.60", 300, 1000)],
+                   [("192.168.30.2", 200, 3000)]]
+
+        for rule, expected in ((["key: src_ip", "sum(packet_size)", "count(traffic)"],
+                                [[(("192.168.30.2",), 1500, 1), (("217.69.143.60",), 100, 1)],
+                                 [(("192.168.30.2",), 1500, 1), (("217.69.143.60",), 400, 2)],
+                                 [(("192.168.30.2",), 200, 1), (("217.69.143.60",), 300, 1)],
+                                 [(("192.168.30.2",), 200, 1)]]),
+                               (["key: src_ip", "max(packet_size)", "min(traffic)"],
+                                [[(("192.168.30.2",), 1500, 54000), (("217.69.143.60",), 100, 4000)],
+                                 [(("192.168.30.2",), 1500, 54000), (("217.69.143.60",), 300, 1000)],
+                                 [(("192.168.30.2",), 200, 3000), (("217.69.143.60",), 300, 1000)],
+                                 [(("192.168.30.2",), 200, 3000)]])):
+            config = TestConfig({"processing": {"aggregations": {"operation_type": "reduceByKey", "rule": rule,
+                                                                 "window": 2, "slide": 1,
+                                                                 "checkpoint_directory": tempfile.mkdtemp()}}})
+            aggregation_processor = AggregationProcessor(config, data_struct)
+            results, _ = self._run_stream_aggregation(sc, aggregation_processor, batches, len(expected))
+
+            self.assertListEqual(results, expected, "Every window should contain the last two batches")
+        spark.stop()
+
+    def test_stateful_aggregation_lambda(self):
+        spark = SparkSession.builder.getOrCreate()
+        sc = spark.sparkContext
+        batches = [[("217.69.143.60", 100, 4000), ("192.168.30.2", 1500, 54000)],
+                   [("217.69.143.60", 300, 1000), ("217.69.143.60", 100, 1000)],
+                   [],
+                   [("192.168.30.2", 200, 3000)]]
+
+        for timeout, expected, state_keys in ((None, [[(("192.168.30.2",), 1500, 1), (("217.69.143.60",), 100, 1)],
+                                                      [(("217.69.143.60",), 500, 3)],
+                                                      [],
+                                                      [(("192.168.30.2",), 1700, 2)]], [2, 2, 2, 2]),
+                                              (0, [[(("192.168.30.2",), 1500, 1), (("217.69.143.60",), 100, 1)],
+                                                   [(("217.69.143.60",), 500, 3)],
+                                                   [],
+                                                   [(("192.168.30.2",), 200, 1)]], [2, 1, 0, 1])):
+            config = TestConfig({"processing": {"aggregations": {"operation_type": "reduceByKey",
+                                                                 "rule": ["key: src_ip", "sum(packet_size)",
+                                                                          "count(traffic)"],
+                                                                 "stateful": True, "state_timeout": timeout,
+                                                                 "state_report_interval": 1,
+                                                                 "checkpoint_directory": tempfile.mkdtemp()}}})
+            aggregation_processor = AggregationProcessor(config, data_struct)
+            results, state_sizes = self._run_stream_aggregation(sc, aggregation_processor, batches, len(expected))
+
+            self.assertListEqual(results, expected, "Only keys updated in the batch should be returned")
+            self.assertListEqual(list(map(lambda x: x[0], state_sizes[:len(expected)])), state_keys,
+                                 "Number of keys of the state should be measured every batch")
+            self.assertTrue(all(map(lambda x: (x[1] > 0) == (x[0] > 0), state_sizes[:len(expected)])),
+                            "Size of the state should be estimated")
+        spark.stop()
+
+    def test_state_is_measured_every_report_interval(self):
+        spark = SparkSession.builder.getOrCreate()
+        sc = spark.sparkContext
+        entries = [(("10.0.0.{}".format(x),), ((x, 1), 0.0, True)) for x in range(5000)]
+        keys, size = measure_state(sc.parallelize(entries, 4))
+        self.assertEqual(keys, 5000, "Every entry should be counted")
+        self.assertAlmostEqual(size, sum(map(lambda x: len(pickle.dumps(x, pickle.HIGHEST_PROTOCOL)), entries)),
+                               delta=size * 0.1, msg="Size should be estimated by the sample")
+
+        config = TestConfig({"processing": {"aggregations": {"operation_type": "reduceByKey",
+                                                             "rule": ["key: src_ip", "sum(packet_size)",
+                                                                      "count(traffic)"],
+                                                             "stateful": True, "state_report_interval": 2}}})
+        aggregation_processor = AggregationProcessor(config, data_struct)
+        rdd = sc.parallelize(entries[:10])
+        aggregation_processor._report_state(rdd)
+        self.assertIsNone(aggregation_processor.get_state_size(), "State shouldn't be measured before the interval")
+        with self.assertLogs(level="INFO") as logs:
+            aggregation_processor._report_state(rdd)
+        self.assertEqual(aggregation_processor.get_state_size()[0], 10)
+        self.assertIn("Aggregation state: 10 keys", logs.output[0])
+        spark.stop()
@@ -0,0 +1,90 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from unittest import TestCase
+
+from pyspark.sql.types import StructType, StructField, StringType, LongType
+
+from config_parsing.transformations_parser import FieldTransformation, SyntaxTree
+from config_parsing.transformations_validator import TransformationsValidator
+from errors import errors
+from operations.transformation_operations import TransformationOperations
+from processor.cidr_operations import CidrIndex, parse_network
+from singelton.worker_cache import clear_worker_cache
+
+
+class CidrOperationsTestCase(TestCase):
+    def setUp(self):
+        clear_worker_cache()
+
+    def tearDown(self):
+        clear_worker_cache()
+
+    def test_parse_network(self):
+        self.assertEqual(parse_network("10.0.0.0/8"), (0x0A000000, 0x0AFFFFFF))
+        self.assertEqual(parse_network("10.1.2.3/24"), (0x0A010200, 0x0A0102FF))
+        self.assertEqual(parse_network("10.1.2.3"), (0x0A010203, 0x0A010203))
+        with self.assertRaises(ValueError):
+            parse_network("10.0.0.0/33")
+
+    def test_lookup_returns_most_specific_network(self):
+        index = CidrIndex([("10.0.0.0/8", "corp"), ("10.1.0.0/16", "site1"), ("10.1.2.0/24", "lab"),
+                           ("10.2.0.0/16", "site2"), ("192.168.0.0/24", "home")])
+
+        self.assertEqual(index.lookup("10.0.0.1"), "corp")
+        self.assertEqual(index.lookup("10.1.0.1"), "site1")
+        self.assertEqual(index.lookup("10.1.2.200"), "lab")
+        self.assertEqual(index.lookup("10.1.3.1"), "site1")
+        self.assertEqual(index.lookup("10.2.255.255"), "site2")
+        self.assertEqual(index.lookup("10.3.0.0"), "corp")
+        self.assertEqual(index.lookup("10.255.255.255"), "corp")
+        self.assertEqual(index.lookup("192.168.0.7"), "home")
+        self.assertEqual(index.lookup("192.168.1.7"), "unknown")
+        self.assertEqual(index.lookup("8.8.8.8"), "unknown")
+        self.assertEqual(index.lookup("not an address"), "unknown")
+        self.assertEqual(len(index), 7, "Nested networks should be split into disjoint intervals")
+
+    def test_cidr_operation_reads_table_from_databases(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "customers.csv")
+            with open(path, "w") as table:
+                table.write("network,customer\n10.0.0.0/8,acme\n172.16.0.0/12,globex\n")
+            operations = TransformationOperations({"databases": {"customers": path}})
+            cidr = operations.operations_dict["cidr"]
+
+            self.assertEqual(cidr.func("'customers'", "172.20.1.1"), "globex")
+            self.assertEqual(cidr.func("customers", "10.0.0.1"), "acme")
+            self.assertEqual(cidr.func("customers", "8.8.8.8"), "unknown")
+
+        self.assertEqual(cidr.result_type([StringType(), StringType()]), StringType())
+        with self.assertRaises(errors.IncorrectArgumentTypeForOperationError):
+            cidr.result_type([StringType(), LongType()])
+
+    def test_validator_checks_table_name(self):
+        operations = TransformationOperations({"databases": {"customers": "customers.csv"}})
+        validator = TransformationsValidator(operations, StructType([StructField("src_ip", StringType())]))
+        tree = SyntaxTree()
+        tree.operation = "cidr"
+
+        tree.children = ["'customers'", "src_ip"]
+        self.assertEqual(validator.validate([FieldTransformation("customer", tree)]),
+                         StructType([StructField("customer", StringType())]))
+        tree.children = ["'custmers'", "src_ip"]
+        with self.assertRaises(errors.LookupTableError):
+            validator.validate([FieldTransformation("customer", tree)])
+        tree.children = ["src_ip", "src_ip"]
+        with self.assertRaises(errors.IncorrectArgumentTypeForOperationError):
+            validator.validate([FieldTransformation("customer", tree)])
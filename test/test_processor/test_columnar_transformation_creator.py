@@ -0,0 +1,105 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+import os
+from unittest import TestCase
+
+from config_parsing.transformations_parser import TransformationsParser
+from operations.transformation_operations import TransformationOperations
+from processor.columnar_transformation_creator import ColumnarTransformationCreator
+from processor.transformation_creator import TransformationCreator
+
+DATA_PATH = os.path.join(
+    os.path.dirname(__file__),
+    os.path.join("..", "data", "test.csv"))
+
+
+class ColumnarTransformationCreatorTestCase(TestCase):
+    def setUp(self):
+        with open(os.path.join(
+                os.path.dirname(__file__),
+                os.path.join("..", "data", "config_data_structure.json"))) as cfg:
+            self.data_structure = json.load(cfg)
+        with open(os.path.join(
+                os.path.dirname(__file__),
+                os.path.join("..", "data", "config.json"))) as cfg:
+            self.config = json.load(cfg)
+
+        types = [None] * len(self.data_structure)
+        for field in self.data_structure.values():
+            types[field["index"]] = int if field["type"] in ("LongType", "IntegerType") else str
+        with open(DATA_PATH) as data:
+            self.rows = [[types[i](value) for i, value in enumerate(line.strip().split(","))] for line in data]
+
+    def _assert_same_as_row_transformation(self, transformation):
+        parser = TransformationsParser(transformation)
+        parser.run()
+        operations = TransformationOperations(self.config)
+
+        row_transformation = TransformationCreator(self.data_structure, parser.expanded_transformation,
+                                                   operations).build_lambda()
+        partition_transformation = ColumnarTransformationCreator(self.data_structure,
+                                                                 parser.expanded_transformation,
+                                                                 operations).build_lambda()
+
+        self.assertListEqual(partition_transformation(iter(self.rows)),
+                             [row_transformation(row) for row in self.rows],
+                             "Columnar transformation should give the same tuples as row transformation")
+
+    def test_build_lambda_arithmetic(self):
+        self._assert_same_as_row_transformation(["src_ip",
+                                                 "traffic: mul(packet_size,sampling_rate)",
+                                                 "nested: sub(add(mul(packet_size,10),ip_size),1)",
+                                                 "ratio: mathdiv(ip_size,packet_size)",
+                                                 "rest: odd(packet_size,7)"])
+
+    def test_build_lambda_boolean_and_casts(self):
+        self._assert_same_as_row_transformation(["big: gt(packet_size,1000)",
+                                                 "small: le(ip_size,52)",
+                                                 "both: and(gt(packet_size,70),lt(ip_size,1000))",
+                                                 "size: double(packet_size)",
+                                                 "counter: one(timestamp)"])
+
+    def test_build_lambda_strings_and_literals(self):
+        self._assert_same_as_row_transformation(["source: concat('src - ',src_ip)",
+                                                 "short: truncate(src_ip,3)",
+                                                 "input: config('input.input_type')",
+                                                 "number: 13"])
+
+    def test_build_lambda_division_by_zero(self):
+        rows = [row[:] for row in self.rows]
+        rows[1][self.data_structure["packet_size"]["index"]] = 0
+        operations = TransformationOperations(self.config)
+        for operation in ("odd", "pydiv", "mathdiv"):
+            parser = TransformationsParser(["result: {}(ip_size,packet_size)".format(operation)])
+            parser.run()
+            row_transformation = TransformationCreator(self.data_structure, parser.expanded_transformation,
+                                                       operations).build_lambda()
+            partition_transformation = ColumnarTransformationCreator(self.data_structure,
+                                                                     parser.expanded_transformation,
+                                                                     operations).build_lambda()
+
+            with self.assertRaises(ZeroDivisionError):
+                [row_transformation(row) for row in rows]
+            with self.assertRaises(ZeroDivisionError, msg="Columnar {} should fail as row one".format(operation)):
+                partition_transformation(iter(rows))
+
+    def test_build_lambda_empty_partition(self):
+        parser = TransformationsParser(["traffic: mul(packet_size,sampling_rate)"])
+        parser.run()
+        partition_transformation = ColumnarTransformationCreator(self.data_structure,
+                                                                 parser.expanded_transformation,
+                                                                 TransformationOperations(self.config)).build_lambda()
+        self.assertListEqual(partition_transformation(iter([])), [], "Empty partition should give empty list")
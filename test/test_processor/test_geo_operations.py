@@ -0,0 +1,110 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import logging
+import pickle
+from unittest import TestCase
+from unittest.mock import patch, MagicMock
+
+from pyspark.sql.types import StringType, LongType
+
+from errors import errors
+from operations.transformation_operations import TransformationOperations
+from processor import geo_operations
+from processor.geo_operations import GeoLookup
+from singelton.worker_cache import clear_worker_cache
+
+CONFIG = {"processing": {"geo_cache_size": 2},
+          "databases": {"country": "./GeoLite2/GeoLite2-Country.mmdb", "asn": "./GeoLite2/GeoLite2-ASN.mmdb"}}
+
+
+class GeoOperationsTestCase(TestCase):
+    def setUp(self):
+        clear_worker_cache()
+        self.root_level = logging.getLogger().level
+
+    def tearDown(self):
+        clear_worker_cache()
+        logging.getLogger().setLevel(self.root_level)
+
+    def test_operations_are_registered_for_databases(self):
+        operations = TransformationOperations(CONFIG)
+
+        self.assertIn("country", operations.operations_dict)
+        self.assertIn("asn", operations.operations_dict)
+        self.assertNotIn("city", operations.operations_dict, "City database isn't listed in the config")
+        self.assertEqual(operations.operations_dict["country"].result_type([StringType()]), StringType())
+        with self.assertRaises(errors.IncorrectArgumentTypeForOperationError):
+            operations.operations_dict["asn"].result_type([LongType()])
+
+    @patch('processor.geo_operations._lookup')
+    def test_lookups_are_cached(self, mock_lookup):
+        mock_lookup.side_effect = lambda name, path, ip_addr: "{}:{}".format(name, ip_addr)
+        country = TransformationOperations(CONFIG).operations_dict["country"].func
+
+        results = list(map(country, ["8.8.8.8", "8.8.8.8", "1.1.1.1", "8.8.8.8"]))
+
+        self.assertListEqual(results, ["country:8.8.8.8", "country:8.8.8.8", "country:1.1.1.1", "country:8.8.8.8"])
+        self.assertEqual(mock_lookup.call_count, 2, "Repeated addresses should be taken from the cache")
+        info = country.cache_info()
+        self.assertEqual((info.hits, info.misses), (2, 2))
+
+    @patch('processor.geo_operations._open_reader')
+    def test_every_database_has_its_own_reader(self, mock_open_reader):
+        mock_open_reader.side_effect = lambda path: MagicMock(name=path)
+
+        country_reader = geo_operations.get_reader("country.mmdb")
+
+        self.assertIs(geo_operations.get_reader("country.mmdb"), country_reader)
+        self.assertIsNot(geo_operations.get_reader("city.mmdb"), country_reader)
+        self.assertEqual(mock_open_reader.call_count, 2)
+
+    @patch('processor.geo_operations._lookup')
+    def test_lookup_is_pickled_without_cache(self, mock_lookup):
+        mock_lookup.return_value = "Russia"
+        lookup = GeoLookup("country", "country.mmdb", 10)
+        lookup("8.8.8.8")
+
+        restored = pickle.loads(pickle.dumps(lookup))
+
+        self.assertIsNone(restored._lookup)
+        self.assertEqual(restored("8.8.8.8"), "Russia")
+
+    @patch('processor.geo_operations._lookup')
+    def test_statistics_are_logged_in_configured_worker(self, mock_lookup):
+        mock_lookup.return_value = "Russia"
+        logging.getLogger().setLevel(logging.WARNING)
+        lookup = TransformationOperations(CONFIG).operations_dict["country"].func
+        lookup("8.8.8.8")
+        lookup("8.8.8.8")
+
+        lookup.log_statistics()
+        self.assertTrue(logging.getLogger().isEnabledFor(logging.INFO),
+                        "Report should configure logging of the worker process")
+        with self.assertLogs(level="INFO") as logs:
+            lookup.log_statistics()
+        self.assertIn("country lookups: 2, cache hit rate: 50.00%", logs.output[0])
+
+    @patch('processor.geo_operations._lookup')
+    def test_statistics_are_reported_by_lookups_of_worker(self, mock_lookup):
+        mock_lookup.return_value = "Russia"
+        lookup = GeoLookup("country", "country.mmdb", 10, report_interval=3)
+        # every task of the worker gets its own copy of the function
+        first_task, second_task = pickle.loads(pickle.dumps(lookup)), pickle.loads(pickle.dumps(lookup))
+        first_task("8.8.8.8")
+        first_task("1.1.1.1")
+
+        with self.assertLogs(level="INFO") as logs:
+            second_task("8.8.8.8")
+        self.assertIn("country lookups: 3", logs.output[0], "Lookups of all tasks of the worker should be counted")
@@ -0,0 +1,101 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+from unittest import TestCase
+
+from pyspark import SparkContext
+from pyspark.sql.types import StructType, StructField, StringType, LongType, DoubleType
+
+from config_parsing.transformations_parser import FieldTransformation, SyntaxTree
+from config_parsing.transformations_validator import TransformationsValidator
+from errors import errors
+from operations.transformation_operations import TransformationOperations
+from processor.lookup_operations import load_table
+
+
+class LookupOperationsTestCase(TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.sites = os.path.join(self.directory.name, "sites.csv")
+        with open(self.sites, "w") as table:
+            table.write("sensor_id:LongType,site:StringType\n1,north\n2,south\n")
+        self.weights = os.path.join(self.directory.name, "weights.csv")
+        with open(self.weights, "w") as table:
+            table.write("site:StringType,weight:DoubleType\nnorth,0.5\n")
+        self.operations = TransformationOperations({"databases": {"sites": self.sites, "weights": self.weights}})
+        self.data_structure = StructType([StructField("sensor_id", LongType()), StructField("site", StringType())])
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _lookup_tree(self, table, field):
+        tree = SyntaxTree()
+        tree.operation = "lookup"
+        tree.children = [table, field]
+        return tree
+
+    def test_load_table_converts_types_from_header(self):
+        table, key_type, value_type = load_table(self.weights)
+
+        self.assertEqual(table, {"north": 0.5})
+        self.assertEqual(key_type, StringType())
+        self.assertEqual(value_type, DoubleType())
+
+        with open(self.sites, "w") as table:
+            table.write("sensor_id,site\n1,north\n")
+        with self.assertRaises(errors.LookupTableError):
+            load_table(self.sites)
+
+    def test_lookup_returns_value_or_none(self):
+        lookup = self.operations.operations_dict["lookup"]
+
+        self.assertEqual(lookup.func("'sites'", 2), "south")
+        self.assertIsNone(lookup.func("'sites'", 3))
+        with self.assertRaises(errors.LookupTableError):
+            lookup.func("'unknown'", 1)
+
+    def test_validator_takes_result_type_from_table(self):
+        validator = TransformationsValidator(self.operations, self.data_structure)
+
+        fields = validator.validate([FieldTransformation("site_name", self._lookup_tree("'sites'", "sensor_id")),
+                                     FieldTransformation("weight", self._lookup_tree("'weights'", "site"))])
+
+        self.assertEqual(fields, StructType([StructField("site_name", StringType()),
+                                             StructField("weight", DoubleType())]))
+
+    def test_validator_checks_table_and_key_type(self):
+        validator = TransformationsValidator(self.operations, self.data_structure)
+
+        with self.assertRaises(errors.IncorrectArgumentTypeForOperationError):
+            validator.validate([FieldTransformation("site_name", self._lookup_tree("'sites'", "site"))])
+        with self.assertRaises(errors.IncorrectArgumentTypeForOperationError):
+            validator.validate([FieldTransformation("site_name", self._lookup_tree("site", "sensor_id"))])
+        with self.assertRaises(errors.LookupTableError):
+            validator.validate([FieldTransformation("site_name", self._lookup_tree("'unknown'", "sensor_id"))])
+
+    def test_tables_are_sent_by_broadcast(self):
+        sc = SparkContext.getOrCreate()
+        lookup = self.operations.operations_dict["lookup"]
+        lookup.func("'sites'", 1)
+
+        state = lookup.func.__getstate__()
+        self.assertEqual(state["_tables"], {}, "Tables should not be pickled with the function")
+        self.assertEqual(state["_broadcast"].value["sites"][0], {1: "north", 2: "south"})
+        self.assertIs(lookup.func.__getstate__()["_broadcast"], state["_broadcast"],
+                      "Broadcast should be reused while the tables don't change")
+
+        values = sc.parallelize([1, 2, 3]).map(lambda key: lookup.func("'sites'", key)).collect()
+        self.assertEqual(values, ["north", "south", None])
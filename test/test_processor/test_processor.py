@@ -32,4 +32,10 @@ class ProcessorTestCase(unittest.TestCase):
     def test__number__(self):
         config = Config(CONFIG_PATH_NUM)
         p = Processor(config)
-        self.assertIsInstance(p.transformation, types.LambdaType, "Processor#transformation should be a lambda object")
\ No newline at end of file
+        self.assertIsInstance(p.transformation, types.LambdaType, "Processor#transformation should be a lambda object")
+
+    def test_used_input_fields(self):
+        config = Config(CONFIG_PATH)
+        p = Processor(config)
+        self.assertSetEqual(p.used_input_fields, {"packet_size", "sampling_rate"},
+                            "Processor#used_input_fields should contain only fields referenced by transformation")
@@ -0,0 +1,89 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+
+from pyspark.sql import SparkSession
+
+from config_parsing.config import Config
+from errors.errors import NotValidAggregationExpression
+from processor.processor import Processor
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.path.join("..", "data", "test.csv"))
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), os.path.join("..", "data", "config_processor.json"))
+CONFIG_PATH_REDUCE_BY_KEY = os.path.join(os.path.dirname(__file__),
+                                         os.path.join("..", "data", "config_reduce_by_key.json"))
+
+
+class SqlProcessingParityTestCase(unittest.TestCase):
+    def _run(self, mode, config_path, transformation=None, rule=None):
+        config = Config(config_path)
+        config.content["processing"]["mode"] = mode
+        if transformation:
+            config.content["processing"]["transformation"] = transformation
+        if rule:
+            config.content["processing"]["aggregations"]["rule"] = rule
+
+        spark = SparkSession.builder.getOrCreate()
+        rdd = spark.read.csv(DATA_PATH, config.data_structure_pyspark).rdd
+        return Processor(config).get_pipeline_processing()(rdd)
+
+    def _run_both_modes(self, config_path, transformation=None, rule=None):
+        return [self._run(mode, config_path, transformation, rule) for mode in ["rdd", "sql"]]
+
+    def test_reduce_parity(self):
+        rdd_result, sql_result = self._run_both_modes(CONFIG_PATH)
+        self.assertTupleEqual(sql_result, rdd_result, "Sql mode should give the same tuple as rdd mode")
+
+    def test_reduce_by_key_parity(self):
+        rdd_result, sql_result = self._run_both_modes(CONFIG_PATH_REDUCE_BY_KEY)
+        self.assertListEqual(sorted(sql_result.collect()), sorted(rdd_result.collect()),
+                             "Sql mode should give the same records as rdd mode")
+
+    def test_reduce_by_key_expressions_parity(self):
+        transformation = ["src_ip",
+                          "dst_ip",
+                          "big: long(gt(packet_size,1000))",
+                          "counter: one(timestamp)",
+                          "kbytes: mathdiv(mul(packet_size,sampling_rate),1024)"]
+        rule = ["key: (src_ip, dst_ip)", "sum(big)", "sum(counter)", "max(kbytes)"]
+        rdd_result, sql_result = self._run_both_modes(CONFIG_PATH_REDUCE_BY_KEY, transformation, rule)
+        self.assertListEqual(sorted(sql_result.collect()), sorted(rdd_result.collect()),
+                             "Sql mode should give the same records as rdd mode")
+
+    def test_python_semantics_parity(self):
+        transformation = ["src_ip",
+                          "rest: odd(sub(packet_size,sampling_rate),7)",
+                          "ratio: pydiv(packet_size,sampling_rate)",
+                          "known: boolean(dst_ip)"]
+        rule = ["key: (src_ip, known)", "min(rest)", "max(ratio)"]
+        rdd_result, sql_result = self._run_both_modes(CONFIG_PATH_REDUCE_BY_KEY, transformation, rule)
+        self.assertListEqual(sorted(sql_result.collect()), sorted(rdd_result.collect()),
+                             "Sql mode should follow python modulo and boolean casts as rdd mode")
+
+    def test_division_by_zero_parity(self):
+        for operation in ["odd", "pydiv", "mathdiv"]:
+            transformation = ["src_ip", "value: {}(packet_size,sub(sampling_rate,sampling_rate))".format(operation)]
+            rule = ["key: src_ip", "max(value)"]
+            for mode in ["rdd", "sql"]:
+                with self.assertRaises(Exception, msg="{} by zero should fail in {} mode".format(operation, mode)):
+                    self._run(mode, CONFIG_PATH_REDUCE_BY_KEY, transformation, rule).collect()
+
+    def test_unsupported_aggregation(self):
+        config = Config(CONFIG_PATH)
+        config.content["processing"]["mode"] = "sql"
+        config.content["processing"]["aggregations"]["rule"] = ["mul(packet_size)", "sum(traffic)"]
+        with self.assertRaises(NotValidAggregationExpression):
+            Processor(config)
@@ -604,3 +604,26 @@ class TransformationCreatorTestCase(TestCase):
             "List of tuples should be equal")
 
         spark.stop()
+
+    def test_build_lambda_compiles_syntax_tree(self):
+        parser = TransformationsParser(["src_ip",
+                                        "traffic: mul(packet_size,sampling_rate)",
+                                        "nested: add(mul(packet_size,10),1)",
+                                        "source: concat('input - ',config('input.input_type'))",
+                                        "short: truncate('abcdef',2)"])
+        parser.run()
+        creator = TransformationCreator(self.data_structure, parser.expanded_transformation,
+                                        TransformationOperations(self.config))
+        transformation = creator.build_lambda()
+
+        row = [None] * len(self.data_structure)
+        row[self.data_structure["src_ip"]["index"]] = "217.69.143.60"
+        row[self.data_structure["packet_size"]["index"]] = 74
+        row[self.data_structure["sampling_rate"]["index"]] = 512
+
+        self.assertTupleEqual(transformation(row), ("217.69.143.60", 37888, 741, "input - kafka", "ab"),
+                              "Compiled transformation should give the same tuple as the syntax tree")
+
+        row[self.data_structure["packet_size"]["index"]] = 68
+        self.assertTupleEqual(transformation(row), ("217.69.143.60", 34816, 681, "input - kafka", "ab"),
+                              "Compiled transformation should read new values of each row")
@@ -0,0 +1,44 @@
+# Copyright 2017, bwsoft management
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from unittest import TestCase
+from unittest.mock import MagicMock
+
+from singelton.worker_cache import worker_cached, clear_worker_cache
+
+
+class WorkerCacheTestCase(TestCase):
+    def tearDown(self):
+        clear_worker_cache()
+
+    def test_object_is_created_once_per_key(self):
+        factory = MagicMock(side_effect=lambda: object())
+        first = worker_cached(("test", 1), factory)
+
+        self.assertIs(worker_cached(("test", 1), factory), first, "Object should be reused by the next calls")
+        self.assertIsNot(worker_cached(("test", 2), factory), first, "Other key should get its own object")
+        self.assertEqual(factory.call_count, 2, "Factory should be called once per key")
+
+    def test_none_is_cached(self):
+        factory = MagicMock(return_value=None)
+        worker_cached(("test", None), factory)
+        worker_cached(("test", None), factory)
+
+        self.assertEqual(factory.call_count, 1, "Created None shouldn't be created again")
+
+    def test_clear(self):
+        first = worker_cached(("test", 1), object)
+        clear_worker_cache()
+
+        self.assertIsNot(worker_cached(("test", 1), object), first, "Object should be created again after clear")